@@ -0,0 +1,187 @@
+"""
+Контроль допуска (admission control) для тяжёлых операций веб-сервиса
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import metrics
+import request_timing
+
+# Классы приоритета в порядке обслуживания
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+
+
+class AdmissionRejected(Exception):
+    """Запрос отклонён: очередь переполнена или ожидание слишком долгое"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Сервер перегружен ({reason}), повторите через {retry_after} с")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Ограничивает число одновременно выполняемых операций и длину очередей.
+
+    Запросы делятся на два класса: interactive (оператор в браузере) и bulk
+    (пакетная и скриптовая генерация). Освободившийся слот сначала получает
+    очередь interactive, затем bulk; внутри класса — FIFO. Кроме того, bulk
+    никогда не занимает последние reserved_interactive слотов, так что
+    одиночный отчёт не ждёт окончания пакета.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        reserved_interactive: int = 0,
+        bulk_max_queue: int | None = None,
+    ):
+        """
+        Args:
+            name: Имя пула (метка в метриках)
+            max_concurrency: Сколько операций выполняется одновременно
+            max_queue: Длина очереди interactive; остальные получают 429
+            queue_timeout: Максимальное ожидание слота в секундах
+            reserved_interactive: Сколько слотов недоступно для bulk
+            bulk_max_queue: Длина очереди bulk (по умолчанию как max_queue)
+        """
+        self.name = name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.queue_timeout = queue_timeout
+        # Хотя бы один слот bulk получает всегда, иначе пакеты не выполнятся никогда
+        self.bulk_limit = max(1, self.max_concurrency - max(0, int(reserved_interactive)))
+        self.max_queue = {
+            PRIORITY_INTERACTIVE: max(0, int(max_queue)),
+            PRIORITY_BULK: max(0, int(max_queue if bulk_max_queue is None else bulk_max_queue)),
+        }
+        self._active = {priority: 0 for priority in PRIORITIES}
+        self._waiters: dict[str, deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+        # Скользящее среднее времени выполнения (для Retry-After)
+        self._avg_service_time = 1.0
+
+    @property
+    def active(self) -> int:
+        return sum(self._active.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def _check_priority(self, priority: str) -> str:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Неизвестный приоритет: {priority}")
+        return priority
+
+    def retry_after(self, priority: str = PRIORITY_INTERACTIVE) -> int:
+        """Оценка (в секундах), через сколько освободится место для класса"""
+        if priority == PRIORITY_INTERACTIVE:
+            backlog = self.active + len(self._waiters[PRIORITY_INTERACTIVE])
+            slots = self.max_concurrency
+        else:
+            backlog = self._active[PRIORITY_BULK] + self.queued
+            slots = self.bulk_limit
+        return max(1, math.ceil(self._avg_service_time * backlog / slots))
+
+    def _can_start(self, priority: str) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        return priority == PRIORITY_INTERACTIVE or self._active[PRIORITY_BULK] < self.bulk_limit
+
+    def _update_gauges(self) -> None:
+        for priority in PRIORITIES:
+            metrics.ADMISSION_ACTIVE.labels(pool=self.name, priority=priority).set(self._active[priority])
+            metrics.ADMISSION_QUEUED.labels(pool=self.name, priority=priority).set(len(self._waiters[priority]))
+
+    def _reject(self, priority: str, reason: str) -> AdmissionRejected:
+        metrics.ADMISSION_REJECTED.labels(pool=self.name, priority=priority, reason=reason).inc()
+        return AdmissionRejected(reason, self.retry_after(priority))
+
+    def _discard_waiter(self, priority: str, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters[priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def _dispatch(self) -> None:
+        """Раздаёт свободные слоты ожидающим: сначала interactive, затем bulk"""
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters and self._can_start(priority):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self._active[priority] += 1
+                    waiter.set_result(None)
+        self._update_gauges()
+
+    def _release(self, priority: str) -> None:
+        self._active[priority] -= 1
+        self._dispatch()
+
+    async def _acquire(self, priority: str) -> None:
+        # Не обгоняем ожидающих своего и более высокого класса
+        ahead = self._waiters[PRIORITY_INTERACTIVE] or (
+            priority == PRIORITY_BULK and self._waiters[PRIORITY_BULK]
+        )
+        if not ahead and self._can_start(priority):
+            self._active[priority] += 1
+            self._update_gauges()
+            return
+
+        if len(self._waiters[priority]) >= self.max_queue[priority]:
+            raise self._reject(priority, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Слот выдан одновременно с истечением таймаута — занимаем
+                # его, иначе он так и останется занятым
+                return
+            self._discard_waiter(priority, waiter)
+            self._update_gauges()
+            raise self._reject(priority, "timeout") from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Слот уже был выдан нам — возвращаем его
+                self._release(priority)
+            else:
+                self._discard_waiter(priority, waiter)
+                self._update_gauges()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, priority: str = PRIORITY_INTERACTIVE):
+        """
+        Занимает слот на время блока.
+
+        Raises:
+            AdmissionRejected: очередь переполнена или истёк queue_timeout
+        """
+        priority = self._check_priority(priority)
+        wait_start = time.perf_counter()
+        await self._acquire(priority)
+        waited = time.perf_counter() - wait_start
+        metrics.ADMISSION_QUEUE_WAIT.labels(pool=self.name, priority=priority).observe(waited)
+        request_timing.add_phase("queue", waited)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * elapsed
+            self._release(priority)
@@ -0,0 +1,349 @@
+"""
+Клиент веб-API для пакетной генерации протоколов.
+
+Читает запросы из JSON (объект или список) или JSONL, отправляет их через
+одну сессию с пулом keep-alive соединений, не больше concurrency
+одновременно, повторяет при перегрузке сервера и сохраняет документы
+на диск потоком, не держа их в памяти.
+
+Примеры:
+    python api_client.py protocols.jsonl --url http://server:8000 -c 4
+    python api_client.py protocol.json -o reports --results results.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+from urllib.parse import unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+DEFAULT_API_URL = "http://localhost:8000"
+# Ответы, после которых запрос имеет смысл повторить: сервер перегружен
+# или перезапускается. 500 не повторяем — генерация могла пройти частично.
+RETRY_STATUSES = {429, 502, 503, 504}
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class ApiClientError(Exception):
+    """Ошибка обращения к API, которую не исправит повтор"""
+
+
+@dataclass
+class GenerateResult:
+    """Итог генерации одного протокола"""
+
+    index: int
+    source: str
+    ok: bool
+    status: int | None = None
+    path: str = ""
+    report_id: str = ""
+    size: int = 0
+    attempts: int = 0
+    seconds: float = 0.0
+    error: str = ""
+
+
+def iter_payloads(path: str | Path) -> Iterator[tuple[str, dict]]:
+    """
+    Запросы из файла: JSON-объект, JSON-список или JSONL (по объекту в строке).
+    '-' — стандартный ввод.
+
+    Yields:
+        tuple: (откуда запрос — 'файл:строка' или 'файл[i]', данные)
+    """
+    name = str(path)
+    if name == "-":
+        text = sys.stdin.read()
+        name = "stdin"
+    else:
+        text = Path(path).read_text(encoding="utf-8-sig")
+
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        for i, payload in enumerate(json.loads(text)):
+            yield f"{name}[{i}]", payload
+        return
+    try:
+        # Один объект, возможно на нескольких строках
+        yield name, json.loads(text)
+        return
+    except json.JSONDecodeError:
+        pass
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield f"{name}:{line_number}", json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ApiClientError(f"{name}:{line_number}: некорректный JSON ({e.msg})") from None
+
+
+def filename_from_disposition(header: str, default: str = "report.docx") -> str:
+    """Имя файла из Content-Disposition (RFC 5987 filename* имеет приоритет)"""
+    match = re.search(r"filename\*=([^']*)'[^']*'([^;]+)", header, re.I)
+    if match:
+        return Path(unquote(match.group(2).strip(), encoding=match.group(1) or "utf-8")).name
+    match = re.search(r'filename="?([^";]+)"?', header, re.I)
+    if match:
+        return Path(match.group(1).strip()).name
+    return default
+
+
+class ProtocolApiClient:
+    """
+    Клиент /api/generate.
+
+    Одна requests.Session на все потоки: пул соединений urllib3
+    потокобезопасен, соединения переиспользуются (keep-alive).
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_API_URL,
+        concurrency: int = 4,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 120.0,
+        priority: str | None = "bulk",
+        api_key: str | None = None,
+    ):
+        """
+        Args:
+            base_url: Адрес веб-сервиса
+            concurrency: Сколько запросов выполняется одновременно
+            max_retries: Повторов после первой попытки
+            backoff: Начальная пауза между повторами (удваивается)
+            max_backoff: Максимальная пауза между повторами
+            timeout: Таймаут чтения ответа в секундах
+            priority: Заголовок X-Priority (пакетная загрузка — bulk)
+            api_key: Заголовок X-API-Key
+        """
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if priority:
+            self.session.headers["X-Priority"] = priority
+        if api_key:
+            self.session.headers["X-API-Key"] = api_key
+        self._names_lock = threading.Lock()
+        self._reserved_names: set[Path] = set()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "ProtocolApiClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def wait_until_ready(self, timeout: float = 30.0) -> bool:
+        """Ждёт, пока /api/ready ответит 200 (сервер запущен и прогрет)"""
+        deadline = time.monotonic() + timeout
+        delay = 0.2
+        while True:
+            try:
+                response = self.session.get(f"{self.base_url}/api/ready", timeout=5)
+                if response.status_code == 200:
+                    return True
+            except requests.RequestException:
+                pass
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    def _retry_delay(self, attempt: int, response: requests.Response | None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        # Разброс, чтобы повторы разных потоков не приходили разом
+        return delay * random.uniform(0.5, 1.0)
+
+    def _target_path(self, output_dir: Path, filename: str) -> Path:
+        """Свободное имя файла (параллельные отчёты могут называться одинаково)"""
+        candidate = output_dir / filename
+        stem, suffix = candidate.stem, candidate.suffix
+        counter = 2
+        with self._names_lock:
+            while candidate in self._reserved_names or candidate.exists():
+                candidate = output_dir / f"{stem}_{counter}{suffix}"
+                counter += 1
+            self._reserved_names.add(candidate)
+        return candidate
+
+    def _save(self, response: requests.Response, output_dir: Path) -> tuple[Path, int]:
+        filename = filename_from_disposition(response.headers.get("Content-Disposition", ""))
+        target = self._target_path(output_dir, filename)
+        partial = target.with_name(target.name + ".part")
+        size = 0
+        try:
+            with open(partial, "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            partial.replace(target)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            with self._names_lock:
+                self._reserved_names.discard(target)
+            raise
+        return target, size
+
+    @staticmethod
+    def _error_detail(response: requests.Response) -> str:
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            return response.text[:500]
+        if isinstance(detail, dict) and "errors" in detail:
+            return "; ".join(map(str, detail["errors"]))
+        return detail if isinstance(detail, str) else json.dumps(detail, ensure_ascii=False)
+
+    def generate(self, payload: dict, output_dir: str | Path, index: int = 0, source: str = "") -> GenerateResult:
+        """Генерирует один протокол и сохраняет документ в output_dir"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        result = GenerateResult(index=index, source=source, ok=False)
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            response = None
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                    stream=True,
+                    timeout=(10, self.timeout),
+                )
+                result.status = response.status_code
+                if response.status_code == 200:
+                    path, size = self._save(response, output_dir)
+                    result.ok = True
+                    result.path = str(path)
+                    result.size = size
+                    result.report_id = response.headers.get("X-Report-Id", "")
+                    break
+                result.error = self._error_detail(response)
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            except requests.ConnectionError as e:
+                # Запрос не дошёл до сервера — повтор безопасен
+                result.error = f"Нет соединения: {e}"
+            except requests.RequestException as e:
+                # Таймаут чтения и т.п.: отчёт мог быть создан, не повторяем
+                result.error = f"{type(e).__name__}: {e}"
+                break
+            finally:
+                if response is not None:
+                    response.close()
+            if attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, response))
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def generate_many(
+        self,
+        payloads: Iterable[tuple[str, dict]],
+        output_dir: str | Path,
+    ) -> Iterator[GenerateResult]:
+        """
+        Генерирует протоколы параллельно (не больше concurrency запросов
+        одновременно и не больше 2*concurrency в ожидании). Результаты
+        выдаются по мере готовности.
+        """
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="api-client") as pool:
+            for index, (source, payload) in enumerate(payloads):
+                pending.add(pool.submit(self.generate, payload, output_dir, index, source))
+                if len(pending) >= 2 * self.concurrency:
+                    done = next(as_completed(pending))
+                    pending.remove(done)
+                    yield done.result()
+            for future in as_completed(pending):
+                yield future.result()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Пакетная генерация протоколов через веб-API")
+    parser.add_argument("inputs", nargs="+", help="Файлы JSON/JSONL с запросами ('-' — стандартный ввод)")
+    parser.add_argument("--url", default=DEFAULT_API_URL, help=f"Адрес веб-сервиса ({DEFAULT_API_URL})")
+    parser.add_argument("-o", "--output", default=str(config.REPORTS_DIR), help="Папка для документов")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Одновременных запросов (4)")
+    parser.add_argument("--retries", type=int, default=5, help="Повторов при перегрузке/недоступности (5)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Таймаут ответа в секундах (120)")
+    parser.add_argument("--priority", choices=("interactive", "bulk"), default="bulk", help="X-Priority (bulk)")
+    parser.add_argument("--api-key", help="Заголовок X-API-Key")
+    parser.add_argument("--wait", type=float, default=30.0, help="Сколько ждать готовности сервера, с (30)")
+    parser.add_argument("--results", help="Записать итоги в JSONL-файл")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    def payloads() -> Iterator[tuple[str, dict]]:
+        for path in args.inputs:
+            yield from iter_payloads(path)
+
+    results_file = open(args.results, "w", encoding="utf-8") if args.results else None
+    succeeded = failed = 0
+    start = time.perf_counter()
+    try:
+        with ProtocolApiClient(
+            args.url,
+            concurrency=args.concurrency,
+            max_retries=args.retries,
+            timeout=args.timeout,
+            priority=args.priority,
+            api_key=args.api_key,
+        ) as client:
+            if not client.wait_until_ready(args.wait):
+                print(f"[ERROR] Сервер {args.url} не готов. Убедитесь, что start_web.py запущен.")
+                return 2
+            for result in client.generate_many(payloads(), args.output):
+                if result.ok:
+                    succeeded += 1
+                    print(f"[OK] {result.source}: {result.path} ({result.size} байт, {result.seconds:.1f} с)")
+                else:
+                    failed += 1
+                    print(f"[ERROR] {result.source}: {result.status or '-'} {result.error}")
+                if results_file:
+                    results_file.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+    except (OSError, ValueError, ApiClientError) as e:
+        print(f"[ERROR] {e}")
+        return 2
+    finally:
+        if results_file:
+            results_file.close()
+
+    print(f"\nГотово: {succeeded} успешно, {failed} с ошибками за {time.perf_counter() - start:.1f} с")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
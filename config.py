@@ -21,9 +21,64 @@ if os.getenv('PRODUCTION') == 'true':
 else:
     EXTERNAL_CONTRACTS_DIR = Path(r"D:\договора 2025")
 
+# Период фонового пересканирования договоров веб-сервером (секунды, 0 - отключено)
+CONTRACTS_REFRESH_INTERVAL = int(os.getenv('CONTRACTS_REFRESH_INTERVAL', '3600'))
+
+# Процессов для разбора договоров при обновлении базы (0 - по числу ядер, 1 - без пула)
+CONTRACTS_SCAN_WORKERS = int(os.getenv('CONTRACTS_SCAN_WORKERS', '0'))
+
+# Потоков чтения файлов договоров с опережением: папка обычно на сетевом
+# диске, и чтение упирается в задержку сети (1 - читать по очереди)
+CONTRACTS_IO_THREADS = int(os.getenv('CONTRACTS_IO_THREADS', '8'))
+
+# Наблюдение за папкой с договорами: изменения попадают в базу через
+# CONTRACTS_WATCH_DEBOUNCE секунд тишины. На сетевых дисках, где уведомления
+# ОС не приходят, включите CONTRACTS_WATCH_POLLING (опрос раз в
+# CONTRACTS_WATCH_POLL_INTERVAL секунд)
+CONTRACTS_WATCH = os.getenv('CONTRACTS_WATCH', 'true') == 'true'
+CONTRACTS_WATCH_DEBOUNCE = float(os.getenv('CONTRACTS_WATCH_DEBOUNCE', '2'))
+CONTRACTS_WATCH_POLLING = os.getenv('CONTRACTS_WATCH_POLLING') == 'true'
+CONTRACTS_WATCH_POLL_INTERVAL = float(os.getenv('CONTRACTS_WATCH_POLL_INTERVAL', '2'))
+
+# Ограничение нагрузки на генерацию в веб-сервере (на один воркер)
+GENERATE_MAX_CONCURRENCY = int(os.getenv('GENERATE_MAX_CONCURRENCY', '2'))
+GENERATE_MAX_QUEUE = int(os.getenv('GENERATE_MAX_QUEUE', '16'))
+GENERATE_QUEUE_TIMEOUT = float(os.getenv('GENERATE_QUEUE_TIMEOUT', '30'))
+
+# Приоритеты генерации: пакетные (bulk) запросы не занимают зарезервированные
+# слоты, так что отчёт из браузера не ждёт окончания пакета
+GENERATE_INTERACTIVE_RESERVED = int(os.getenv('GENERATE_INTERACTIVE_RESERVED', '1'))
+GENERATE_BULK_MAX_QUEUE = int(os.getenv('GENERATE_BULK_MAX_QUEUE', '64'))
+
+
+def _parse_api_key_priorities(value):
+    """Разбирает строку вида 'ключ1:bulk,ключ2:interactive'"""
+    priorities = {}
+    for item in value.split(','):
+        key, _, priority = item.strip().partition(':')
+        if key and priority:
+            priorities[key.strip()] = priority.strip().lower()
+    return priorities
+
+
+# Приоритет по API-ключу (заголовок X-API-Key) имеет преимущество над X-Priority
+API_KEY_PRIORITIES = _parse_api_key_priorities(os.getenv('API_KEY_PRIORITIES', ''))
+
 # Файлы
 LOG_FILE = LOGS_DIR / "app.log"
 HISTORY_FILE = WORK_DIR / "history.json"
+REPORTS_INDEX_FILE = WORK_DIR / "reports_index.jsonl"
+
+# Отправлять созданные веб-сервисом отчёты на email (нагрузочный тест отключает)
+REPORT_EMAIL_ENABLED = os.getenv('REPORT_EMAIL_ENABLED', 'true') == 'true'
+
+# Объём кэша последних отчётов в памяти веб-сервера (байты, на один воркер)
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Снимки метрик воркеров: при нескольких воркерах /metrics суммирует их.
+# METRICS_FLUSH_INTERVAL — как часто воркер обновляет свой снимок (секунды)
+METRICS_DIR = WORK_DIR / "metrics"
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
 
 def get_logo_file():
     """Получить путь к файлу логотипа"""
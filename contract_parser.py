@@ -1,10 +1,291 @@
 """
 Модуль для парсинга договоров и извлечения данных
 """
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from docx import Document
 from pathlib import Path
+import hashlib
+import io
+import multiprocessing
+import os
 import re
+import xml.etree.ElementTree as ET
+import zipfile
 from logger import app_logger
+from pattern_engine import AnchoredPatterns
+
+# Меньше файлов разбираем в текущем процессе: запуск пула (spawn, импорт
+# python-docx в каждом процессе) стоит около 0,25 с процессорного времени на
+# процесс, а разбор договора — около 2 мс, так что пул окупается только на
+# сотнях файлов (первое сканирование папки), но не на обновлениях по
+# нескольким изменённым договорам
+MIN_PARALLEL_FILES = 500
+
+# Потоков чтения файлов договоров с опережением (см. prefetch_files)
+DEFAULT_IO_THREADS = 8
+
+# Начало пункта 1.2: номер в начале строки (не дата «15.01.2025» и не
+# сумма «11.200» внутри строки)
+SECTION_12_START = re.compile(r'\s*1\.2(?!\d)')
+# Конец пункта 1.2: строка, начинающаяся с 1.3–1.9 или 2.
+# (тот же признак, что в _extract_from_section_12)
+SECTION_12_END = re.compile(r'\n\s*1\.[3-9]|\n\s*2\.')
+
+
+def is_contract_file(name):
+    """Файл договора: .docx, но не временный файл Word (~$...)"""
+    return name.lower().endswith('.docx') and not name.startswith('~$')
+
+
+def _read_bytes(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def prefetch_files(file_paths, threads=DEFAULT_IO_THREADS):
+    """
+    Читает файлы целиком в пуле потоков с опережением.
+    
+    Папка с договорами обычно лежит на сетевом диске, где каждое чтение
+    упирается в задержку сети, а не в диск: пока вызывающий разбирает
+    очередной файл, следующие уже загружаются. Одновременно в памяти не
+    больше 2*threads прочитанных файлов.
+    
+    Args:
+        file_paths (iterable): Пути к файлам
+        threads (int): Потоков чтения (1 — без пула, по очереди)
+    
+    Yields:
+        tuple: (путь, содержимое или None, исключение или None) в порядке file_paths
+    """
+    if threads <= 1:
+        for file_path in file_paths:
+            try:
+                yield file_path, _read_bytes(file_path), None
+            except OSError as e:
+                yield file_path, None, e
+        return
+    
+    ahead = deque()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="contracts-io") as pool:
+        for file_path in file_paths:
+            ahead.append((file_path, pool.submit(_read_bytes, file_path)))
+            if len(ahead) < 2 * threads:
+                continue
+            yield _prefetched(*ahead.popleft())
+        while ahead:
+            yield _prefetched(*ahead.popleft())
+
+
+def _prefetched(file_path, future):
+    try:
+        return file_path, future.result(), None
+    except OSError as e:
+        return file_path, None, e
+
+
+# Шаблоны заказчика в порядке приоритета. Все заканчиваются на
+# «именуем... в дальнейшем Заказчик», поэтому ищутся только рядом с этим
+# якорем (см. pattern_engine.AnchoredPatterns).
+CUSTOMER_TAIL = r'именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик'
+CUSTOMER_PATTERNS = AnchoredPatterns(
+    [
+        # ООО с кавычками
+        r'(Общество\s+с\s+ограниченной\s+ответственностью\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*' + CUSTOMER_TAIL,
+        # Краткая форма ООО
+        r'(ООО\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*' + CUSTOMER_TAIL,
+        # АО, ЗАО, ПАО
+        r'((?:Закрытое|Открытое|Публичное)?\s*[Аа]кционерное\s+общество\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*' + CUSTOMER_TAIL,
+        r'([ЗОП]АО\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*' + CUSTOMER_TAIL,
+        # ИП
+        r'(Индивидуальный\s+предприниматель\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)\s*,?\s*' + CUSTOMER_TAIL,
+        r'(ИП\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)\s*,?\s*' + CUSTOMER_TAIL,
+        # Общий паттерн - любой текст перед "именуемое"
+        r',\s*([^,]{10,200}?)\s*,?\s*' + CUSTOMER_TAIL,
+    ],
+    anchor='именуем',
+    # Принимаются названия короче 250 символов — дальше 300 от якоря искать незачем
+    before=300,
+    after=120,
+    confirm=CUSTOMER_TAIL,
+)
+CUSTOMER_PREFIX_CLEANUP = re.compile(r'^(в\s+лице|далее)\s*[-–—]?\s*', re.IGNORECASE)
+
+# Пункт 1.2 целиком (до начала 1.3–1.9 или 2.) и запасной вариант
+SECTION_12_PATTERN = re.compile(r'1\.2\s*\.?\s*(.*?)(?=\n\s*1\.[3-9]|\n\s*2\.|\Z)', re.IGNORECASE | re.DOTALL)
+SECTION_12_FALLBACK_PATTERN = re.compile(
+    r'1\.2\s*\.?\s*([^\n]*(?:\n(?!\s*1\.[3-9]|\s*2\.)[^\n]*){0,20})', re.IGNORECASE | re.DOTALL
+)
+# Объект внутри пункта 1.2
+SECTION_12_OBJECT_PATTERNS = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in [
+    # После "на объекте заказчика:" - берём всё до конца пункта
+    r'на\s+объекте\s+заказчика[:\s]*[-–—]?\s*(.+)',
+    # Альтернатива
+    r'объект[е]?\s+заказчика[:\s]*[-–—]?\s*(.+)',
+]]
+SECTION_12_TAIL_CLEANUP = re.compile(r'\s+(?:Исполнитель|Срок\s+выполнения|В\s+течени[ие]).*$', re.IGNORECASE)
+
+# Наименование объекта (_extract_object_name)
+OBJECT_NAME_PATTERNS = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in [
+    # Ищем в пункте 1.2 после слова "наименование"
+    r'1\.2[.\s]*[^\n]*?[Нн]аименование[:\s]+([^\n;\.]+)',
+    r'1\.2[.\s]*[^\n]*?[Нн]аименование[:\s]*[-–—]?\s*([^\n;\.]+)',
+    # Запасные варианты
+    r'[Нн]аименование\s+объекта[:\s]+([^\n;\.]+)',
+    r'[Нн]аименование[:\s]+([^\n;\.]{10,})',
+    r'[Оо]бъект[:\s]+([^\n;\.]+)',
+    r'[Мм]есто проведения работ[:\s]+([^\n;\.]+)',
+    r'[Оо]бъект испытания[:\s]+([^\n;\.]+)',
+]]
+# Адрес объекта (_extract_address)
+ADDRESS_PATTERNS = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in [
+    # Ищем в пункте 1.2 после слова "адрес"
+    r'1\.2[.\s]*.*?[Аа]дрес[:\s]+([^\n;\.]+(?:г\.|город|обл\.|область|ул\.|улица|д\.|дом|пр\.|проспект)[^\n;\.]+)',
+    r'1\.2[.\s]*.*?[Аа]дрес[:\s]*[-–—]?\s*([^\n;\.]+)',
+    # Общий поиск адреса объекта
+    r'[Аа]дрес\s+объекта[:\s]+([^\n;\.]+)',
+    r'[Аа]дрес[:\s]+([^\n;]+(?:г\.|город|обл\.|область|ул\.|улица|д\.|дом)[^\n;]+)',
+    # Поиск по началу с "г." или "город"
+    r'(?:г\.|город)\s*([А-ЯЁ][а-яё]+[,\s]+[^\n]{10,150})',
+]]
+OBJECT_NAME_TAIL_CLEANUP = re.compile(r'\s*[Аа]дрес.*$')
+ADDRESS_TAIL_CLEANUP = re.compile(r'\s*(далее|именуемый|именуемое).*$', re.IGNORECASE)
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_T, _W_TBL, _W_TC = _W + "p", _W + "t", _W + "tbl", _W + "tc"
+_W_TABS, _W_VMERGE, _W_VAL = _W + "tabs", _W + "vMerge", _W + "val"
+# Элементы прогона, которые python-docx тоже превращает в символы
+_W_RUN_CHARS = {_W + "tab": "\t", _W + "ptab": "\t", _W + "br": "\n", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+
+
+def extract_docx_text(file_path):
+    """
+    Текст договора прямо из word/document.xml (см. iter_docx_text)
+
+    Returns:
+        list: Непустые строки текста
+    """
+    return list(iter_docx_text(file_path))
+
+
+def iter_docx_text(file_path):
+    """
+    Текст договора прямо из word/document.xml, без построения дерева python-docx.
+
+    Порядок тот же, что при чтении через python-docx: сначала абзацы вне
+    таблиц, затем ячейки таблиц верхнего уровня (абзацы ячейки через
+    перевод строки). Объединённая ячейка в XML записана один раз, а
+    продолжения вертикального объединения пропускаются, поэтому её текст
+    не повторяется. Разобранные абзацы сразу удаляются из памяти.
+
+    Абзацы вне таблиц выдаются по мере чтения XML: если вызывающему
+    хватило начала документа, он закрывает генератор и остаток файла
+    не распаковывается и не разбирается.
+
+    Args:
+        file_path (str, Path или файловый объект): Файл docx или его
+            содержимое в памяти (io.BytesIO)
+
+    Raises:
+        KeyError: в архиве нет word/document.xml
+        zipfile.BadZipFile, ET.ParseError: файл повреждён
+
+    Yields:
+        str: Непустые строки текста
+    """
+    cells = []
+    open_paragraphs = []  # тексты открытых абзацев (абзацы бывают вложены, например в надписях)
+    table_depth = 0
+    cell_parts = None     # абзацы текущей ячейки таблицы верхнего уровня
+    merged_continuation = False
+    in_tabs = False       # w:tab внутри w:tabs — позиция табуляции, а не символ
+
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == _W_P:
+                    open_paragraphs.append([])
+                elif tag == _W_TBL:
+                    table_depth += 1
+                elif tag == _W_TC and table_depth == 1:
+                    cell_parts = []
+                    merged_continuation = False
+                elif tag == _W_TABS:
+                    in_tabs = True
+                continue
+
+            if tag == _W_T:
+                if open_paragraphs and elem.text:
+                    open_paragraphs[-1].append(elem.text)
+            elif tag in _W_RUN_CHARS:
+                if open_paragraphs and not in_tabs:
+                    open_paragraphs[-1].append(_W_RUN_CHARS[tag])
+            elif tag == _W_TABS:
+                in_tabs = False
+            elif tag == _W_P:
+                text = "".join(open_paragraphs.pop())
+                if cell_parts is not None:
+                    cell_parts.append(text)
+                elif text.strip():
+                    yield text.strip()
+                elem.clear()
+            elif tag == _W_VMERGE and table_depth == 1 and cell_parts is not None:
+                merged_continuation = elem.get(_W_VAL, "continue") == "continue"
+            elif tag == _W_TC and table_depth == 1:
+                text = "\n".join(cell_parts).strip()
+                if text and not merged_continuation:
+                    cells.append(text)
+                cell_parts = None
+                elem.clear()
+            elif tag == _W_TBL:
+                table_depth -= 1
+                elem.clear()
+
+    yield from cells
+
+
+@dataclass
+class ScanEvent:
+    """Результат сканирования одного файла договора"""
+    
+    index: int                # номер файла в папке
+    total: int                # всего файлов в папке
+    done: int                 # сколько файлов уже обработано (включая этот)
+    file_path: Path
+    status: str               # 'unchanged', 'added', 'changed' или 'error' (файл не прочитан;
+                              # у известного файла остаются прежние данные и запись манифеста)
+    contract: dict = None     # данные договора или None, если заказчик не найден
+    manifest_entry: dict = None
+    error: str = None
+
+
+def _manifest_entry(stat, sha256, data):
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256,
+        'parsed': data is not None,
+    }
+
+
+def _parse_in_worker(contracts_directory, file_path, content=None):
+    """Разбор одного договора в процессе пула"""
+    return ContractParser(contracts_directory).parse_contract(Path(file_path), content)
+
+
+def resolve_workers(workers):
+    """
+    Число процессов для разбора: None или 1 — в текущем процессе,
+    0 — по числу ядер
+    """
+    if workers is None:
+        return 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
 
 
 class ContractParser:
@@ -17,41 +298,37 @@ class ContractParser:
         """
         self.contracts_dir = Path(contracts_directory)
     
-    def parse_contract(self, file_path):
+    def parse_contract(self, file_path, content=None):
         """
         Парсит один договор и извлекает данные
         
         Args:
             file_path (Path): Путь к файлу договора
+            content (bytes): Уже прочитанное содержимое файла (тогда файл
+                с диска не читается)
         
         Returns:
-            dict: Данные договора или None (если не удалось извлечь заказчика)
+            dict: Данные договора или None (если не удалось извлечь заказчика).
+                В 'text' — прочитанный текст договора (для полнотекстового
+                индекса, в базу договоров не сохраняется)
         """
         try:
-            doc = Document(str(file_path))
-            
-            # Собираем весь текст документа
-            full_text = []
-            for paragraph in doc.paragraphs:
-                if paragraph.text and paragraph.text.strip():
-                    full_text.append(paragraph.text.strip())
-            
-            # Также проверяем таблицы
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text and cell.text.strip():
-                            full_text.append(cell.text.strip())
+            source = io.BytesIO(content) if content is not None else file_path
+            lines = iter_docx_text(source)
+            try:
+                text, customer = self._read_until_resolved(lines)
+            except KeyError:
+                # Основная часть документа лежит не в word/document.xml
+                if content is not None:
+                    source.seek(0)
+                text, customer = self._read_until_resolved(self._read_text_with_python_docx(source))
+            finally:
+                lines.close()
             
-            if not full_text:
+            if not text:
                 app_logger.warning(f"Файл {file_path.name} пустой")
                 return None
             
-            text = "\n".join(full_text)
-            
-            # Извлекаем данные
-            customer = self._extract_customer(text)
-            
             # Если не нашли заказчика - пропускаем договор
             if not customer:
                 app_logger.warning(f"В файле {file_path.name} не найден заказчик")
@@ -65,6 +342,7 @@ class ContractParser:
                 'file_path': str(file_path),
                 'customer': customer,
                 'object_full_address': section_12_data.get('combined_address'),  # Объединённое поле
+                'text': text,
             }
             
             # Логируем что нашли
@@ -80,6 +358,73 @@ class ContractParser:
             app_logger.error(f"Ошибка при парсинге {file_path.name}: {e}")
             return None
     
+    def _read_until_resolved(self, lines):
+        """
+        Читает строки договора по порядку, пока не найдены заказчик и
+        пункт 1.2 целиком (до начала 1.3–1.9 или 2.), и останавливается:
+        приложения, спецификации и реквизиты в конце договора не читаются.
+        
+        Заказчик ищется, только когда в строке есть «заказчик», а в ней или
+        в предыдущей — «именуем» (без этого ни один шаблон не совпадёт).
+        Если дочитали до конца, а заказчик так и не найден, шаблоны
+        применяются ко всему тексту, как при полном чтении.
+        
+        Returns:
+            tuple: (прочитанный текст, заказчик или None)
+        """
+        parts = []
+        customer = None
+        previous_named = False
+        section_started = False
+        section_done = False
+        for line in lines:
+            parts.append(line)
+            lower = line.lower()
+            named = 'именуем' in lower
+            if customer is None and 'заказчик' in lower and (named or previous_named):
+                customer = self._extract_customer("\n".join(parts))
+            previous_named = named
+            
+            if not section_started:
+                start = SECTION_12_START.match(line)
+                if start:
+                    section_started = True
+                    section_done = bool(SECTION_12_END.search(line, start.end()))
+            elif not section_done:
+                section_done = bool(SECTION_12_END.search('\n' + line))
+            
+            if customer and section_done:
+                break
+        
+        text = "\n".join(parts)
+        if customer is None and text:
+            customer = self._extract_customer(text)
+        return text, customer
+    
+    @staticmethod
+    def _read_text_with_python_docx(source):
+        """Текст документа через python-docx (медленнее, но понимает любую структуру пакета)"""
+        doc = Document(source if isinstance(source, io.BytesIO) else str(source))
+        
+        # Собираем весь текст документа
+        full_text = []
+        for paragraph in doc.paragraphs:
+            if paragraph.text and paragraph.text.strip():
+                full_text.append(paragraph.text.strip())
+        
+        # Также проверяем таблицы (ячейки объединения python-docx возвращает
+        # несколько раз — пропускаем повторы подряд)
+        for table in doc.tables:
+            for row in table.rows:
+                previous_cell = None
+                for cell in row.cells:
+                    if cell._tc is previous_cell:
+                        continue
+                    previous_cell = cell._tc
+                    if cell.text and cell.text.strip():
+                        full_text.append(cell.text.strip())
+        return full_text
+    
     def _extract_from_section_12(self, text):
         """
         Специальная обработка пункта 1.2 договора.
@@ -97,13 +442,11 @@ class ContractParser:
         
         try:
             # Ищем пункт 1.2 целиком (захватываем до следующего пункта)
-            section_pattern = r'1\.2\s*\.?\s*(.*?)(?=\n\s*1\.[3-9]|\n\s*2\.|\Z)'
-            section_match = re.search(section_pattern, text, re.IGNORECASE | re.DOTALL)
+            section_match = SECTION_12_PATTERN.search(text)
             
             if not section_match:
                 # Запасной вариант
-                section_pattern = r'1\.2\s*\.?\s*([^\n]*(?:\n(?!\s*1\.[3-9]|\s*2\.)[^\n]*){0,20})'
-                section_match = re.search(section_pattern, text, re.IGNORECASE | re.DOTALL)
+                section_match = SECTION_12_FALLBACK_PATTERN.search(text)
             
             if not section_match:
                 return result
@@ -111,15 +454,8 @@ class ContractParser:
             section_text = section_match.group(1)
             
             # Извлекаем весь текст после "на объекте заказчика"
-            object_patterns = [
-                # После "на объекте заказчика:" - берём всё до конца пункта
-                r'на\s+объекте\s+заказчика[:\s]*[-–—]?\s*(.+)',
-                # Альтернатива
-                r'объект[е]?\s+заказчика[:\s]*[-–—]?\s*(.+)',
-            ]
-            
-            for pattern in object_patterns:
-                match = re.search(pattern, section_text, re.IGNORECASE | re.DOTALL)
+            for pattern in SECTION_12_OBJECT_PATTERNS:
+                match = pattern.search(section_text)
                 if match:
                     combined = match.group(1).strip()
                     
@@ -127,7 +463,7 @@ class ContractParser:
                     combined = ' '.join(combined.split())
                     
                     # Убираем возможный мусор в конце (следующие предложения)
-                    combined = re.sub(r'\s+(?:Исполнитель|Срок\s+выполнения|В\s+течени[ие]).*$', '', combined, flags=re.IGNORECASE)
+                    combined = SECTION_12_TAIL_CLEANUP.sub('', combined)
                     
                     # Очистка от лишних пробелов и символов
                     combined = combined.strip()
@@ -146,36 +482,15 @@ class ContractParser:
         Извлекает название заказчика из преамбулы договора.
         Формат: "Общество с ограниченной ответственностью «НАЗВАНИЕ», именуемое в дальнейшем «Заказчик»"
         """
-        # Основной паттерн - полное название организации до "именуемое"
-        patterns = [
-            # ООО с кавычками
-            r'(Общество\s+с\s+ограниченной\s+ответственностью\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик',
-            # Краткая форма ООО
-            r'(ООО\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик',
-            # АО, ЗАО, ПАО
-            r'((?:Закрытое|Открытое|Публичное)?\s*[Аа]кционерное\s+общество\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик',
-            r'([ЗОП]АО\s*["\s\'«]+[^"\'»]+["\s\'»]+)\s*,?\s*именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик',
-            # ИП
-            r'(Индивидуальный\s+предприниматель\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)\s*,?\s*именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик',
-            r'(ИП\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)\s*,?\s*именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик',
-            # Общий паттерн - любой текст перед "именуемое"
-            r',\s*([^,]{10,200}?)\s*,?\s*именуем[а-я]{0,3}\s+в\s+дальнейшем\s*["\s\'«]*\s*[Зз]аказчик',
-        ]
-        
-        for pattern in patterns:
-            try:
-                match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    customer = match.group(1).strip()
-                    # Очистка от лишних символов
-                    customer = customer.strip('",\'«»:;.\n\r\t ')
-                    # Убираем служебные слова если попали
-                    customer = re.sub(r'^(в\s+лице|далее)\s*[-–—]?\s*', '', customer, flags=re.IGNORECASE)
-                    
-                    if len(customer) > 5 and len(customer) < 250:
-                        return customer
-            except Exception:
-                continue
+        for _, match in CUSTOMER_PATTERNS.iter_matches(text):
+            customer = match.group(1).strip()
+            # Очистка от лишних символов
+            customer = customer.strip('",\'«»:;.\n\r\t ')
+            # Убираем служебные слова если попали
+            customer = CUSTOMER_PREFIX_CLEANUP.sub('', customer)
+            
+            if len(customer) > 5 and len(customer) < 250:
+                return customer
         
         return None
     
@@ -184,32 +499,17 @@ class ContractParser:
         Извлекает наименование объекта из пункта 1.2 договора.
         Ищет после слова "наименование".
         """
-        patterns = [
-            # Ищем в пункте 1.2 после слова "наименование"
-            r'1\.2[.\s]*[^\n]*?[Нн]аименование[:\s]+([^\n;\.]+)',
-            r'1\.2[.\s]*[^\n]*?[Нн]аименование[:\s]*[-–—]?\s*([^\n;\.]+)',
-            # Запасные варианты
-            r'[Нн]аименование\s+объекта[:\s]+([^\n;\.]+)',
-            r'[Нн]аименование[:\s]+([^\n;\.]{10,})',
-            r'[Оо]бъект[:\s]+([^\n;\.]+)',
-            r'[Мм]есто проведения работ[:\s]+([^\n;\.]+)',
-            r'[Оо]бъект испытания[:\s]+([^\n;\.]+)',
-        ]
-        
-        for pattern in patterns:
-            try:
-                match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    obj_name = match.group(1).strip()
-                    # Очистка
-                    obj_name = obj_name.strip('",\'«»:;.\n\r\t ')
-                    # Удаляем возможные слова "адрес" в конце
-                    obj_name = re.sub(r'\s*[Аа]дрес.*$', '', obj_name)
-                    
-                    if len(obj_name) > 3 and len(obj_name) < 300:
-                        return obj_name
-            except Exception:
-                continue
+        for pattern in OBJECT_NAME_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                obj_name = match.group(1).strip()
+                # Очистка
+                obj_name = obj_name.strip('",\'«»:;.\n\r\t ')
+                # Удаляем возможные слова "адрес" в конце
+                obj_name = OBJECT_NAME_TAIL_CLEANUP.sub('', obj_name)
+                
+                if len(obj_name) > 3 and len(obj_name) < 300:
+                    return obj_name
         
         return None
     
@@ -218,64 +518,273 @@ class ContractParser:
         Извлекает адрес объекта из пункта 1.2 договора.
         Ищет после слова "адрес".
         """
-        patterns = [
-            # Ищем в пункте 1.2 после слова "адрес"
-            r'1\.2[.\s]*.*?[Аа]дрес[:\s]+([^\n;\.]+(?:г\.|город|обл\.|область|ул\.|улица|д\.|дом|пр\.|проспект)[^\n;\.]+)',
-            r'1\.2[.\s]*.*?[Аа]дрес[:\s]*[-–—]?\s*([^\n;\.]+)',
-            # Общий поиск адреса объекта
-            r'[Аа]дрес\s+объекта[:\s]+([^\n;\.]+)',
-            r'[Аа]дрес[:\s]+([^\n;]+(?:г\.|город|обл\.|область|ул\.|улица|д\.|дом)[^\n;]+)',
-            # Поиск по началу с "г." или "город"
-            r'(?:г\.|город)\s*([А-ЯЁ][а-яё]+[,\s]+[^\n]{10,150})',
-        ]
-        
-        for pattern in patterns:
-            try:
-                match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    address = match.group(1).strip()
-                    # Очистка
-                    address = address.strip('",\'«»:;.\n\r\t ')
-                    # Убираем возможный мусор в конце
-                    address = re.sub(r'\s*(далее|именуемый|именуемое).*$', '', address, flags=re.IGNORECASE)
-                    
-                    if len(address) > 5 and len(address) < 300:
-                        return address
-            except Exception:
-                continue
+        for pattern in ADDRESS_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                address = match.group(1).strip()
+                # Очистка
+                address = address.strip('",\'«»:;.\n\r\t ')
+                # Убираем возможный мусор в конце
+                address = ADDRESS_TAIL_CLEANUP.sub('', address)
+                
+                if len(address) > 5 and len(address) < 300:
+                    return address
         
         return None
     
-    def scan_contracts_directory(self):
+    def _iter_contract_files(self, names=None):
+        """
+        Файлы договоров в папке (без временных файлов Word).
+        
+        Папка читается через os.scandir: размер и время изменения приходят
+        вместе со списком файлов (на Windows — без отдельного запроса
+        к сетевому диску на каждый файл).
+        
+        Args:
+            names (set): Только файлы с этими именами (удалённые пропускаются)
+        
+        Yields:
+            tuple: (путь, os.stat_result)
+        """
+        if names is not None:
+            for name in sorted(names):
+                file_path = self.contracts_dir / name
+                try:
+                    if is_contract_file(name) and file_path.is_file():
+                        yield file_path, file_path.stat()
+                except OSError as e:
+                    app_logger.error(f"Ошибка обработки {name}: {e}")
+            return
+        
+        with os.scandir(self.contracts_dir) as entries:
+            for entry in entries:
+                if not is_contract_file(entry.name):
+                    continue
+                try:
+                    if entry.is_file():
+                        yield Path(entry.path), entry.stat()
+                except OSError as e:
+                    app_logger.error(f"Ошибка обработки {entry.name}: {e}")
+    
+    def scan_contracts_directory(self, workers=None):
         """
         Сканирует папку с договорами и извлекает данные из всех файлов
         
+        Args:
+            workers (int): Число процессов для разбора (см. resolve_workers)
+        
         Returns:
             list: Список словарей с данными договоров
         """
+        contracts_data, _, _ = self.scan_changes(workers=workers)
+        return contracts_data
+    
+    def iter_parse(self, sources, workers=None, count=None):
+        """
+        Разбирает договоры, при workers > 1 — в пуле процессов.
+        
+        Разбор упирается в процессор (распаковка docx, регулярные выражения),
+        поэтому потоки не помогают из-за GIL, а процессы масштабируются по
+        ядрам. Ошибка в одном файле не влияет на остальные.
+        
+        sources читается по мере разбора (в пул передаётся не больше
+        2*workers файлов сразу), поэтому его можно наполнять из
+        prefetch_files: чтение следующих файлов идёт параллельно с разбором.
+        
+        Args:
+            sources (iterable): Пары (путь, содержимое или None — читать с диска)
+            workers (int): Число процессов (см. resolve_workers)
+            count (int): Сколько всего файлов (если sources — не список)
+        
+        Yields:
+            tuple: (путь, данные договора или None, исключение или None)
+                по мере готовности, а не в порядке sources
+        """
+        if count is None:
+            sources = list(sources)
+            count = len(sources)
+        workers = min(resolve_workers(workers), count)
+        if workers <= 1 or count < MIN_PARALLEL_FILES:
+            for file_path, content in sources:
+                try:
+                    yield file_path, self.parse_contract(file_path, content), None
+                except Exception as e:
+                    yield file_path, None, e
+            return
+        
+        # spawn: fork из процесса с потоками (веб-сервер, GUI) может зависнуть
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {}
+            
+            def completed():
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = futures.pop(future)
+                    try:
+                        yield file_path, future.result(), None
+                    except Exception as e:
+                        yield file_path, None, e
+            
+            for file_path, content in sources:
+                future = pool.submit(_parse_in_worker, str(self.contracts_dir), str(file_path), content)
+                futures[future] = file_path
+                if len(futures) >= 2 * workers:
+                    yield from completed()
+            while futures:
+                yield from completed()
+    
+    def iter_scan(self, manifest=None, contracts=None, workers=None, io_threads=DEFAULT_IO_THREADS, names=None):
+        """
+        Инкрементальное сканирование папки с договорами с выдачей
+        результата по каждому файлу сразу, как только он готов.
+        
+        Разбираются только новые и изменённые файлы. Файл считается
+        неизменённым, если совпадают размер и время изменения; если они
+        отличаются, но совпадает SHA-256 содержимого (файл скопировали
+        или «тронули»), прежний результат тоже используется повторно.
+        
+        Остальные файлы читаются с опережением в io_threads потоков
+        (см. prefetch_files) по одному разу: по прочитанному содержимому
+        считается SHA-256 и оно же разбирается, повторно к диску никто не
+        обращается. Сначала выдаются неизменённые по манифесту файлы,
+        затем остальные — в порядке готовности (при workers > 1 — не
+        в порядке папки).
+        
+        Args:
+            manifest (dict): Манифест прошлого сканирования
+                {путь: {'size', 'mtime_ns', 'sha256', 'parsed'}}
+            contracts (list): Договоры прошлого сканирования
+            workers (int): Число процессов для разбора (см. resolve_workers)
+            io_threads (int): Потоков чтения файлов (1 — читать по очереди)
+            names (set): Проверить только файлы с этими именами (см. _iter_contract_files)
+        
+        Yields:
+            ScanEvent: результат по одному файлу и счётчики прогресса
+        """
+        manifest = manifest or {}
         if not self.contracts_dir.exists():
             app_logger.warning(f"Папка с договорами не найдена: {self.contracts_dir}")
-            return []
+            return
         
-        contracts_data = []
-        total_files = 0
+        previous = {contract.get('file_path'): contract for contract in contracts or []}
+        files = list(self._iter_contract_files(names))
+        total = len(files)
+        done = 0
+        pending = {}  # путь -> (номер в папке, запись манифеста, stat)
         
-        # Ищем все .docx файлы
-        for file_path in self.contracts_dir.glob("*.docx"):
-            # Пропускаем временные файлы Word
-            if file_path.name.startswith('~$'):
-                continue
+        for index, (file_path, stat) in enumerate(files):
+            key = str(file_path)
+            entry = manifest.get(key)
+            if entry and entry.get('parsed') and key not in previous:
+                # Манифест и список договоров разошлись — разбираем заново
+                entry = None
             
-            total_files += 1
-            
-            try:
-                data = self.parse_contract(file_path)
-                if data and data.get('customer'):  # Добавляем только если нашли заказчика
-                    contracts_data.append(data)
-            except Exception as e:
-                app_logger.error(f"Ошибка обработки {file_path.name}: {e}")
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                done += 1
+                data = previous.get(key) if entry['parsed'] else None
+                yield ScanEvent(index, total, done, file_path, 'unchanged', data,
+                                _manifest_entry(stat, entry['sha256'], data))
+            else:
+                pending[key] = (index, entry, stat)
+        
+        # Файлы, совпавшие с манифестом по SHA-256, выдаются между
+        # результатами разбора: генератор sources наполняет очередь,
+        # цикл ниже её опустошает
+        events = deque()
+        hashes = {}
+        
+        def sources():
+            nonlocal done
+            for file_path, content, error in prefetch_files([Path(key) for key in pending], io_threads):
+                key = str(file_path)
+                index, entry, stat = pending[key]
+                if error is not None:
+                    app_logger.error(f"Ошибка обработки {file_path.name}: {error}")
+                    done += 1
+                    # Временная ошибка чтения (сбой сетевого диска, файл открыт
+                    # в Word) не удаляет известный договор из базы: остаются
+                    # прежние данные и запись манифеста, а так как размер или
+                    # время изменения не совпадают с ней, файл будет прочитан
+                    # при следующем сканировании
+                    data = previous.get(key) if entry and entry['parsed'] else None
+                    events.append(ScanEvent(index, total, done, file_path, 'error', data, entry, error=str(error)))
+                    continue
+                sha256 = hashlib.sha256(content).hexdigest()
+                if entry and entry['sha256'] == sha256:
+                    done += 1
+                    data = previous.get(key) if entry['parsed'] else None
+                    events.append(ScanEvent(index, total, done, file_path, 'unchanged', data,
+                                            _manifest_entry(stat, sha256, data)))
+                    continue
+                hashes[key] = sha256
+                yield file_path, content
+        
+        for file_path, data, error in self.iter_parse(sources(), workers, count=len(pending)):
+            while events:
+                yield events.popleft()
+            key = str(file_path)
+            index, entry, stat = pending[key]
+            status = 'changed' if entry or key in manifest else 'added'
+            done += 1
+            if error is not None:
+                # Файл не попадает в манифест и будет разобран в следующий раз
+                app_logger.error(f"Ошибка обработки {file_path.name}: {error}")
+                yield ScanEvent(index, total, done, file_path, status, error=str(error))
                 continue
+            if not (data and data.get('customer')):
+                # Без заказчика договор не попадает в базу, но в манифест
+                # записывается: пока файл не изменится, разбирать его незачем
+                data = None
+            yield ScanEvent(index, total, done, file_path, status, data, _manifest_entry(stat, hashes.pop(key), data))
+        while events:
+            yield events.popleft()
+    
+    def scan_changes(self, manifest=None, contracts=None, workers=None, progress=None,
+                     io_threads=DEFAULT_IO_THREADS):
+        """
+        Инкрементальное сканирование папки с договорами (см. iter_scan)
         
-        app_logger.info(f"Обработано файлов: {total_files}, успешно извлечено: {len(contracts_data)}")
-        return contracts_data
-
+        Args:
+            manifest (dict): Манифест прошлого сканирования
+            contracts (list): Договоры прошлого сканирования
+            workers (int): Число процессов для разбора (см. resolve_workers)
+            progress (callable): Вызывается с каждым ScanEvent по ходу сканирования
+                (только в нём у договоров есть 'text')
+            io_threads (int): Потоков чтения файлов (см. prefetch_files)
+        
+        Returns:
+            tuple: (список договоров в порядке файлов в папке, без 'text', новый манифест,
+                статистика {'added', 'changed', 'unchanged', 'removed', 'failed'})
+        """
+        manifest = manifest or {}
+        stats = {'added': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        events = []
+        for event in self.iter_scan(manifest, contracts, workers, io_threads):
+            if event.status in stats:
+                stats[event.status] += 1
+            if event.status == 'error' or (event.contract is None and event.status != 'unchanged'):
+                stats['failed'] += 1
+            events.append(event)
+            if progress is not None:
+                progress(event)
+        
+        # Порядок файлов в папке сохраняется в результате независимо от
+        # того, в каком порядке их разобрали процессы
+        events.sort(key=lambda event: event.index)
+        contracts_data = [event.contract for event in events if event.contract is not None]
+        # Текст нужен только полнотекстовому индексу, в базе и у вызывающих
+        # (scan_contracts_directory) он не хранится
+        for contract in contracts_data:
+            contract.pop('text', None)
+        new_manifest = {
+            str(event.file_path): event.manifest_entry for event in events if event.manifest_entry is not None
+        }
+        
+        stats['removed'] = len(manifest.keys() - new_manifest.keys())
+        app_logger.info(
+            f"Обработано файлов: {len(new_manifest)} (новых: {stats['added']}, изменённых: {stats['changed']}, "
+            f"без изменений: {stats['unchanged']}, удалено: {stats['removed']}), "
+            f"успешно извлечено: {len(contracts_data)}"
+        )
+        return contracts_data, new_manifest, stats
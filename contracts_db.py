@@ -2,11 +2,19 @@
 Модуль для управления базой данных договоров
 """
 import json
+import os
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
+from contracts_index import ContractsSearchIndex
+from customer_index import CustomerIndex
 from logger import app_logger
 import config
 
+# Как часто во время сканирования папки новые договоры становятся видны поиску (секунды)
+LIVE_PUBLISH_INTERVAL = 0.5
+
 
 class ContractsDatabase:
     """Класс для управления базой договоров"""
@@ -14,12 +22,37 @@ class ContractsDatabase:
     def __init__(self):
         config.ensure_directories()
         self.db_file = config.WORK_DIR / "contracts_db.json"
+        # Текст договоров хранится только в полнотекстовом индексе, не в JSON
+        self.search_index = ContractsSearchIndex(config.WORK_DIR / "contracts_index.sqlite3")
+        self._save_lock = threading.Lock()
+        # Обновления из папки (по расписанию, кнопкой, от наблюдателя) по очереди,
+        # иначе одно из двух параллельных обновлений потеряется
+        self._refresh_lock = threading.Lock()
+        self._loaded_mtime = None
+        # Подмена базы и обновление индекса заказчиков — одна операция:
+        # читатели видят индекс, соответствующий текущему self.data
+        self._data_lock = threading.RLock()
+        self.customer_index = CustomerIndex()
         self.data = self._load_db()
     
+    @property
+    def data(self):
+        """Содержимое базы: {'contracts': [...], 'manifest': {...}, 'last_updated': ...}"""
+        return self._data
+    
+    @data.setter
+    def data(self, value):
+        # База всегда подменяется целиком; индекс заказчиков обновляется
+        # только по договорам, которые отличаются от прежних
+        with self._data_lock:
+            self.customer_index.sync(value.get("contracts", []))
+            self._data = value
+    
     def _load_db(self):
         """Загружает базу из файла"""
         try:
             if self.db_file.exists():
+                self._loaded_mtime = self.db_file.stat().st_mtime
                 with open(self.db_file, 'r', encoding='utf-8') as f:
                     return json.load(f)
             return {"contracts": [], "last_updated": None}
@@ -28,68 +61,263 @@ class ContractsDatabase:
             return {"contracts": [], "last_updated": None}
     
     def _save_db(self):
-        """Сохраняет базу в файл"""
+        """Сохраняет базу в файл (через временный файл, чтобы читатели не видели его частично)"""
         try:
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            with self._save_lock:
+                tmp_file = self.db_file.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, self.db_file)
+                self._loaded_mtime = self.db_file.stat().st_mtime
             app_logger.info("База договоров сохранена")
         except Exception as e:
             app_logger.error(f"Ошибка при сохранении базы договоров: {e}")
     
-    def update_contracts(self, contracts_list):
+    def update_contracts(self, contracts_list, manifest=None):
         """
-        Обновляет базу договоров
+        Обновляет базу договоров.
+        
+        Новые данные собираются в отдельный словарь и подменяются одной
+        операцией присваивания, поэтому параллельные поиски видят либо
+        старый, либо новый индекс целиком.
         
         Args:
             contracts_list (list): Список данных договоров
+            manifest (dict): Манифест файлов, из которых получен список
+                (см. ContractParser.scan_changes). Без манифеста следующее
+                обновление из папки разберёт все файлы заново.
         """
-        self.data["contracts"] = contracts_list
-        self.data["last_updated"] = datetime.now().isoformat()
+        self.data = {
+            **self.data,
+            "contracts": list(contracts_list),
+            "manifest": dict(manifest or {}),
+            "last_updated": datetime.now().isoformat(),
+        }
         self._save_db()
         app_logger.info(f"База обновлена, договоров: {len(contracts_list)}")
     
+    def reload_if_changed(self):
+        """
+        Перечитывает базу с диска, если файл был изменён другим процессом
+        
+        Returns:
+            bool: True, если база была перечитана
+        """
+        try:
+            mtime = self.db_file.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self._loaded_mtime:
+            return False
+        self.data = self._load_db()
+        app_logger.info(f"База договоров перечитана с диска, договоров: {len(self.data.get('contracts', []))}")
+        return True
+    
+    def refresh_from_directory(self, directory, progress=None):
+        """
+        Обновляет базу из папки с договорами.
+        
+        Разбираются только новые и изменённые файлы (по манифесту с
+        размером, временем изменения и SHA-256 каждого файла), записи
+        неизменённых договоров переиспользуются, удалённые — убираются.
+        Если ничего не изменилось, файл базы не перезаписывается.
+        
+        Пока идёт сканирование, найденные договоры раз в
+        LIVE_PUBLISH_INTERVAL секунд становятся видны поиску и
+        автозаполнению; на диск база записывается один раз в конце.
+        
+        Полнотекстовый индекс обновляется вместе с базой. Договоры, которых
+        в индексе нет (например, база создана до появления индекса),
+        разбираются заново, даже если файл не менялся.
+        
+        Если папка недоступна или договоры не найдены, текущая база
+        сохраняется без изменений.
+        
+        Args:
+            directory (str or Path): Папка с договорами
+            progress (callable): Вызывается с каждым ScanEvent по ходу сканирования
+        
+        Returns:
+            bool: True, если база соответствует папке (обновлена или
+                изменений не было)
+        """
+        from contract_parser import ContractParser
+        
+        with self._refresh_lock:
+            return self._refresh_from_directory(ContractParser(directory), progress)
+    
+    def _refresh_from_directory(self, parser, progress):
+        directory = parser.contracts_dir
+        data = self.data
+        live = {contract.get("file_path"): contract for contract in data.get("contracts", [])}
+        last_publish = time.monotonic()
+        texts = {}
+        
+        manifest = data.get("manifest") or {}
+        if manifest and self.search_index.available:
+            indexed = self.search_index.indexed_paths()
+            missing = {key for key, entry in manifest.items() if entry.get("parsed") and key not in indexed}
+            if missing:
+                app_logger.info(f"Договоров нет в полнотекстовом индексе: {len(missing)}, они будут разобраны заново")
+                manifest = {key: entry for key, entry in manifest.items() if key not in missing}
+        
+        def on_event(event):
+            nonlocal last_publish
+            key = str(event.file_path)
+            if event.contract is not None:
+                text = event.contract.pop("text", None)
+                if text is not None:
+                    texts[key] = text
+                live[key] = event.contract
+            elif event.status != "unchanged":
+                live.pop(key, None)
+            now = time.monotonic()
+            if event.status != "unchanged" and now - last_publish >= LIVE_PUBLISH_INTERVAL:
+                self.data = {**self.data, "contracts": list(live.values())}
+                last_publish = now
+            if progress is not None:
+                progress(event)
+        
+        contracts, manifest, _ = parser.scan_changes(
+            manifest, data.get("contracts"),
+            workers=config.CONTRACTS_SCAN_WORKERS, progress=on_event,
+            io_threads=config.CONTRACTS_IO_THREADS,
+        )
+        if not contracts:
+            self.data = data
+            app_logger.warning(f"Обновление базы договоров пропущено: договоры не найдены в {directory}")
+            return False
+        self.search_index.update(
+            [(contract, texts[contract["file_path"]]) for contract in contracts if contract["file_path"] in texts],
+            keep={contract["file_path"] for contract in contracts},
+        )
+        if manifest == data.get("manifest") and contracts == data.get("contracts"):
+            self.data = data
+            app_logger.info(f"База договоров актуальна, договоров: {len(contracts)}")
+            return True
+        self.update_contracts(contracts, manifest)
+        return True
+    
+    def refresh_files(self, directory, names):
+        """
+        Обновляет в базе только указанные файлы папки с договорами.
+        
+        Новые и изменённые файлы разбираются (с проверкой по манифесту,
+        как в refresh_from_directory), записи удалённых и переставших
+        быть договорами файлов убираются, остальная база не трогается.
+        
+        Args:
+            directory (str or Path): Папка с договорами
+            names (iterable): Имена файлов в папке
+        
+        Returns:
+            bool: True, если база изменилась
+        """
+        from contract_parser import ContractParser
+        
+        names = set(names)
+        if not names:
+            return False
+        parser = ContractParser(directory)
+        with self._refresh_lock:
+            data = self.data
+            contracts = {contract.get("file_path"): contract for contract in data.get("contracts", [])}
+            manifest = dict(data.get("manifest") or {})
+            affected = {str(parser.contracts_dir / name) for name in names}
+            
+            seen = set()
+            texts = {}
+            for event in parser.iter_scan(
+                {key: manifest[key] for key in affected if key in manifest},
+                [contracts[key] for key in affected if key in contracts],
+                workers=1, io_threads=config.CONTRACTS_IO_THREADS, names=names,
+            ):
+                key = str(event.file_path)
+                seen.add(key)
+                if event.manifest_entry is None:
+                    # Файл не прочитан (например, ещё копируется) — разберём при следующем изменении
+                    manifest.pop(key, None)
+                else:
+                    manifest[key] = event.manifest_entry
+                if event.contract is not None:
+                    text = event.contract.pop("text", None)
+                    if text is not None:
+                        texts[key] = text
+                    contracts[key] = event.contract
+                else:
+                    contracts.pop(key, None)
+            for key in affected - seen:
+                manifest.pop(key, None)
+                contracts.pop(key, None)
+            self.search_index.update(
+                [(contracts[key], text) for key, text in texts.items() if key in contracts],
+                remove=affected - contracts.keys(),
+            )
+            
+            new_contracts = list(contracts.values())
+            if new_contracts == data.get("contracts") and manifest == (data.get("manifest") or {}):
+                return False
+            self.update_contracts(new_contracts, manifest)
+            return True
+    
     def get_all_customers(self):
         """Возвращает список всех уникальных заказчиков"""
-        customers = []
-        for contract in self.data.get("contracts", []):
-            customer = contract.get("customer")
-            if customer and customer not in customers:
-                customers.append(customer)
-        return sorted(customers)
+        with self._data_lock:
+            return self.customer_index.names()
     
     def find_by_customer(self, customer_name):
         """
         Ищет договоры по названию заказчика
         
         Args:
-            customer_name (str): Название заказчика
+            customer_name (str): Название заказчика (без учёта регистра)
         
         Returns:
             list: Список договоров этого заказчика
         """
-        results = []
-        for contract in self.data.get("contracts", []):
-            if contract.get("customer", "").lower() == customer_name.lower():
-                results.append(contract)
-        return results
+        with self._data_lock:
+            return self.customer_index.contracts_for(customer_name)
     
-    def find_similar_customer(self, partial_name):
+    def find_similar_customer(self, partial_name, limit=10):
         """
-        Ищет заказчиков по частичному совпадению
+        Ищет заказчиков по нечёткому совпадению: начало или часть названия,
+        опечатки, название без кавычек или с другой формой (ООО/АО)
         
         Args:
             partial_name (str): Часть названия
+            limit (int): Сколько заказчиков вернуть
         
         Returns:
-            list: Список похожих заказчиков
+            list: Список похожих заказчиков, самые похожие первыми
         """
+        with self._data_lock:
+            return [name for name, _ in self.customer_index.search(partial_name, limit)]
+    
+    def search_contracts(self, query, limit=20, offset=0):
+        """
+        Полнотекстовый поиск договоров (по улице, наименованию объекта,
+        заказчику и тексту договора до конца пункта 1.2)
+        
+        Args:
+            query (str): Слова для поиска (в любой форме: «на улице Садовой» найдёт «ул. Садовая»)
+            limit (int): Сколько результатов вернуть
+            offset (int): Сколько лучших результатов пропустить
+        
+        Returns:
+            tuple: (сколько всего найдено, список договоров с полями
+                'snippet' — фрагмент с найденными словами — и 'rank')
+        """
+        total, hits = self.search_index.search(query, limit, offset)
+        contracts = {contract.get("file_path"): contract for contract in self.data.get("contracts", [])}
         results = []
-        partial_lower = partial_name.lower()
-        for contract in self.data.get("contracts", []):
-            customer = contract.get("customer", "")
-            if partial_lower in customer.lower() and customer not in results:
-                results.append(customer)
-        return results
+        for hit in hits:
+            # Договор уже в индексе, но другой процесс ещё не перечитал базу
+            contract = contracts.get(hit["file_path"]) or {
+                "file_name": Path(hit["file_path"]).name,
+                "file_path": hit["file_path"],
+            }
+            results.append({**contract, "snippet": hit["snippet"], "rank": hit["rank"]})
+        return total, results
     
     def get_latest_contract_for_customer(self, customer_name):
         """
@@ -109,9 +337,11 @@ class ContractsDatabase:
     
     def get_stats(self):
         """Возвращает статистику по базе"""
-        return {
-            "total_contracts": len(self.data.get("contracts", [])),
-            "unique_customers": len(self.get_all_customers()),
-            "last_updated": self.data.get("last_updated")
-        }
+        with self._data_lock:
+            data = self.data
+            return {
+                "total_contracts": len(data.get("contracts", [])),
+                "unique_customers": self.customer_index.count(),
+                "last_updated": data.get("last_updated")
+            }
 
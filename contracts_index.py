@@ -0,0 +1,172 @@
+"""
+Полнотекстовый индекс договоров (SQLite FTS5)
+"""
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from logger import app_logger
+
+# Веса колонок в ранжировании bm25: file_path (не индексируется), заказчик,
+# адрес/наименование объекта, текст договора
+RANK_WEIGHTS = (0.0, 10.0, 5.0, 1.0)
+SNIPPET_MARKERS = ("[", "]")
+SNIPPET_TOKENS = 16
+
+# Окончания, которые отбрасываются у слов запроса (от длинных к коротким):
+# «улице», «садовой», «ленина» ищутся как «улиц*», «садов*», «ленин*»
+RUSSIAN_ENDINGS = sorted([
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ая", "яя", "ое", "ее",
+    "ые", "ие", "ой", "ей", "ий", "ый", "ым", "им", "ом", "ем", "ам", "ям", "ах", "ях",
+    "ов", "ев", "ию", "ия", "ью", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+TOKEN = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """«ё» как «е»: токенизатор unicode61 приводит регистр, но эти буквы не объединяет"""
+    return (text or "").replace("ё", "е").replace("Ё", "Е")
+
+
+def stem_token(token):
+    """Основа слова для поиска по префиксу: без типичного русского окончания"""
+    if not re.search("[а-я]", token):
+        return token
+    for ending in RUSSIAN_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM_LENGTH:
+            return token[:-len(ending)]
+    return token
+
+
+def build_match_query(query):
+    """
+    Запрос FTS5 из строки пользователя: все слова обязательны, слова ищутся
+    по основе как префиксу, числа (номера домов) — точно.
+
+    Returns:
+        str или None: выражение MATCH или None, если в запросе нет слов
+    """
+    terms = []
+    for token in TOKEN.findall(normalize_text(query).lower()):
+        if token.isdigit():
+            terms.append(f'"{token}"')
+        else:
+            terms.append(f'"{stem_token(token)}"*')
+    return " ".join(terms) or None
+
+
+class ContractsSearchIndex:
+    """
+    Полнотекстовый индекс договоров в файле SQLite.
+
+    Хранит по каждому договору заказчика, адрес/наименование объекта и
+    прочитанный парсером текст (начало договора до конца пункта 1.2).
+    Файл общий для всех процессов: обновляет его тот, кто сканирует
+    папку, а искать могут все воркеры веб-сервера. Соединение
+    открывается на каждую операцию, поэтому объект можно использовать
+    из любых потоков.
+
+    Если SQLite собран без FTS5, индекс отключается (available = False).
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str or Path): Файл индекса
+        """
+        self.db_path = Path(db_path)
+        self._write_lock = threading.Lock()
+        self.available = True
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS contracts_fts USING fts5("
+                    "file_path UNINDEXED, customer, address, text, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+        except sqlite3.Error as e:
+            self.available = False
+            app_logger.error(f"Полнотекстовый индекс договоров недоступен: {e}")
+
+    @contextmanager
+    def _connect(self):
+        """Соединение на одну операцию: фиксирует транзакцию и закрывается"""
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            # WAL: поиск в других процессах не ждёт записи
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def indexed_paths(self):
+        """Пути договоров, которые есть в индексе"""
+        if not self.available:
+            return set()
+        with self._connect() as connection:
+            return {row[0] for row in connection.execute("SELECT file_path FROM contracts_fts")}
+
+    def update(self, documents=(), remove=(), keep=None):
+        """
+        Обновляет индекс одной транзакцией.
+
+        Args:
+            documents (iterable): Пары (данные договора, текст) для добавления
+                или замены (ключ — contract['file_path'])
+            remove (iterable): Пути договоров, которые нужно убрать
+            keep (set): Если задан — убрать все договоры, которых в нём нет
+        """
+        if not self.available:
+            return
+        documents = list(documents)
+        with self._write_lock, self._connect() as connection:
+            paths = {row[0] for row in connection.execute("SELECT file_path FROM contracts_fts")}
+            stale = set(remove) & paths
+            if keep is not None:
+                stale |= paths - set(keep)
+            stale |= {contract["file_path"] for contract, _ in documents} & paths
+            connection.executemany("DELETE FROM contracts_fts WHERE file_path = ?", [(path,) for path in stale])
+            connection.executemany(
+                "INSERT INTO contracts_fts (file_path, customer, address, text) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        contract["file_path"],
+                        normalize_text(contract.get("customer")),
+                        normalize_text(contract.get("object_full_address")),
+                        normalize_text(text),
+                    )
+                    for contract, text in documents
+                ],
+            )
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Ищет договоры по словам из запроса, лучшие совпадения первыми
+        (bm25, совпадение в заказчике и адресе весит больше, чем в тексте).
+
+        Returns:
+            tuple: (сколько всего найдено, список {'file_path', 'snippet', 'rank'})
+        """
+        match = build_match_query(query)
+        if match is None or not self.available:
+            return 0, []
+        with self._connect() as connection:
+            total = connection.execute(
+                "SELECT count(*) FROM contracts_fts WHERE contracts_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            if not total or offset >= total:
+                return total, []
+            rows = connection.execute(
+                f"SELECT file_path, snippet(contracts_fts, -1, ?, ?, '…', {SNIPPET_TOKENS}), "
+                f"bm25(contracts_fts, {', '.join(map(str, RANK_WEIGHTS))}) AS rank "
+                "FROM contracts_fts WHERE contracts_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                (*SNIPPET_MARKERS, match, limit, offset),
+            ).fetchall()
+        return total, [
+            {"file_path": file_path, "snippet": snippet, "rank": -rank}
+            for file_path, snippet, rank in rows
+        ]
@@ -0,0 +1,230 @@
+"""
+Наблюдение за папкой с договорами: изменённые договоры попадают в базу
+через несколько секунд, без пересканирования всей папки
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+from contract_parser import is_contract_file
+from logger import app_logger
+import config
+
+try:
+    import watchfiles
+except ImportError:  # ставится вместе с uvicorn[standard]
+    watchfiles = None
+
+# Перезапуск наблюдения после ошибки: пауза растёт от RETRY_DELAY до
+# RETRY_MAX_DELAY секунд; после NATIVE_FAILURES_BEFORE_POLLING ошибок
+# уведомлений ОС подряд наблюдатель переходит на опрос папки
+RETRY_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+NATIVE_FAILURES_BEFORE_POLLING = 3
+
+
+class ContractsWatcher:
+    """
+    Фоновый поток, который следит за папкой с договорами и обновляет в
+    ContractsDatabase только затронутые файлы (refresh_files).
+
+    Изменения берутся из уведомлений ОС через watchfiles (inotify на Linux,
+    ReadDirectoryChangesW на Windows), а если watchfiles не установлен или
+    задан polling=True (сетевые диски, где уведомления не приходят) —
+    сравнением списка файлов с размерами и временем изменения раз в
+    poll_interval секунд через os.scandir.
+
+    Изменения копятся, пока в папке не наступит тишина на debounce секунд:
+    договор, который ещё копируется или сохраняется Word, разбирается один
+    раз целиком. Временные файлы Word (~$...) и не-.docx игнорируются.
+    
+    Ошибка наблюдения (папка пропала, сбой watchfiles) не останавливает
+    поток: наблюдение перезапускается с растущей паузой, после нескольких
+    сбоев уведомлений ОС подряд — опросом папки, а изменения, пропущенные
+    за время сбоя, догоняются сверкой всех файлов папки с базой.
+    """
+
+    def __init__(self, contracts_db, directory, debounce=2.0, polling=False, poll_interval=2.0):
+        """
+        Args:
+            contracts_db (ContractsDatabase): База, которую нужно обновлять
+            directory (str or Path): Папка с договорами
+            debounce (float): Сколько секунд тишины ждать перед обновлением
+            polling (bool): Всегда опрашивать папку, не полагаясь на уведомления ОС
+            poll_interval (float): Период опроса папки в секундах
+        """
+        self.contracts_db = contracts_db
+        self.directory = Path(directory)
+        self.debounce = debounce
+        self.polling = polling or watchfiles is None
+        self.poll_interval = poll_interval
+        # Сколько раз база была обновлена наблюдателем (GUI сравнивает со своим значением)
+        self.updates = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запускает наблюдение (повторный вызов ничего не делает)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="contracts-watcher", daemon=True)
+        self._thread.start()
+        mode = "опрос папки" if self.polling else "уведомления ОС"
+        app_logger.info(f"Наблюдение за папкой договоров {self.directory} ({mode})")
+
+    def is_alive(self):
+        """Поток наблюдения работает"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout=5.0):
+        """Останавливает наблюдение и ждёт завершения потока"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self._watch()
+                if self._stop_event.is_set():
+                    return
+                error = "наблюдение завершилось само"
+            except Exception as e:
+                error = e
+            if time.monotonic() - started >= RETRY_MAX_DELAY:
+                failures = 0  # прошлые сбои были давно — начинаем отсчёт заново
+            failures += 1
+            delay = min(RETRY_DELAY * 2 ** (failures - 1), RETRY_MAX_DELAY)
+            app_logger.error(f"Наблюдение за папкой договоров прервано: {error}; перезапуск через {delay:g} с")
+            if not self.polling and failures >= NATIVE_FAILURES_BEFORE_POLLING:
+                self.polling = True
+                app_logger.warning("Уведомления ОС о папке договоров не работают, переход на опрос папки")
+            if self._stop_event.wait(delay):
+                return
+            self._resync()
+
+    def _watch(self):
+        pending = set()
+        last_change = 0.0
+        for names in self._iter_changes():
+            if self._stop_event.is_set():
+                break
+            now = time.monotonic()
+            if names:
+                pending |= names
+                last_change = now
+            if pending and now - last_change >= self.debounce:
+                self._apply(pending)
+                pending = set()
+
+    def _resync(self):
+        """Сверяет с базой все договоры папки (и известные базе), чтобы не потерять изменения за время сбоя"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return
+        directory = str(self.directory)
+        known = {
+            os.path.basename(key) for key in (self.contracts_db.data.get("manifest") or {})
+            if os.path.dirname(key) == directory
+        }
+        if snapshot.keys() | known:
+            self._apply(snapshot.keys() | known)
+
+    def _apply(self, names):
+        try:
+            if self.contracts_db.refresh_files(self.directory, names):
+                self.updates += 1
+                app_logger.info(f"База договоров обновлена по изменениям в папке: {', '.join(sorted(names))}")
+        except Exception as e:
+            app_logger.error(f"Ошибка обновления базы договоров по изменениям в папке: {e}")
+
+    def _iter_changes(self):
+        """
+        Имена изменённых файлов договоров. Пустое множество выдаётся не
+        реже раза в секунду, чтобы _run мог дождаться тишины.
+
+        Yields:
+            set: Имена файлов (созданных, изменённых или удалённых)
+        """
+        if self.polling:
+            yield from self._poll_changes()
+            return
+        for changes in watchfiles.watch(
+            self.directory,
+            watch_filter=lambda change, path: is_contract_file(os.path.basename(path)),
+            # Тишину на debounce секунд отсчитывает _run, здесь только группировка
+            debounce=500,
+            stop_event=self._stop_event,
+            rust_timeout=1000,
+            yield_on_timeout=True,
+            raise_interrupt=False,
+            recursive=False,
+        ):
+            yield {os.path.basename(path) for _, path in changes}
+
+    def _snapshot(self):
+        """{имя: (размер, время изменения)} файлов договоров в папке"""
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not is_contract_file(entry.name):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError as e:
+            # Сетевой диск недоступен: изменений не видно, ждём возвращения
+            app_logger.warning(f"Папка с договорами недоступна: {e}")
+            return None
+        return snapshot
+
+    def _poll_changes(self):
+        # Пока папка недоступна, сравниваем с последним удачным снимком
+        previous = self._snapshot()
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop_event.wait(max(0.0, min(next_poll - time.monotonic(), 1.0))):
+            if time.monotonic() < next_poll:
+                yield set()
+                continue
+            next_poll = time.monotonic() + self.poll_interval
+            current = self._snapshot()
+            if current is None or previous is None:
+                previous = previous if current is None else current
+                yield set()
+                continue
+            yield {
+                name for name in previous.keys() | current.keys()
+                if previous.get(name) != current.get(name)
+            }
+            previous = current
+
+
+def start_contracts_watcher(contracts_db):
+    """
+    Запускает наблюдение за config.EXTERNAL_CONTRACTS_DIR с настройками из config
+
+    Returns:
+        ContractsWatcher или None: наблюдение отключено или папки нет
+    """
+    if not config.CONTRACTS_WATCH:
+        return None
+    if not config.EXTERNAL_CONTRACTS_DIR.exists():
+        app_logger.warning(f"Наблюдение не запущено: папка с договорами не найдена: {config.EXTERNAL_CONTRACTS_DIR}")
+        return None
+    watcher = ContractsWatcher(
+        contracts_db,
+        config.EXTERNAL_CONTRACTS_DIR,
+        debounce=config.CONTRACTS_WATCH_DEBOUNCE,
+        polling=config.CONTRACTS_WATCH_POLLING,
+        poll_interval=config.CONTRACTS_WATCH_POLL_INTERVAL,
+    )
+    watcher.start()
+    return watcher
@@ -0,0 +1,199 @@
+"""
+Индекс заказчиков из базы договоров: точный поиск, список имён и
+нечёткий поиск по триграммам
+"""
+import heapq
+import re
+import threading
+from collections import Counter
+from itertools import chain
+
+# Организационно-правовые формы не участвуют в нечётком сравнении: они есть
+# почти у всех заказчиков и только зашумляют совпадения
+LEGAL_FORMS = {
+    "ооо", "оао", "зао", "пао", "ао", "ип", "нко", "ано", "гуп", "муп", "фгуп",
+    "гбу", "мбу", "мку", "гку", "фгбу", "мбоу", "гбоу", "тсж", "жск",
+}
+NON_WORD = re.compile(r"[^\w\s]+")
+# Минимальная доля триграмм запроса, найденных в имени
+MIN_SCORE = 0.5
+
+
+def normalize_customer(name):
+    """
+    Имя заказчика для нечёткого сравнения: нижний регистр, «ё» как «е»,
+    без кавычек, знаков препинания и организационно-правовой формы
+    (ООО «Ромашка» и ООО Ромашка дают «ромашка»)
+    """
+    text = NON_WORD.sub(" ", (name or "").lower().replace("ё", "е"))
+    return " ".join(word for word in text.split() if word not in LEGAL_FORMS)
+
+
+def trigrams(text):
+    """Триграммы слов с отступами по краям, как в pg_trgm («  р», « ро», «ром», ...)"""
+    result = set()
+    for word in text.split():
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class CustomerIndex:
+    """
+    Индекс заказчиков, который обновляется по изменённым договорам
+    (sync), а не перестраивается целиком.
+
+    Хранит договоры по имени заказчика в нижнем регистре (точный поиск),
+    отсортированный список имён и триграммы нормализованных имён с
+    обратным списком «триграмма -> имена». Нечёткий поиск просматривает
+    только имена, у которых есть общие с запросом триграммы, поэтому не
+    зависит от числа договоров.
+
+    Методы можно вызывать из разных потоков.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contracts = {}      # ключ договора -> договор
+        self._positions = {}      # ключ договора -> позиция в списке базы
+        self._by_lower = {}       # имя в нижнем регистре -> {ключ договора: договор}
+        self._name_counts = {}    # имя -> сколько договоров с ним
+        self._names_by_key = {}   # нормализованное имя -> {имя}
+        self._trigrams = {}       # нормализованное имя -> триграммы
+        self._postings = {}       # триграмма -> {нормализованное имя}
+        self._sorted_names = None
+
+    @staticmethod
+    def _contract_key(contract):
+        return contract.get("file_path") or contract.get("file_name") or id(contract)
+
+    def sync(self, contracts):
+        """
+        Приводит индекс к списку договоров: добавляет новые, убирает
+        удалённые и переиндексирует изменённые (договоры сопоставляются
+        по file_path; тот же объект договора не сравнивается по полям)
+
+        Returns:
+            int: Сколько договоров добавлено, изменено или удалено
+        """
+        current = {}
+        for contract in contracts:
+            current[self._contract_key(contract)] = contract
+        positions = {key: position for position, key in enumerate(current)}
+        changes = 0
+        with self._lock:
+            self._positions = positions
+            for key in [key for key in self._contracts if key not in current]:
+                self._remove(key)
+                changes += 1
+            for key, contract in current.items():
+                previous = self._contracts.get(key)
+                if previous is contract or (previous is not None and previous == contract):
+                    continue
+                if previous is not None:
+                    self._remove(key)
+                self._add(key, contract)
+                changes += 1
+            if changes:
+                self._sorted_names = None
+        return changes
+
+    def _add(self, key, contract):
+        self._contracts[key] = contract
+        name = contract.get("customer")
+        if not name:
+            return
+        self._by_lower.setdefault(name.lower(), {})[key] = contract
+        count = self._name_counts.get(name, 0)
+        self._name_counts[name] = count + 1
+        if count:
+            return
+        normalized = normalize_customer(name)
+        names = self._names_by_key.setdefault(normalized, set())
+        names.add(name)
+        if len(names) == 1 and normalized:
+            grams = trigrams(normalized)
+            self._trigrams[normalized] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(normalized)
+
+    def _remove(self, key):
+        contract = self._contracts.pop(key)
+        name = contract.get("customer")
+        if not name:
+            return
+        same_name = self._by_lower[name.lower()]
+        del same_name[key]
+        if not same_name:
+            del self._by_lower[name.lower()]
+        count = self._name_counts.pop(name) - 1
+        if count:
+            self._name_counts[name] = count
+            return
+        normalized = normalize_customer(name)
+        names = self._names_by_key[normalized]
+        names.discard(name)
+        if names:
+            return
+        del self._names_by_key[normalized]
+        for gram in self._trigrams.pop(normalized, ()):
+            postings = self._postings[gram]
+            postings.discard(normalized)
+            if not postings:
+                del self._postings[gram]
+
+    def names(self):
+        """Уникальные имена заказчиков по алфавиту"""
+        with self._lock:
+            if self._sorted_names is None:
+                self._sorted_names = sorted(self._name_counts)
+            return list(self._sorted_names)
+
+    def count(self):
+        """Сколько уникальных заказчиков"""
+        return len(self._name_counts)
+
+    def contracts_for(self, name):
+        """
+        Договоры заказчика (имя без учёта регистра) в том же порядке, что и
+        в базе: изменённый договор переиндексируется последним, но место в
+        списке сохраняет
+        """
+        with self._lock:
+            same_name = self._by_lower.get((name or "").lower(), {})
+            return [same_name[key] for key in sorted(same_name, key=self._positions.__getitem__)]
+
+    def search(self, query, limit=10, min_score=MIN_SCORE):
+        """
+        Нечёткий поиск заказчиков: опечатки, пропущенные кавычки,
+        другая форма (ООО/АО) и начало названия.
+
+        Оценка — доля триграмм запроса, найденных в имени (1.0, если запрос
+        целиком входит в имя); при равенстве выше имя, более похожее
+        целиком (коэффициент Жаккара).
+
+        Returns:
+            list: До limit пар (имя, оценка от 0 до 1), лучшие первыми
+        """
+        normalized = normalize_customer(query)
+        grams = trigrams(normalized)
+        if not grams:
+            return []
+        # Запрос, целиком входящий в имя, делит с ним все триграммы, кроме
+        # краевых (не больше трёх на слово); остальные кандидаты отсекаются
+        # по числу общих триграмм до вычисления оценки
+        threshold = min(min_score * len(grams), len(grams) - 3 * len(normalized.split()))
+        with self._lock:
+            shared = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+            scored = []
+            for key, common in shared.items():
+                if common < threshold:
+                    continue
+                coverage = 1.0 if normalized in key else common / len(grams)
+                if coverage < min_score:
+                    continue
+                jaccard = common / (len(grams) + len(self._trigrams[key]) - common)
+                for name in self._names_by_key[key]:
+                    scored.append((coverage, jaccard, name))
+        best = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], -item[1], item[2]))
+        return [(name, round(coverage, 3)) for coverage, _, name in best]
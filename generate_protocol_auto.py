@@ -1,15 +1,15 @@
 """
-Скрипт для автоматической генерации протокола через веб-API
+Скрипт для автоматической генерации протокола через веб-API.
+Для пакетной генерации из файлов JSON/JSONL — api_client.py
 """
-import requests
-import json
-import time
 import os
 import sys
-import re
 from pathlib import Path
 from datetime import datetime
 
+import config
+from api_client import DEFAULT_API_URL, ProtocolApiClient
+
 # Настройка кодировки для Windows
 if sys.platform == 'win32':
     import io
@@ -52,112 +52,27 @@ PROTOCOL_DATA = {
     "project_number": ""
 }
 
-API_URL = "http://localhost:8000"
-
-
-def wait_for_server(max_attempts=30):
-    """Ждет пока сервер запустится"""
-    print("Ожидание запуска сервера...")
-    for i in range(max_attempts):
-        try:
-            response = requests.get(f"{API_URL}/", timeout=2)
-            if response.status_code == 200:
-                print("[OK] Сервер запущен")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        time.sleep(0.5)
-    return False
+API_URL = DEFAULT_API_URL
 
 
-def generate_protocol():
+def generate_protocol(client: ProtocolApiClient):
     """Генерирует протокол через API"""
     print("\n=== Генерация протокола ===")
     print(f"Тип: {PROTOCOL_DATA['protocol_type']}")
     print(f"Дата: {PROTOCOL_DATA['date']}")
     print(f"Количество точек крепления: {PROTOCOL_DATA['mount_points']}")
     print(f"Маршей: {len(PROTOCOL_DATA['marches'])}")
-    
-    # Валидация
-    print("\nВалидация данных...")
-    try:
-        validate_response = requests.post(
-            f"{API_URL}/api/validate",
-            json=PROTOCOL_DATA,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        
-        if validate_response.status_code != 200:
-            print(f"[ERROR] Ошибка валидации: {validate_response.status_code}")
-            print(validate_response.text)
-            return None
-        
-        validate_result = validate_response.json()
-        if not validate_result.get("valid", False):
-            print(f"[ERROR] Валидация не пройдена:")
-            for error in validate_result.get("errors", []):
-                print(f"  - {error}")
-            return None
-        
-        print("[OK] Валидация пройдена")
-    except Exception as e:
-        print(f"⚠ Ошибка валидации (продолжаем): {e}")
-    
-    # Генерация
-    print("\nГенерация документа...")
-    try:
-        generate_response = requests.post(
-            f"{API_URL}/api/generate",
-            json=PROTOCOL_DATA,
-            headers={"Content-Type": "application/json"},
-            timeout=60
-        )
-        
-        if generate_response.status_code != 200:
-            print(f"[ERROR] Ошибка генерации: {generate_response.status_code}")
-            try:
-                error_data = generate_response.json()
-                print(json.dumps(error_data, indent=2, ensure_ascii=False))
-            except:
-                print(generate_response.text)
-            return None
-        
-        # Сохранение файла
-        content_disposition = generate_response.headers.get("Content-Disposition", "")
-        filename = "report.docx"
-        
-        # Парсинг имени файла из заголовка
-        if "filename*=" in content_disposition:
-            match = re.search(r"filename\*=([^']+)''(.+?)(?:;|$)", content_disposition, re.I)
-            if match:
-                try:
-                    filename = requests.utils.unquote(match.group(2))
-                except:
-                    pass
-        elif "filename=" in content_disposition:
-            match = re.search(r'filename=([^;]+)', content_disposition, re.I)
-            if match:
-                filename = match.group(1).strip('"\'')
-        
-        # Определяем путь для сохранения
-        reports_dir = Path(__file__).parent / "work_data" / "отчёты"
-        reports_dir.mkdir(parents=True, exist_ok=True)
-        
-        filepath = reports_dir / filename
-        
-        with open(filepath, "wb") as f:
-            f.write(generate_response.content)
-        
-        print(f"[OK] Документ сохранен: {filepath}")
-        return filepath
-        
-    except Exception as e:
-        print(f"[ERROR] Ошибка генерации: {e}")
-        import traceback
-        traceback.print_exc()
+
+    # Сервер проверяет данные сам и при ошибках отвечает 400 со списком
+    result = client.generate(PROTOCOL_DATA, config.REPORTS_DIR, source="PROTOCOL_DATA")
+    if not result.ok:
+        print(f"[ERROR] Ошибка генерации: {result.status or '-'} {result.error}")
         return None
 
+    filepath = Path(result.path)
+    print(f"[OK] Документ сохранен: {filepath}")
+    return filepath
+
 
 def open_file(filepath):
     """Открывает файл в системе"""
@@ -178,11 +93,15 @@ if __name__ == "__main__":
     print("Автоматическая генерация протокола")
     print("=" * 60)
     
-    if not wait_for_server():
+    client = ProtocolApiClient(API_URL, concurrency=1, priority="interactive")
+    print("Ожидание запуска сервера...")
+    if not client.wait_until_ready():
         print("[ERROR] Сервер не запустился. Убедитесь, что start_web.py запущен.")
         exit(1)
+    print("[OK] Сервер запущен")
     
-    filepath = generate_protocol()
+    filepath = generate_protocol(client)
+    client.close()
     
     if filepath:
         open_file(filepath)
@@ -3,6 +3,7 @@
 """
 from __future__ import annotations
 
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Iterable, Sequence
@@ -22,6 +23,8 @@ class BaseProtocolGenerator(ABC):
     def __init__(self, data: dict | None):
         self.data = data or {}
         self.document: Document | None = None
+        # Длительность последнего сохранения документа (секунды)
+        self.save_duration: float = 0.0
         config.ensure_directories()
 
     @abstractmethod
@@ -244,4 +247,9 @@ class BaseProtocolGenerator(ABC):
         path.parent.mkdir(parents=True, exist_ok=True)
         return path
 
-
+    def _save_document(self, path: str | Path) -> None:
+        start = time.perf_counter()
+        try:
+            self.document.save(str(path))
+        finally:
+            self.save_duration = time.perf_counter() - start
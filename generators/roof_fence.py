@@ -52,7 +52,7 @@ class RoofFenceGenerator(BaseProtocolGenerator):
 
         filename = self._generate_filename("Protocol_roof")
         output = self._resolve_output_path(output_path, filename)
-        self.document.save(str(output))
+        self._save_document(output)
         return str(output)
 
     # --- Разделы документа -----------------------------------------------------
@@ -158,7 +158,7 @@ class StairLadderGenerator(BaseProtocolGenerator):
 
         filename = self._generate_filename("Protocol_stair")
         output = self._resolve_output_path(output_path, filename)
-        self.document.save(str(output))
+        self._save_document(output)
         return str(output)
 
     # --- Разделы документа -----------------------------------------------------
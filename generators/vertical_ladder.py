@@ -112,7 +112,7 @@ class VerticalLadderGenerator(BaseProtocolGenerator):
             # Сохранение файла
             filename = self._generate_filename(data)
             filepath = self._resolve_output_path(output_path, filename)
-            self.document.save(str(filepath))
+            self._save_document(filepath)
             
             app_logger.info(f"Документ успешно создан: {filepath}")
             return str(filepath)
@@ -6,20 +6,28 @@ from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
 from datetime import datetime
 import os
+import queue
 import subprocess
 import sys
+import threading
+import time
 
 from document_generator import DocumentGenerator
 from history_manager import HistoryManager
 from validator import DataValidator
-from contract_parser import ContractParser
 from contracts_db import ContractsDatabase
+from contracts_watcher import start_contracts_watcher
 from ladder_manager import LaddersManager
 from march_manager import MarchesManager
 from weather_service import WeatherService
 from logger import app_logger
 import config
 
+# Как часто окно забирает события фонового сканирования договоров (мс)
+CONTRACTS_SCAN_POLL_MS = 200
+# Как часто окно проверяет, не обновил ли базу наблюдатель за папкой (мс)
+CONTRACTS_WATCH_POLL_MS = 1000
+
 
 class DynamicTable(tk.Frame):
     """Виджет динамической таблицы"""
@@ -885,27 +893,104 @@ class MainApplication(tk.Tk):
         self._update_protocol_sections_visibility()
         self._update_visual_inspection_label()
     
-    def _auto_update_contracts_database(self):
-        """Автоматически обновляет базу договоров при запуске (без диалоговых окон)"""
+    def _start_contracts_scan(self, on_finish):
+        """
+        Запускает обновление базы договоров в фоновом потоке.
+        
+        Окно не блокируется: ход сканирования виден в статус-баре, а
+        список заказчиков пополняется по мере разбора договоров.
+        
+        Args:
+            on_finish (callable): Вызывается в потоке интерфейса с
+                (база обновлена: bool, ошибка: Exception или None)
+        
+        Returns:
+            bool: False, если сканирование уже идёт
+        """
+        thread = getattr(self, '_contracts_scan_thread', None)
+        if thread is not None and thread.is_alive():
+            return False
+        
+        events = queue.Queue()
+        
+        def worker():
+            try:
+                updated = self.contracts_db.refresh_from_directory(
+                    config.EXTERNAL_CONTRACTS_DIR, progress=events.put
+                )
+                events.put((updated, None))
+            except Exception as e:
+                events.put((False, e))
+        
+        self._contracts_scan_thread = threading.Thread(target=worker, name="contracts-scan", daemon=True)
+        self._contracts_scan_thread.start()
+        self.after(CONTRACTS_SCAN_POLL_MS, self._poll_contracts_scan, events, on_finish, time.monotonic())
+        return True
+    
+    def _poll_contracts_scan(self, events, on_finish, customers_refreshed):
+        """Забирает события фонового сканирования (вызывается через after)"""
+        last_event = None
+        new_contracts = False
+        result = None
         try:
-            # Проверяем существование папки
-            if not config.EXTERNAL_CONTRACTS_DIR.exists():
-                app_logger.warning(f"Папка с договорами не найдена: {config.EXTERNAL_CONTRACTS_DIR}")
+            while True:
+                item = events.get_nowait()
+                if isinstance(item, tuple):
+                    result = item
+                    break
+                last_event = item
+                new_contracts = new_contracts or (item.contract is not None and item.status != 'unchanged')
+        except queue.Empty:
+            pass
+        
+        if result is not None:
+            on_finish(*result)
+            return
+        
+        if last_event is not None:
+            self._update_status(f"Сканирование договоров: {last_event.done} из {last_event.total}")
+        # Список заказчиков обновляем не чаще раза в секунду
+        if new_contracts and time.monotonic() - customers_refreshed >= 1.0:
+            self._update_customer_list()
+            customers_refreshed = time.monotonic()
+        self.after(CONTRACTS_SCAN_POLL_MS, self._poll_contracts_scan, events, on_finish, customers_refreshed)
+    
+    def _start_contracts_watcher(self):
+        """Запускает наблюдение за папкой с договорами (см. ContractsWatcher)"""
+        if getattr(self, '_contracts_watcher', None) is not None:
+            return
+        self._contracts_watcher = start_contracts_watcher(self.contracts_db)
+        if self._contracts_watcher is not None:
+            self.after(CONTRACTS_WATCH_POLL_MS, self._poll_contracts_watcher, 0)
+    
+    def _poll_contracts_watcher(self, seen_updates):
+        """Обновляет список заказчиков, если наблюдатель изменил базу (вызывается через after)"""
+        updates = self._contracts_watcher.updates
+        if updates != seen_updates:
+            self._update_customer_list()
+        self.after(CONTRACTS_WATCH_POLL_MS, self._poll_contracts_watcher, updates)
+    
+    def _auto_update_contracts_database(self):
+        """Автоматически обновляет базу договоров при запуске (в фоне, без диалоговых окон)"""
+        # Проверяем существование папки
+        if not config.EXTERNAL_CONTRACTS_DIR.exists():
+            app_logger.warning(f"Папка с договорами не найдена: {config.EXTERNAL_CONTRACTS_DIR}")
+            return
+        
+        app_logger.info("Автоматическое обновление базы договоров...")
+        
+        def on_finish(updated, error):
+            # Дальше новые и изменённые договоры подхватываются без пересканирования
+            self._start_contracts_watcher()
+            if error is not None:
+                # Не показываем диалоговое окно, только логируем
+                app_logger.error(f"Ошибка автоматического обновления базы договоров: {error}")
+                self._update_status("Ошибка обновления базы")
                 return
-            
-            app_logger.info("Автоматическое обновление базы договоров...")
-            
-            # Парсим договоры
-            parser = ContractParser(config.EXTERNAL_CONTRACTS_DIR)
-            contracts_data = parser.scan_contracts_directory()
-            
-            if not contracts_data:
-                app_logger.warning(f"В папке {config.EXTERNAL_CONTRACTS_DIR} не найдено договоров")
+            if not updated:
+                self._update_status("Договоры не найдены")
                 return
             
-            # Обновляем базу
-            self.contracts_db.update_contracts(contracts_data)
-            
             # Обновляем список заказчиков в combobox
             self._update_customer_list()
             
@@ -914,32 +999,28 @@ class MainApplication(tk.Tk):
             
             # Обновляем статус-бар
             self._update_status(f"База обновлена: {stats['total_contracts']} договоров")
-            
-        except Exception as e:
-            app_logger.error(f"Ошибка автоматического обновления базы договоров: {e}")
-            # Не показываем диалоговое окно, только логируем
+        
+        # Разбираем только новые и изменённые договоры
+        self._start_contracts_scan(on_finish)
     
     def _update_contracts_database(self):
         """Обновляет базу договоров из внешней папки (ручное обновление с диалогами)"""
-        try:
-            # Проверяем существование папки
-            if not config.EXTERNAL_CONTRACTS_DIR.exists():
-                messagebox.showerror(
-                    "Ошибка", 
-                    f"Папка с договорами не найдена:\n{config.EXTERNAL_CONTRACTS_DIR}\n\n"
-                    f"Укажите правильный путь в файле config.py"
-                )
+        # Проверяем существование папки
+        if not config.EXTERNAL_CONTRACTS_DIR.exists():
+            messagebox.showerror(
+                "Ошибка", 
+                f"Папка с договорами не найдена:\n{config.EXTERNAL_CONTRACTS_DIR}\n\n"
+                f"Укажите правильный путь в файле config.py"
+            )
+            return
+        
+        def on_finish(updated, error):
+            if error is not None:
+                messagebox.showerror("Ошибка", f"Не удалось обновить базу:\n{str(error)}")
+                app_logger.error(f"Ошибка обновления базы договоров: {error}")
+                self._update_status("Ошибка обновления базы")
                 return
-            
-            # Показываем прогресс
-            self._update_status("Сканирование папки с договорами...")
-            self.update()
-            
-            # Парсим договоры
-            parser = ContractParser(config.EXTERNAL_CONTRACTS_DIR)
-            contracts_data = parser.scan_contracts_directory()
-            
-            if not contracts_data:
+            if not updated:
                 messagebox.showwarning(
                     "Предупреждение",
                     f"В папке {config.EXTERNAL_CONTRACTS_DIR}\n"
@@ -948,9 +1029,6 @@ class MainApplication(tk.Tk):
                 self._update_status("Договоры не найдены")
                 return
             
-            # Обновляем базу
-            self.contracts_db.update_contracts(contracts_data)
-            
             # Обновляем список заказчиков в combobox
             self._update_customer_list()
             
@@ -965,12 +1043,12 @@ class MainApplication(tk.Tk):
             
             self._update_status(f"База обновлена: {stats['total_contracts']} договоров")
             app_logger.info(f"База договоров обновлена: {stats}")
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось обновить базу:\n{str(e)}")
-            app_logger.error(f"Ошибка обновления базы договоров: {e}")
-            self._update_status("Ошибка обновления базы")
-    
+        
+        # Показываем прогресс
+        self._update_status("Сканирование папки с договорами...")
+        if not self._start_contracts_scan(on_finish):
+            self._update_status("Сканирование договоров уже идёт...")
+
     def _load_contract(self):
         """Загружает договор вручную"""
         file_path = filedialog.askopenfilename(
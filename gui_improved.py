@@ -512,6 +512,10 @@ from gui import MainApplication
 ImprovedMainApplication._on_customer_selected = MainApplication._on_customer_selected
 ImprovedMainApplication._update_contracts_database = MainApplication._update_contracts_database
 ImprovedMainApplication._auto_update_contracts_database = MainApplication._auto_update_contracts_database
+ImprovedMainApplication._start_contracts_scan = MainApplication._start_contracts_scan
+ImprovedMainApplication._poll_contracts_scan = MainApplication._poll_contracts_scan
+ImprovedMainApplication._start_contracts_watcher = MainApplication._start_contracts_watcher
+ImprovedMainApplication._poll_contracts_watcher = MainApplication._poll_contracts_watcher
 ImprovedMainApplication._load_contract = MainApplication._load_contract
 ImprovedMainApplication._load_contract_for_customer = MainApplication._load_contract_for_customer
 ImprovedMainApplication._collect_data = MainApplication._collect_data
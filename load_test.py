@@ -0,0 +1,370 @@
+"""
+Нагрузочный тест веб-версии.
+
+По умолчанию гоняет web_app.app прямо в процессе через ASGI-транспорт httpx
+(без сети и без отдельного сервера); с --url — по HTTP работающий сервер.
+Выводит p50/p95/p99, пропускную способность и долю ошибок по каждому эндпоинту.
+
+Примеры:
+    python load_test.py --concurrency 20 --duration 30
+    python load_test.py --url http://localhost:8000 --requests 500 --types vertical=1,stair=1
+    python load_test.py --endpoints generate=1 --ladders 1-12 --json result.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import math
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack, contextmanager
+from pathlib import Path
+from urllib.parse import quote
+
+import httpx
+
+from report_payload import SAMPLE_REPORTS
+
+# Доли эндпоинтов и типов протоколов по умолчанию: в основном генерация
+DEFAULT_ENDPOINT_MIX = "generate=6,validate=3,customers=1"
+DEFAULT_TYPE_MIX = "vertical=5,stair=3,roof=2"
+# Слова из названий заказчиков для запросов contracts-search
+SEARCH_WORD = re.compile(r"\w{4,}")
+ENDPOINTS = ("generate", "validate", "customers", "customer", "contracts-search", "validation-rules", "ready")
+
+
+def parse_mix(value: str, allowed) -> dict[str, float]:
+    """'a=3,b=1' -> {'a': 3.0, 'b': 1.0}"""
+    mix = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in allowed:
+            raise argparse.ArgumentTypeError(f"Неизвестное значение '{name}', допустимо: {', '.join(allowed)}")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Некорректный вес для '{name}': {weight}") from None
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("Пустая смесь")
+    return mix
+
+
+def parse_range(value: str) -> tuple[int, int]:
+    """'3' -> (3, 3), '1-6' -> (1, 6)"""
+    low, _, high = value.partition("-")
+    try:
+        low_value = int(low)
+        high_value = int(high) if high else low_value
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ожидается число или диапазон N-M: {value}") from None
+    if low_value < 1 or high_value < low_value:
+        raise argparse.ArgumentTypeError(f"Некорректный диапазон: {value}")
+    return low_value, high_value
+
+
+# --- Тела запросов -------------------------------------------------------------
+
+def _jitter(rng: random.Random, base: float, spread: float = 0.2) -> str:
+    return f"{base * rng.uniform(1 - spread, 1 + spread):.2f}"
+
+
+def build_payload(protocol_type: str, rng: random.Random, ladders: tuple[int, int], marches: tuple[int, int]) -> dict:
+    """
+    Запрос на генерацию на основе SAMPLE_REPORTS с реалистичным
+    числом лестниц/маршей и разбросом размеров
+    """
+    payload = copy.deepcopy(SAMPLE_REPORTS[protocol_type])
+    payload["date"] = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2025"
+    payload["customer"] = f"ООО «Нагрузка-{rng.randint(1, 50)}»"
+
+    if protocol_type == "vertical":
+        template = payload["ladders"][0]
+        payload["ladders"] = []
+        for number in range(1, rng.randint(*ladders) + 1):
+            ladder = dict(template, number=number)
+            height = float(_jitter(rng, 6.5, 0.5))
+            ladder["height"] = f"{height:.2f}"
+            ladder["steps_count"] = str(max(1, round(height / 0.3)))
+            ladder["mount_points"] = str(rng.randint(4, 10))
+            ladder["damage_found"] = rng.random() < 0.1
+            payload["ladders"].append(ladder)
+    elif protocol_type == "stair":
+        template = payload["marches"][0]
+        count = rng.randint(*marches)
+        payload["marches"] = []
+        for number in range(1, count + 1):
+            march = dict(template, number=number)
+            march["march_length"] = _jitter(rng, 4.77)
+            march["steps_count"] = str(rng.randint(8, 16))
+            # Последний марш обычно без верхней площадки
+            march["has_platform"] = number < count or rng.random() < 0.5
+            payload["marches"].append(march)
+        payload["mount_points"] = str(2 * count + rng.randint(2, 6))
+    else:
+        payload["length"] = _jitter(rng, 25, 0.6)
+        payload["mount_points_roof"] = str(rng.randint(6, 30))
+    return payload
+
+
+# --- Статистика ------------------------------------------------------------------
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LoadStats:
+    """Задержки и коды ответов по эндпоинтам"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+
+    def record(self, endpoint: str, seconds: float, status: str) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            statuses = self.statuses[endpoint]
+            total = len(values)
+            # 429 — штатный отказ admission control, считаем отдельно от ошибок
+            rejected = statuses.get("429", 0)
+            errors = sum(count for status, count in statuses.items()
+                         if status != "429" and not status.startswith(("2", "3")))
+            endpoints[endpoint] = {
+                "requests": total,
+                "throughput_rps": total / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000 if values else 0.0,
+                "error_rate": errors / total if total else 0.0,
+                "rejected_rate": rejected / total if total else 0.0,
+                "statuses": dict(statuses),
+            }
+        total_requests = sum(item["requests"] for item in endpoints.values())
+        return {
+            "elapsed_s": elapsed,
+            "requests": total_requests,
+            "throughput_rps": total_requests / elapsed if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def print_summary(summary: dict) -> None:
+    print()
+    header = f"{'Эндпоинт':<18}{'запр.':>7}{'RPS':>8}{'p50 мс':>9}{'p95 мс':>9}{'p99 мс':>9}{'ошибки':>8}{'429':>7}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, item in summary["endpoints"].items():
+        print(
+            f"{endpoint:<18}{item['requests']:>7}{item['throughput_rps']:>8.1f}"
+            f"{item['p50_ms']:>9.1f}{item['p95_ms']:>9.1f}{item['p99_ms']:>9.1f}"
+            f"{item['error_rate']:>8.1%}{item['rejected_rate']:>7.1%}"
+        )
+    print("-" * len(header))
+    print(f"Всего: {summary['requests']} запросов за {summary['elapsed_s']:.1f} с "
+          f"({summary['throughput_rps']:.1f} запр./с)")
+    for endpoint, item in summary["endpoints"].items():
+        failed = {status: count for status, count in item["statuses"].items() if not status.startswith("2")}
+        if failed:
+            print(f"  {endpoint}: {failed}")
+
+
+# --- Нагрузка --------------------------------------------------------------------
+
+class LoadRunner:
+    """Замкнутый цикл: concurrency виртуальных пользователей шлют запросы друг за другом"""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.stats = LoadStats()
+        self.rng = random.Random(args.seed)
+        self.endpoint_names = list(args.endpoints)
+        self.endpoint_weights = list(args.endpoints.values())
+        self.type_names = list(args.types)
+        self.type_weights = list(args.types.values())
+        self.headers = {"X-Priority": args.priority} if args.priority else {}
+        self.customers: list[str] = []
+        self._remaining = args.requests
+        self._deadline: float | None = None
+
+    def _take(self) -> bool:
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            return False
+        if self._remaining is not None:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+        return True
+
+    def _request_args(self, endpoint: str) -> tuple[str, str, dict]:
+        if endpoint in ("generate", "validate"):
+            protocol_type = self.rng.choices(self.type_names, self.type_weights)[0]
+            payload = build_payload(protocol_type, self.rng, self.args.ladders, self.args.marches)
+            return "POST", f"/api/{endpoint}", {"json": payload}
+        if endpoint == "customer":
+            name = self.rng.choice(self.customers) if self.customers else "ООО «Пример»"
+            return "GET", f"/api/customer/{quote(name, safe='')}", {}
+        if endpoint == "customers":
+            return "GET", "/api/customers", {}
+        if endpoint == "contracts-search":
+            words = SEARCH_WORD.findall(self.rng.choice(self.customers)) if self.customers else []
+            return "GET", "/api/contracts/search", {"params": {"q": self.rng.choice(words) if words else "договор"}}
+        if endpoint == "validation-rules":
+            return "GET", "/api/validation-rules", {}
+        return "GET", "/api/ready", {}
+
+    async def _user(self) -> None:
+        while self._take():
+            endpoint = self.rng.choices(self.endpoint_names, self.endpoint_weights)[0]
+            method, path, kwargs = self._request_args(endpoint)
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, headers=self.headers, **kwargs)
+                await response.aread()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            self.stats.record(endpoint, time.perf_counter() - start, status)
+
+    async def _load_customers(self) -> None:
+        try:
+            response = await self.client.get("/api/customers")
+            self.customers = response.json().get("customers", [])
+        except (httpx.HTTPError, ValueError):
+            self.customers = []
+
+    async def run(self) -> dict:
+        if "customer" in self.args.endpoints or "contracts-search" in self.args.endpoints:
+            await self._load_customers()
+        if self.args.duration:
+            self._deadline = time.perf_counter() + self.args.duration
+        self.stats = LoadStats()
+        await asyncio.gather(*(self._user() for _ in range(self.args.concurrency)))
+        self.stats.finished = time.perf_counter()
+        return self.stats.summary()
+
+
+@contextmanager
+def isolated_reports():
+    """
+    На время теста в процессе: отчёты и их индекс — во временной папке,
+    отправка на email выключена. Иначе каждый созданный отчёт попал бы в
+    рабочую папку отчётов и ушёл письмом.
+    """
+    import config
+
+    saved = {name: getattr(config, name) for name in ("REPORTS_DIR", "REPORTS_INDEX_FILE", "REPORT_EMAIL_ENABLED")}
+    with tempfile.TemporaryDirectory(prefix="load-test-") as tmp_dir:
+        config.REPORTS_DIR = Path(tmp_dir) / "отчёты"
+        config.REPORTS_DIR.mkdir()
+        config.REPORTS_INDEX_FILE = Path(tmp_dir) / "reports_index.jsonl"
+        config.REPORT_EMAIL_ENABLED = False
+        try:
+            yield
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    async with AsyncExitStack() as stack:
+        if args.url:
+            transport = None
+            base_url = args.url.rstrip("/")
+        else:
+            import web_app
+
+            stack.enter_context(isolated_reports())
+            # ASGI-транспорт не выполняет lifespan — запускаем его сами
+            await stack.enter_async_context(web_app.app.router.lifespan_context(web_app.app))
+            transport = httpx.ASGITransport(app=web_app.app)
+            base_url = "http://load-test"
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits)
+        )
+
+        runner = LoadRunner(client, args)
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "requests": args.warmup, "duration": None})
+            await LoadRunner(client, warmup).run()
+        return await runner.run()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест веб-версии генератора протоколов")
+    parser.add_argument("--url", help="Адрес работающего сервера; без него приложение запускается в процессе")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="Одновременных пользователей (10)")
+    parser.add_argument("-n", "--requests", type=int, help="Сколько запросов отправить всего")
+    parser.add_argument("-d", "--duration", type=float, help="Длительность теста в секундах (по умолчанию 30, если не задан -n)")
+    parser.add_argument("--endpoints", type=lambda v: parse_mix(v, ENDPOINTS), default=DEFAULT_ENDPOINT_MIX,
+                        help=f"Доли эндпоинтов ({DEFAULT_ENDPOINT_MIX}); доступны: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--types", type=lambda v: parse_mix(v, tuple(SAMPLE_REPORTS)), default=DEFAULT_TYPE_MIX,
+                        help=f"Доли типов протоколов ({DEFAULT_TYPE_MIX})")
+    parser.add_argument("--ladders", type=parse_range, default="1-6", help="Число лестниц в протоколе (1-6)")
+    parser.add_argument("--marches", type=parse_range, default="2-8", help="Число маршей в протоколе (2-8)")
+    parser.add_argument("--priority", choices=("interactive", "bulk"), help="Заголовок X-Priority")
+    parser.add_argument("--warmup", type=int, default=0, help="Запросов на прогрев (не входят в статистику)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Таймаут запроса в секундах (60)")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора случайных чисел")
+    parser.add_argument("--json", dest="json_path", help="Сохранить результат в JSON-файл")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency должно быть больше 0")
+    if args.requests is None and args.duration is None:
+        args.duration = 30.0
+
+    target = args.url or "web_app.app (в процессе)"
+    limit = f"{args.requests} запросов" if args.requests is not None else f"{args.duration:g} с"
+    print(f"Нагрузка на {target}: {args.concurrency} пользователей, {limit}")
+
+    summary = asyncio.run(run_load_test(args))
+    summary["config"] = {
+        "target": target,
+        "concurrency": args.concurrency,
+        "endpoints": args.endpoints,
+        "types": args.types,
+        "ladders": args.ladders,
+        "marches": args.marches,
+        "priority": args.priority,
+    }
+    print_summary(summary)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"Результат сохранён в {args.json_path}")
+
+    has_errors = any(item["error_rate"] > 0 for item in summary["endpoints"].values())
+    return 1 if has_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,591 @@
+"""
+Метрики веб-сервиса в текстовом формате Prometheus
+"""
+from __future__ import annotations
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import config
+import request_timing
+from logger import app_logger
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Границы корзин для размеров файлов (байты)
+SIZE_BUCKETS = (8_192, 16_384, 32_768, 65_536, 131_072, 262_144, 524_288, 1_048_576, 4_194_304)
+
+# Переменная окружения, которой run_production включает сбор метрик со
+# всех воркеров (переходит и в воркеры, запущенные заново, а не форком)
+MULTIPROCESS_ENV = "WORDGEN_METRICS_MULTIPROCESS"
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: dict | None = None) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape_label(value)}"' for name, value in extra.items())
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Базовый класс метрики с поддержкой меток"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """Возвращает дочернюю метрику для набора значений меток"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}")
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._children[values] = self._new_child()
+            return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"Метрика {self.name} требует метки {self.labelnames}")
+        return self._children[()]
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._children.items())
+        for values, child in sorted(items):
+            yield values, child
+
+    def render(self, children: dict | None = None) -> list[str]:
+        """Строки метрики; children — свои дочерние метрики вместо текущих (сумма по воркерам)"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        samples = self._samples() if children is None else sorted(children.items())
+        for values, child in samples:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def dump(self) -> list:
+        """Состояние для снимка воркера: [[значения меток, состояние], ...]"""
+        return [[list(values), child.dump()] for values, child in self._samples()]
+
+    def _render_child(self, values, child) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class _ValueChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def get(self) -> float:
+        with self._lock:
+            return self._value
+
+    def dump(self) -> float:
+        return self.get()
+
+    def merge(self, state: float) -> None:
+        self.inc(state)
+
+    @contextmanager
+    def track_inprogress(self):
+        """Увеличивает значение на время выполнения блока"""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Счётчик не может уменьшаться")
+        self._default().inc(amount)
+
+    def get(self) -> float:
+        return self._default().get()
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и уменьшаться"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def get(self) -> float:
+        return self._default().get()
+
+    def track_inprogress(self):
+        return self._default().track_inprogress()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._upper_bounds = tuple(buckets) + (math.inf,)
+        self._counts = [0] * len(self._upper_bounds)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._sum += value
+            for idx, bound in enumerate(self._upper_bounds):
+                if value <= bound:
+                    self._counts[idx] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        """Замеряет длительность блока в секундах"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {"counts": list(self._counts), "sum": self._sum}
+
+    def merge(self, state: dict) -> None:
+        with self._lock:
+            if len(state["counts"]) != len(self._counts):
+                return  # границы корзин изменились между версиями
+            self._counts = [a + b for a, b in zip(self._counts, state["counts"])]
+            self._sum += state["sum"]
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = []
+            total = 0
+            for bound, count in zip(self._upper_bounds, self._counts):
+                total += count
+                cumulative.append((bound, total))
+            return cumulative, self._sum, total
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child) -> list[str]:
+        cumulative, total_sum, total_count = child.snapshot()
+        lines = []
+        for bound, count in cumulative:
+            labels = _format_labels(self.labelnames, values, {"le": _format_value(bound)})
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+        lines.append(f"{self.name}_count{labels} {total_count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик, отдаваемых на /metrics"""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def dump(self) -> dict:
+        """Состояние всех метрик для снимка воркера"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return {metric.name: metric.dump() for metric in metrics}
+
+    def merge(self, snapshots: Iterable[dict]) -> dict:
+        """
+        Сумма снимков воркеров: {имя метрики: {значения меток: дочерняя метрика}}.
+
+        Счётчики и гистограммы складываются по всем снимкам, в том числе
+        завершившихся воркеров (иначе суммарный счётчик уменьшался бы при
+        их перезапуске), gauge — только по работающим воркерам.
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        merged = {metric.name: {} for metric in metrics}
+        by_name = {metric.name: metric for metric in metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot["metrics"].items():
+                metric = by_name.get(name)
+                if metric is None or (metric.type_name == "gauge" and not snapshot["alive"]):
+                    continue
+                children = merged[name]
+                for values, state in samples:
+                    values = tuple(values)
+                    child = children.get(values)
+                    if child is None:
+                        child = children[values] = metric._new_child()
+                    child.merge(state)
+        return merged
+
+    def render_merged(self, snapshots: Iterable[dict]) -> str:
+        """Метрики, просуммированные по снимкам воркеров (см. merge)"""
+        merged = self.merge(snapshots)
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(merged[metric.name]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --- Несколько воркеров ---------------------------------------------------------
+#
+# У каждого воркера свой REGISTRY, а на /metrics отвечает случайный из них.
+# Поэтому каждый воркер раз в METRICS_FLUSH_INTERVAL секунд (и при
+# завершении) записывает снимок своих метрик в METRICS_DIR/worker-<pid>.json,
+# а ответ на /metrics собирается из снимков всех воркеров: свой — свежий,
+# чужие — не старше METRICS_FLUSH_INTERVAL.
+#
+# Пока воркер жив, он держит блокировку файла worker-<pid>.lock (ОС снимает
+# её и при аварийном завершении). Снимки завершившихся воркеров (gunicorn
+# перезапускает их после max_requests) при сборе метрик складываются в
+# один файл dead-workers.json и удаляются, так что число файлов в папке
+# не растёт со временем работы сервера.
+
+DEAD_WORKERS_FILE = "dead-workers.json"
+_FOLD_LOCK_FILE = "fold.lock"
+# Файл блокировки «воркер жив» текущего процесса: (pid, открытый файл)
+_liveness = None
+
+
+def _lock_file(path: Path, blocking: bool = False):
+    """
+    Межпроцессная блокировка файла.
+
+    Returns:
+        file или None: открытый файл (блокировка держится до закрытия) или
+            None, если файл заблокирован другим процессом (blocking=False)
+    """
+    handle = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except OSError:
+        handle.close()
+        if blocking:
+            raise
+        return None
+    return handle
+
+
+def multiprocess_enabled() -> bool:
+    return os.environ.get(MULTIPROCESS_ENV) == "1"
+
+
+def enable_multiprocess(directory: Path | None = None) -> None:
+    """
+    Включает сбор метрик со всех воркеров (вызывается в мастере до их
+    запуска). Снимки прошлого запуска удаляются: счётчики начинаются с нуля.
+    """
+    directory = Path(directory or config.METRICS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    for pattern in ("worker-*.json", "worker-*.lock", DEAD_WORKERS_FILE):
+        for old in directory.glob(pattern):
+            old.unlink(missing_ok=True)
+    os.environ[MULTIPROCESS_ENV] = "1"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(alive: bool = True, directory: Path | None = None) -> None:
+    """
+    Записывает снимок метрик текущего воркера (alive=False — при завершении).
+    Работает с диском: из асинхронного кода вызывать через asyncio.to_thread.
+    """
+    global _liveness
+    if not multiprocess_enabled():
+        return
+    directory = Path(directory or config.METRICS_DIR)
+    pid = os.getpid()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        # После fork (gunicorn) унаследованный файл принадлежит мастеру
+        if _liveness is None or _liveness[0] != pid:
+            _liveness = (pid, _lock_file(directory / f"worker-{pid}.lock"))
+        snapshot = {"pid": pid, "written_at": time.time(), "alive": alive, "metrics": REGISTRY.dump()}
+        _write_json(directory / f"worker-{pid}.json", snapshot)
+    except OSError as e:
+        app_logger.error(f"Не удалось записать снимок метрик: {e}")
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        app_logger.warning(f"Пропущен снимок метрик {path.name}: {e}")
+        return None
+
+
+def _read_snapshots(directory: Path) -> list[dict]:
+    """
+    Снимки работающих воркеров и сумма завершившихся. Снимки завершившихся
+    воркеров при этом переносятся в DEAD_WORKERS_FILE и удаляются.
+    """
+    snapshots = []
+    dead = []
+    dead_paths = []
+    with _lock_file(directory / _FOLD_LOCK_FILE, blocking=True):
+        for path in directory.glob("worker-*.json"):
+            snapshot = _read_json(path)
+            if snapshot is None:
+                continue
+            lock_path = path.with_suffix(".lock")
+            if snapshot.get("pid") == os.getpid():
+                alive = True
+            elif not lock_path.exists():
+                alive = False
+            else:
+                # Блокировку удалось взять — её владелец завершился
+                handle = _lock_file(lock_path)
+                alive = handle is None
+                if handle is not None:
+                    handle.close()
+            snapshot["alive"] = alive and snapshot.get("alive", False)
+            if alive:
+                snapshots.append(snapshot)
+            else:
+                dead.append(snapshot)
+                dead_paths.extend((path, lock_path))
+
+        aggregate = _read_json(directory / DEAD_WORKERS_FILE)
+        if aggregate is not None:
+            dead.append(dict(aggregate, alive=False))
+        if dead_paths:
+            merged = REGISTRY.merge(dead)
+            aggregate = {
+                "alive": False,
+                "metrics": {
+                    name: [[list(values), child.dump()] for values, child in sorted(children.items())]
+                    for name, children in merged.items()
+                    if children
+                },
+            }
+            try:
+                _write_json(directory / DEAD_WORKERS_FILE, aggregate)
+                for path in dead_paths:
+                    path.unlink(missing_ok=True)
+            except OSError as e:
+                app_logger.error(f"Не удалось объединить снимки метрик завершившихся воркеров: {e}")
+                return snapshots + dead
+        if aggregate is not None:
+            snapshots.append(aggregate)
+    return snapshots
+
+
+# --- Метрики приложения -------------------------------------------------------
+
+REQUEST_LATENCY = Histogram(
+    "wordgen_request_duration_seconds",
+    "Длительность обработки запросов API",
+    ["endpoint"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "wordgen_requests_in_progress",
+    "Количество запросов в обработке",
+    ["endpoint"],
+)
+REQUESTS_TOTAL = Counter(
+    "wordgen_requests_total",
+    "Количество обработанных запросов API",
+    ["endpoint", "status"],
+)
+GENERATE_PHASE_LATENCY = Histogram(
+    "wordgen_generate_phase_duration_seconds",
+    "Длительность этапов генерации отчёта (render, save, email)",
+    ["phase"],
+)
+REPORTS_TOTAL = Counter(
+    "wordgen_reports_total",
+    "Количество запросов на генерацию по типу протокола",
+    ["protocol_type", "status"],
+)
+REPORT_SIZE_BYTES = Histogram(
+    "wordgen_report_size_bytes",
+    "Размер сгенерированных документов в байтах",
+    ["protocol_type"],
+    buckets=SIZE_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "wordgen_cache_requests_total",
+    "Обращения к кэшам (hit/miss); доля попаданий = hit / (hit + miss)",
+    ["cache", "result"],
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "wordgen_admission_active",
+    "Операции, выполняемые сейчас в пуле",
+    ["pool", "priority"],
+)
+ADMISSION_QUEUED = Gauge(
+    "wordgen_admission_queued",
+    "Запросы, ожидающие слот в пуле",
+    ["pool", "priority"],
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "wordgen_admission_queue_wait_seconds",
+    "Время ожидания слота в очереди",
+    ["pool", "priority"],
+)
+ADMISSION_REJECTED = Counter(
+    "wordgen_admission_rejected_total",
+    "Запросы, отклонённые с 429 (queue_full — очередь заполнена, timeout — долгое ожидание)",
+    ["pool", "priority", "reason"],
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Учитывает попадание или промах кэша"""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def instrument(endpoint: str):
+    """
+    Декоратор для обработчиков FastAPI: длительность, число запросов
+    в обработке и итоговый статус. Также отмечает границы обработчика
+    для заголовка Server-Timing.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request_timing.mark_handler_start()
+            status = "error"
+            with REQUESTS_IN_PROGRESS.labels(endpoint=endpoint).track_inprogress(), \
+                    REQUEST_LATENCY.labels(endpoint=endpoint).time():
+                try:
+                    result = await func(*args, **kwargs)
+                    status = "ok"
+                    return result
+                finally:
+                    REQUESTS_TOTAL.labels(endpoint=endpoint, status=status).inc()
+                    request_timing.mark_handler_end()
+
+        return wrapper
+
+    return decorator
+
+
+def render_latest() -> str:
+    """
+    Возвращает все метрики в текстовом формате Prometheus: при нескольких
+    воркерах — сумму по всем воркерам (читает снимки с диска: из
+    асинхронного кода вызывать через asyncio.to_thread)
+    """
+    if not multiprocess_enabled():
+        return REGISTRY.render()
+    write_snapshot()
+    return REGISTRY.render_merged(_read_snapshots(Path(config.METRICS_DIR)))
@@ -0,0 +1,116 @@
+"""
+Бенчмарк поиска заказчика в тексте договора.
+
+Сравнивает прежний способ (каждый шаблон — re.search по всему тексту) с
+поиском в окнах вокруг якоря «именуем» (pattern_engine.AnchoredPatterns)
+на нарочно неудобных текстах, где шаблоны с [^»]+ откатываются по всему
+документу. Время прежнего способа растёт квадратично, нового — линейно.
+
+Примеры:
+    python parser_benchmark.py
+    python parser_benchmark.py --sizes 50000,100000,200000,400000 --legacy-max 100000
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+
+from contract_parser import CUSTOMER_PATTERNS, ContractParser
+
+# Неудобные тексты: (описание, повторяемый фрагмент, хвост)
+PATHOLOGICAL_INPUTS = {
+    "no-anchor": (
+        "«ООО «» без закрывающей кавычки, якоря нет",
+        "ООО «Альфа ",
+        "",
+    ),
+    "foreign-anchor": (
+        "якорь без «Заказчик» после каждого названия",
+        "ООО «Альфа, именуемое в дальнейшем Исполнитель ",
+        "",
+    ),
+    "late-customer": (
+        "заказчик в самом конце после длинного текста без кавычек",
+        "ООО «Альфа текст договора ",
+        "\nООО «Ромашка», именуемое в дальнейшем «Заказчик»",
+    ),
+}
+
+
+def build_text(name: str, size: int) -> str:
+    _, unit, tail = PATHOLOGICAL_INPUTS[name]
+    return unit * max(1, size // len(unit)) + tail
+
+
+def legacy_extract(text: str) -> str | None:
+    """Прежний поиск: каждый шаблон по всему тексту"""
+    for pattern in CUSTOMER_PATTERNS.patterns:
+        match = re.search(pattern.pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            customer = match.group(1).strip().strip('",\'«»:;.\n\r\t ')
+            customer = re.sub(r'^(в\s+лице|далее)\s*[-–—]?\s*', '', customer, flags=re.IGNORECASE)
+            if 5 < len(customer) < 250:
+                return customer
+    return None
+
+
+def measure(function, text: str, repeat: int) -> tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска заказчика в договоре")
+    parser.add_argument("--sizes", default="12500,25000,50000,100000,200000,400000",
+                        help="Размеры текстов в символах через запятую")
+    parser.add_argument("--legacy-max", type=int, default=50000,
+                        help="Прежний способ запускать только на текстах не длиннее (50000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов на замер, берётся лучший (3)")
+    parser.add_argument("--inputs", default=",".join(PATHOLOGICAL_INPUTS),
+                        help=f"Какие тексты проверять ({', '.join(PATHOLOGICAL_INPUTS)})")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(int(size) for size in args.sizes.split(",") if size.strip())
+    contract_parser = ContractParser(".")
+    mismatches = 0
+
+    for name in args.inputs.split(","):
+        description = PATHOLOGICAL_INPUTS[name][0]
+        print(f"\n{name}: {description}")
+        print(f"{'символов':>10}{'прежний, мс':>14}{'окна, мс':>12}{'мкс/КБ':>9}")
+        previous = None
+        growth = []
+        for size in sizes:
+            text = build_text(name, size)
+            engine_time, engine_result = measure(contract_parser._extract_customer, text, args.repeat)
+            legacy_cell = "-"
+            if size <= args.legacy_max:
+                legacy_time, legacy_result = measure(legacy_extract, text, 1)
+                legacy_cell = f"{legacy_time * 1000:.1f}"
+                if legacy_result != engine_result:
+                    mismatches += 1
+                    print(f"  расхождение: {legacy_result!r} != {engine_result!r}")
+            print(f"{len(text):>10}{legacy_cell:>14}{engine_time * 1000:>12.2f}"
+                  f"{engine_time * 1e6 / (len(text) / 1024):>9.1f}")
+            if previous is not None:
+                growth.append((engine_time / previous[1]) / (len(text) / previous[0]))
+            previous = (len(text), engine_time)
+        if growth:
+            # 1.0 — время растёт ровно пропорционально длине текста
+            print(f"  рост времени окон относительно роста длины: {sum(growth) / len(growth):.2f}")
+
+    if mismatches:
+        print(f"\nРезультаты разошлись: {mismatches}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Поиск по набору регулярных выражений только рядом с обязательным якорем
+"""
+import re
+
+
+class AnchoredPatterns:
+    """
+    Набор шаблонов, которые проверяются по порядку приоритета, но не по
+    всему тексту, а в окнах вокруг вхождений якоря.
+
+    Каждый шаблон обязан содержать якорь (для заказчика — «именуем»).
+    Сначала текст отсеивается простым поиском подстроки, затем находятся
+    вхождения якоря (при заданном confirm — только те, за которыми идёт
+    нужное продолжение), и шаблоны ищутся лишь в окне
+    [начало якоря - before, конец якоря + after]. Рассматриваются первые
+    max_windows вхождений: искомое стоит в начале документа.
+
+    Так время поиска растёт линейно с длиной текста, даже если шаблон
+    с неограниченным повтором ([^»]+ и т.п.) сильно откатывается: откаты
+    ограничены размером окна.
+    """
+
+    def __init__(self, patterns, anchor, before, after, confirm=None,
+                 flags=re.IGNORECASE | re.DOTALL, max_windows=20):
+        """
+        Args:
+            patterns (list): Регулярные выражения в порядке приоритета
+            anchor (str): Буквальный якорь (в нижнем регистре), есть в каждом шаблоне
+            before (int): Сколько символов до якоря входит в окно
+            after (int): Сколько символов после якоря входит в окно
+            confirm (str): Выражение, которое должно совпасть с текстом с места якоря
+            flags (int): Флаги компиляции шаблонов
+            max_windows (int): Сколько первых вхождений якоря рассматривать
+        """
+        self.patterns = [re.compile(pattern, flags) for pattern in patterns]
+        self.literal = anchor.lower()
+        self.anchor = re.compile(re.escape(anchor), re.IGNORECASE)
+        self.confirm = re.compile(confirm, flags) if confirm else None
+        self.before = before
+        self.after = after
+        self.max_windows = max_windows
+
+    def windows(self, text):
+        """
+        Окна поиска (start, end) по порядку вхождений якоря
+
+        Returns:
+            list: Пары индексов; пустой список, если якоря в тексте нет
+        """
+        if self.literal not in text.lower():
+            return []
+        windows = []
+        for anchor in self.anchor.finditer(text):
+            if self.confirm is not None and not self.confirm.match(text, anchor.start()):
+                continue
+            window = (max(0, anchor.start() - self.before), min(len(text), anchor.end() + self.after))
+            if not windows or windows[-1] != window:
+                windows.append(window)
+            if len(windows) >= self.max_windows:
+                break
+        return windows
+
+    def iter_matches(self, text):
+        """
+        Первое совпадение каждого шаблона, в порядке приоритета шаблонов
+        (как при поиске re.search каждым шаблоном по всему тексту).
+
+        Yields:
+            tuple: (номер шаблона, re.Match с позициями в исходном тексте)
+        """
+        windows = self.windows(text)
+        if not windows:
+            return
+        for index, pattern in enumerate(self.patterns):
+            for start, end in windows:
+                match = pattern.search(text, start, end)
+                if match:
+                    yield index, match
+                    break
+
+    def search(self, text):
+        """Первое совпадение самого приоритетного шаблона или None"""
+        for _, match in self.iter_matches(text):
+            return match
+        return None
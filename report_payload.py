@@ -0,0 +1,203 @@
+"""
+Модели запроса на генерацию и быстрое декодирование JSON в словарь
+входных данных генератора
+"""
+import json
+from typing import List, Optional, Dict, Any
+
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+
+# Модели данных
+class LadderData(BaseModel):
+    number: int
+    name: Optional[str] = ""
+    height: str
+    width: str
+    steps_count: str
+    mount_points: str
+    platform_length: Optional[str] = ""
+    platform_width: Optional[str] = ""
+    fence_height: Optional[str] = ""
+    wall_distance: Optional[str] = ""
+    ground_distance: Optional[str] = ""
+    step_distance: str
+    damage_found: bool = False
+    mount_violation_found: bool = False
+    weld_violation_found: bool = False
+    paint_compliant: bool = True
+
+class MarchData(BaseModel):
+    number: int
+    has_march: bool = True
+    has_platform: bool = True
+    march_width: Optional[str] = ""
+    march_length: Optional[str] = ""
+    step_width: Optional[str] = ""
+    step_distance: Optional[str] = ""
+    steps_count: Optional[str] = ""
+    march_fence_height: Optional[str] = ""
+    platform_length: Optional[str] = ""
+    platform_width: Optional[str] = ""
+    platform_fence_height: Optional[str] = ""
+    platform_ground_distance: Optional[str] = ""
+
+class ReportData(BaseModel):
+    protocol_type: str = "vertical"
+    date: str
+    customer: str
+    object_full_address: str
+    test_time: str = "дневное время"
+    temperature: Optional[str] = ""
+    wind_speed: Optional[str] = ""
+    
+    # Для вертикальных лестниц
+    ladders: List[LadderData] = []
+    ladders_compliance: Dict[str, Any] = {}
+    
+    # Для маршевых лестниц
+    ladder_name: Optional[str] = ""
+    mount_points: Optional[str] = ""
+    marches: List[MarchData] = []
+    
+    # Для ограждений кровли
+    fence_name: Optional[str] = ""
+    length: Optional[str] = ""
+    height: Optional[str] = ""
+    mount_points_roof: Optional[str] = ""
+    mount_pitch: Optional[str] = ""
+    parapet_height: Optional[str] = ""
+    
+    # Визуальный осмотр (для маршевых и ограждений)
+    damage_found: bool = False
+    mount_violation_found: bool = False
+    weld_violation_found: bool = False
+    paint_compliant: bool = True
+    
+    # Соответствие нормам
+    project_compliant: bool = False
+    project_number: Optional[str] = ""
+
+
+# Типовые запросы по каждому типу протокола (прогрев сервера, нагрузочные тесты)
+SAMPLE_REPORTS = {
+    "vertical": {
+        "protocol_type": "vertical",
+        "date": "01.01.2025",
+        "customer": "ООО «Пример»",
+        "object_full_address": "Жилой дом по адресу: г. Екатеринбург, ул. Примерная, д. 1",
+        "ladders": [
+            {
+                "number": 1,
+                "height": "6.5",
+                "width": "0.6",
+                "steps_count": "20",
+                "mount_points": "6",
+                "step_distance": "0.3",
+                "platform_length": "1.0",
+                "platform_width": "0.8",
+                "fence_height": "1.0",
+            }
+        ],
+    },
+    "stair": {
+        "protocol_type": "stair",
+        "date": "01.01.2025",
+        "customer": "ООО «Пример»",
+        "object_full_address": "Жилой дом по адресу: г. Екатеринбург, ул. Примерная, д. 1",
+        "mount_points": "8",
+        "marches": [
+            {
+                "number": 1,
+                "march_width": "0.7",
+                "march_length": "4.77",
+                "step_width": "0.7",
+                "step_distance": "0.3",
+                "steps_count": "12",
+                "march_fence_height": "1.0",
+                "platform_length": "0.6",
+                "platform_width": "0.8",
+                "platform_fence_height": "1.0",
+            }
+        ],
+    },
+    "roof": {
+        "protocol_type": "roof",
+        "date": "01.01.2025",
+        "customer": "ООО «Пример»",
+        "object_full_address": "Жилой дом по адресу: г. Екатеринбург, ул. Примерная, д. 1",
+        "length": "25",
+        "height": "1.2",
+        "mount_points_roof": "12",
+    },
+}
+
+# Схема тела запроса для OpenAPI (эндпоинты читают тело сами, см. decode_report)
+REPORT_OPENAPI_EXTRA = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": ReportData.model_json_schema()}},
+    }
+}
+
+
+def to_generator_input(report: ReportData) -> dict:
+    """
+    Преобразует модель в словарь для валидатора и генераторов.
+
+    model_dump() уже рекурсивно превращает ladders и marches в словари,
+    поэтому повторный проход по вложенным моделям не нужен.
+    """
+    data = report.model_dump()
+    protocol_type = data["protocol_type"]
+    if protocol_type == "vertical":
+        # Для вертикальных лестниц нужны данные соответствия
+        if not data.get("ladders_compliance"):
+            data["ladders_compliance"] = {}
+    elif protocol_type == "roof":
+        data["mount_points"] = data.get("mount_points_roof")
+    return data
+
+
+def _json_decode_error(body: bytes) -> dict | None:
+    """
+    Ошибка некорректного JSON в формате FastAPI ("body -> <позиция>: JSON
+    decode error"). Позицию даёт json.loads: он запускается только для
+    уже отвергнутого тела.
+    """
+    try:
+        json.loads(body)
+    except ValueError as e:
+        pos, detail = (e.pos, e.msg) if isinstance(e, json.JSONDecodeError) else (0, str(e))
+        return {"type": "json_invalid", "loc": ("body", pos), "msg": "JSON decode error",
+                "input": {}, "ctx": {"error": detail}}
+    return None
+
+
+def decode_report(body: bytes) -> dict:
+    """
+    Разбирает JSON тела запроса за один проход (pydantic-core, без
+    промежуточного json.loads) и возвращает входные данные генератора.
+
+    Raises:
+        RequestValidationError: ошибки в том же формате, что и у FastAPI
+    """
+    if not body:
+        raise RequestValidationError(
+            [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+        )
+    try:
+        report = ReportData.model_validate_json(body)
+    except ValidationError as exc:
+        errors = []
+        for error in exc.errors(include_url=False):
+            decode_error = _json_decode_error(body) if error["type"] == "json_invalid" else None
+            if decode_error is not None:
+                errors.append(decode_error)
+                continue
+            error = dict(error)
+            error["loc"] = ("body", *error.get("loc", ()))
+            errors.append(error)
+        raise RequestValidationError(errors) from None
+    return to_generator_input(report)
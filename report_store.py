@@ -0,0 +1,359 @@
+"""
+Хранилище сгенерированных отчётов: идентификаторы, индекс на диске
+и кэш последних файлов в памяти
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import config
+import metrics
+from logger import app_logger
+
+
+@dataclass(frozen=True)
+class ReportRecord:
+    """Запись об отчёте в индексе"""
+
+    id: str
+    filename: str
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    created_at: str
+    protocol_type: str = ""
+    customer: str = ""
+    date: str = ""
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256[:32]}"'
+
+    @property
+    def report_date(self) -> date:
+        """Дата протокола (ДД.ММ.ГГГГ), а если её нет — дата создания файла"""
+        try:
+            return datetime.strptime(self.date, "%d.%m.%Y").date()
+        except ValueError:
+            return datetime.fromisoformat(self.created_at).date()
+
+
+# Префикс временных папок генерации внутри папки отчётов
+RENDER_DIR_PREFIX = ".render-"
+
+
+def make_render_dir() -> Path:
+    """
+    Собственная временная папка для одной генерации (в папке отчётов, чтобы
+    перенос готового файла был переименованием на том же диске). Имя файла
+    генератора содержит время с точностью до секунды, поэтому параллельные
+    генерации по одному объекту не пишут в один файл. Папку удаляет
+    ReportStore.add.
+    """
+    config.REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=RENDER_DIR_PREFIX, dir=config.REPORTS_DIR))
+
+
+def _is_render_dir(path: Path) -> bool:
+    return path.name.startswith(RENDER_DIR_PREFIX) and path.parent.resolve() == config.REPORTS_DIR.resolve()
+
+
+# Колонки manifest.csv в архиве отчётов
+MANIFEST_FIELDS = ("id", "filename", "archive_name", "protocol_type", "customer", "date",
+                   "created_at", "size", "sha256", "status")
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+
+
+class _ZipStream(io.RawIOBase):
+    """Поток без seek для ZipFile: накапливает записанное до следующей выдачи клиенту"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ReportStore:
+    """
+    Отчёты, созданные веб-сервисом.
+
+    Индекс хранится в JSONL-файле, строки только дописываются: короткая
+    запись в режиме append атомарна, поэтому несколько воркеров могут
+    пользоваться одним индексом без блокировок. Если id не найден, воркер
+    дочитывает индекс с того места, где остановился.
+
+    Содержимое последних отчётов держится в LRU-кэше, ограниченном по
+    суммарному размеру в байтах.
+    """
+
+    def __init__(self, index_file: Path | None = None, cache_max_bytes: int | None = None):
+        config.ensure_directories()
+        self.index_file = Path(index_file or config.REPORTS_INDEX_FILE)
+        self.cache_max_bytes = config.REPORT_CACHE_MAX_BYTES if cache_max_bytes is None else cache_max_bytes
+        self._records: dict[str, ReportRecord] = {}
+        self._index_offset = 0
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cache_bytes = 0
+        self._read_index()
+
+    # --- Индекс ---------------------------------------------------------------
+
+    def _read_index(self) -> None:
+        """Дочитывает новые строки индекса (в том числе записанные другими воркерами)"""
+        try:
+            with open(self.index_file, 'rb') as f:
+                f.seek(self._index_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            app_logger.error(f"Ошибка чтения индекса отчётов: {e}")
+            return
+
+        # Незавершённую последнюю строку (её ещё дописывают) оставляем на потом
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._index_offset += len(complete)
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = ReportRecord(**json.loads(line))
+            except (ValueError, TypeError) as e:
+                app_logger.warning(f"Пропущена повреждённая запись индекса отчётов: {e}")
+                continue
+            self._records[record.id] = record
+
+    def add(
+        self,
+        file_path: str | Path,
+        data: dict | None = None,
+        filename: str | None = None,
+    ) -> tuple[ReportRecord, bytes]:
+        """
+        Регистрирует только что созданный файл отчёта.
+
+        Файл переносится в папку отчётов под именем, содержащим id записи
+        (<имя>_<id>.docx): его не перезапишет следующая генерация, и по
+        старому id всегда отдаётся тот самый отчёт. Размер и время
+        изменения берутся из того же открытого файла, что и содержимое.
+        Временная папка генерации (make_render_dir), в которой лежал файл,
+        удаляется, в том числе при ошибке.
+
+        Args:
+            file_path: Файл отчёта
+            data: Данные протокола (тип, заказчик, дата)
+            filename: Имя для скачивания (по умолчанию — имя файла)
+
+        Returns:
+            tuple: (запись, содержимое файла)
+        """
+        file_path = Path(file_path)
+        filename = filename or file_path.name
+        report_id = uuid.uuid4().hex
+        stored_path = config.REPORTS_DIR / f"{Path(filename).stem}_{report_id}{file_path.suffix}"
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+                stat = os.fstat(f.fileno())
+            # Переименование сохраняет время изменения, так что stat остаётся верным
+            os.replace(file_path, stored_path)
+        finally:
+            if _is_render_dir(file_path.parent):
+                shutil.rmtree(file_path.parent, ignore_errors=True)
+        data = data or {}
+        record = ReportRecord(
+            id=report_id,
+            filename=filename,
+            path=stored_path.name,
+            size=len(content),
+            mtime_ns=stat.st_mtime_ns,
+            sha256=hashlib.sha256(content).hexdigest(),
+            created_at=datetime.now().isoformat(timespec="seconds"),
+            protocol_type=data.get("protocol_type", ""),
+            customer=data.get("customer", ""),
+            date=data.get("date", ""),
+        )
+        line = json.dumps(asdict(record), ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self._records[record.id] = record
+            self._cache_put(record.id, content)
+        return record, content
+
+    def get(self, report_id: str) -> ReportRecord | None:
+        """Запись об отчёте или None"""
+        with self._lock:
+            record = self._records.get(report_id)
+            if record is None:
+                self._read_index()
+                record = self._records.get(report_id)
+            return record
+
+    def list_records(self) -> list[ReportRecord]:
+        """Все известные отчёты в порядке создания"""
+        with self._lock:
+            self._read_index()
+            return list(self._records.values())
+
+    def select(
+        self,
+        ids: Iterable[str] | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        customer: str | None = None,
+    ) -> list[ReportRecord]:
+        """Отбор отчётов по id, диапазону дат протокола и заказчику"""
+        records = self.list_records()
+        if ids is not None:
+            by_id = {record.id: record for record in records}
+            records = [by_id[report_id] for report_id in dict.fromkeys(ids) if report_id in by_id]
+        if date_from is not None:
+            records = [r for r in records if r.report_date >= date_from]
+        if date_to is not None:
+            records = [r for r in records if r.report_date <= date_to]
+        if customer:
+            customer = customer.casefold()
+            records = [r for r in records if r.customer.casefold() == customer]
+        return records
+
+    def resolve_path(self, record: ReportRecord) -> Path:
+        path = Path(record.path)
+        return path if path.is_absolute() else config.REPORTS_DIR / path
+
+    # --- Содержимое -----------------------------------------------------------
+
+    def _cache_put(self, report_id: str, content: bytes) -> None:
+        if len(content) > self.cache_max_bytes:
+            return
+        old = self._cache.pop(report_id, None)
+        if old is not None:
+            self._cache_bytes -= len(old)
+        self._cache[report_id] = content
+        self._cache_bytes += len(content)
+        while self._cache_bytes > self.cache_max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    def read(self, record: ReportRecord) -> bytes | None:
+        """
+        Содержимое отчёта: из кэша или с диска.
+
+        Возвращает None, если файла больше нет или он был перезаписан
+        (размер/время изменения не совпадают с индексом).
+        """
+        with self._lock:
+            content = self._cache.get(record.id)
+            if content is not None:
+                self._cache.move_to_end(record.id)
+        metrics.record_cache("reports", content is not None)
+        if content is not None:
+            return content
+
+        path = self.resolve_path(record)
+        try:
+            stat = path.stat()
+            if stat.st_size != record.size or stat.st_mtime_ns != record.mtime_ns:
+                app_logger.warning(f"Файл отчёта {record.id} изменён на диске: {path}")
+                return None
+            content = path.read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            self._cache_put(record.id, content)
+        return content
+
+    # --- Архив ----------------------------------------------------------------
+
+    def iter_archive(self, records: Iterable[ReportRecord]) -> Iterator[bytes]:
+        """
+        Zip-архив отчётов с manifest.csv, собираемый на лету.
+
+        Файлы читаются с диска кусками по ARCHIVE_CHUNK_SIZE и сразу отдаются
+        клиенту: ни временного файла, ни всего архива в памяти. Отчёты уже
+        сжаты (docx), поэтому кладутся без повторного сжатия. Пропавшие или
+        изменённые файлы не попадают в архив и отмечаются в манифесте.
+        """
+        stream = _ZipStream()
+        manifest_rows = []
+        used_names: set[str] = set()
+        with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+            for record in records:
+                row = {field: getattr(record, field, "") for field in MANIFEST_FIELDS}
+                path = self.resolve_path(record)
+                try:
+                    stat = path.stat()
+                    if stat.st_size != record.size or stat.st_mtime_ns != record.mtime_ns:
+                        raise FileNotFoundError(path)
+                    source = open(path, "rb")
+                except OSError:
+                    row.update(archive_name="", status="missing")
+                    manifest_rows.append(row)
+                    continue
+
+                name = _unique_name(record.filename, used_names)
+                info = zipfile.ZipInfo(name, date_time=datetime.fromtimestamp(stat.st_mtime).timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                info.file_size = stat.st_size
+                with source, archive.open(info, "w") as target:
+                    while True:
+                        chunk = source.read(ARCHIVE_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                        yield stream.drain()
+                row.update(archive_name=name, status="ok")
+                manifest_rows.append(row)
+
+            manifest = io.StringIO()
+            # BOM, чтобы Excel открыл кириллицу без мастера импорта
+            manifest.write("\ufeff")
+            writer = csv.DictWriter(manifest, fieldnames=MANIFEST_FIELDS, extrasaction="ignore", delimiter=";")
+            writer.writeheader()
+            writer.writerows(manifest_rows)
+            archive.writestr("manifest.csv", manifest.getvalue().encode("utf-8"))
+        yield stream.drain()
+
+
+def _unique_name(filename: str, used: set[str]) -> str:
+    """Имя файла в архиве без совпадений"""
+    name = filename
+    stem, suffix = Path(filename).stem, Path(filename).suffix
+    counter = 2
+    while name in used:
+        name = f"{stem}_{counter}{suffix}"
+        counter += 1
+    used.add(name)
+    return name
@@ -0,0 +1,122 @@
+"""
+Замер этапов обработки запроса: заголовок Server-Timing и одна
+структурированная строка лога на запрос
+"""
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from logger import app_logger
+
+_current: ContextVar["RequestTimings | None"] = ContextVar("request_timings", default=None)
+
+# Пути, для которых не пишем строку в лог (опрос мониторинга, статика)
+QUIET_PATH_PREFIXES = ("/metrics", "/static/")
+
+
+class RequestTimings:
+    """Длительности этапов одного запроса (секунды)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.handler_started: float | None = None
+        self.handler_finished: float | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + max(seconds, 0.0)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def header_value(self) -> str:
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current() -> RequestTimings | None:
+    """Замеры текущего запроса или None вне запроса"""
+    return _current.get()
+
+
+def add_phase(name: str, seconds: float) -> None:
+    """Добавляет длительность этапа к текущему запросу (если он есть)"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def phase(name: str):
+    """Замеряет блок кода как этап текущего запроса"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, time.perf_counter() - start)
+
+
+def mark_handler_start() -> None:
+    """
+    Отмечает вход в обработчик: всё время до этого момента (чтение тела,
+    разбор pydantic-модели) записывается как этап parse.
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.handler_started = time.perf_counter()
+        timings.add("parse", timings.handler_started - timings.start)
+
+
+def mark_handler_end() -> None:
+    """Отмечает выход из обработчика; дальше начинается этап response"""
+    timings = _current.get()
+    if timings is not None:
+        timings.handler_finished = time.perf_counter()
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI-middleware: добавляет заголовок Server-Timing и пишет в лог
+    одну JSON-строку с разбивкой по этапам после отправки ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timings.handler_finished is not None:
+                    timings.add("response", time.perf_counter() - timings.handler_finished)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header_value().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            path = scope.get("path", "")
+            if not path.startswith(QUIET_PATH_PREFIXES):
+                app_logger.info("REQUEST " + json.dumps({
+                    "method": scope.get("method"),
+                    "path": path,
+                    "status": status_code,
+                    "total_ms": round(timings.elapsed() * 1000, 1),
+                    "phases_ms": {name: round(sec * 1000, 1) for name, sec in timings.phases.items()},
+                }, ensure_ascii=False))
@@ -1,9 +1,12 @@
 """
 Удобный запуск веб-версии приложения одним кликом.
 Скрипт сам переключается на venv, ставит зависимости и открывает браузер.
+
+Режим для сервера: python start_web.py --production [--workers N]
 """
 from __future__ import annotations
 
+import argparse
 import os
 import subprocess
 import sys
@@ -16,10 +19,12 @@ from pathlib import Path
 import uvicorn
 
 import config
+import metrics
 
 PROJECT_ROOT = Path(__file__).parent.resolve()
 VENV_PYTHON = PROJECT_ROOT / "venv" / "Scripts" / ("python.exe" if os.name == "nt" else "python")
 LAUNCH_URL = "http://localhost:8000"
+READY_URL = f"{LAUNCH_URL}/api/ready"
 
 
 def _running_in_venv() -> bool:
@@ -39,7 +44,7 @@ def ensure_venv():
     print("Переключаюсь на интерпретатор из venv...")
     env = os.environ.copy()
     env["WORDGEN_WEB_INSIDE_VENV"] = "1"
-    subprocess.check_call([str(VENV_PYTHON), __file__], env=env)
+    subprocess.check_call([str(VENV_PYTHON), __file__, *sys.argv[1:]], env=env)
     sys.exit(0)
 
 
@@ -60,13 +65,13 @@ def ensure_dependencies():
 
 
 def open_browser_when_ready(url: str):
-    """Пытается открыть браузер, когда сервер начинает отвечать."""
+    """Открывает браузер, когда сервер прогрелся (/api/ready отвечает 200)."""
 
     def _worker():
-        for _ in range(30):
+        for _ in range(60):
             time.sleep(0.5)
             try:
-                with urllib.request.urlopen(url):  # noqa: S310
+                with urllib.request.urlopen(READY_URL):  # noqa: S310
                     pass
                 break
             except Exception:
@@ -76,6 +81,76 @@ def open_browser_when_ready(url: str):
     threading.Thread(target=_worker, daemon=True).start()
 
 
+def default_workers() -> int:
+    """Число воркеров по умолчанию: WEB_WORKERS или число доступных ядер."""
+    env_value = os.environ.get("WEB_WORKERS")
+    if env_value:
+        return max(1, int(env_value))
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def run_production(host: str, port: int, workers: int):
+    """
+    Запуск на сервере: несколько воркеров по числу ядер.
+
+    На Linux используется gunicorn с preload_app: web_app, python-docx и
+    шаблоны загружаются и прогреваются один раз в мастер-процессе и делятся
+    с воркерами через copy-on-write. Плавный перезапуск воркеров:
+    kill -HUP <pid мастера>. Для обновления кода: kill -USR2, затем
+    kill -QUIT старого мастера.
+
+    На Windows (и без gunicorn) — uvicorn с несколькими воркерами, каждый
+    загружает приложение сам.
+
+    У каждого воркера свои метрики, поэтому при нескольких воркерах они
+    обмениваются снимками через config.METRICS_DIR и /metrics отдаёт сумму.
+    """
+    config.ensure_directories()
+    if workers > 1:
+        metrics.enable_multiprocess()
+    print("=" * 60)
+    print(f"Запуск веб-сервиса (production): http://{host}:{port}, воркеров: {workers}")
+    print(f"Готовность: http://{host}:{port}/api/ready")
+    print("=" * 60)
+
+    try:
+        if os.name == "nt":
+            raise ImportError("gunicorn не поддерживает Windows")
+        from gunicorn.app.base import BaseApplication
+    except ImportError as exc:
+        print(f"gunicorn недоступен ({exc}), запускаю uvicorn с {workers} воркерами")
+        uvicorn.run("web_app:app", host=host, port=port, workers=workers, reload=False)
+        return
+
+    class PreloadedApplication(BaseApplication):
+        """gunicorn-приложение с предварительной загрузкой web_app в мастере."""
+
+        def load_config(self):
+            settings = {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": 30,
+                "timeout": 120,
+                # Периодически перезапускаем воркеры, чтобы не копилась память
+                "max_requests": 1000,
+                "max_requests_jitter": 100,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import web_app
+
+            web_app.warm_up_render()
+            return web_app.app
+
+    PreloadedApplication().run()
+
+
 def main():
     config.ensure_directories()
     print("=" * 60)
@@ -99,8 +174,23 @@ def main():
     )
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Запуск веб-версии генератора протоколов")
+    parser.add_argument("--production", action="store_true",
+                        help="несколько воркеров, без открытия браузера")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="число воркеров (по умолчанию WEB_WORKERS или число ядер)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
     ensure_venv()
     ensure_dependencies()
-    main()
+    args = parse_args()
+    if args.production:
+        run_production(args.host, args.port, args.workers or default_workers())
+    else:
+        main()
 
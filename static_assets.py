@@ -0,0 +1,168 @@
+"""
+Статика веб-версии: имена с хэшем содержимого, заранее сжатые копии
+(gzip и, если установлен пакет brotli, br) и один раз отрисованный index.html
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+from logger import app_logger
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём gzip
+    brotli = None
+
+# Хэшированные имена не меняют содержимого — кэшируем «навсегда»
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Остальное (index, старые нехэшированные ссылки) — только с проверкой ETag
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Service worker отдаётся из корня (/sw.js), чтобы управлять всей страницей
+SERVICE_WORKER_NAME = "sw.js"
+
+# Маленькие файлы не сжимаем: заголовки gzip съедят выигрыш
+MIN_COMPRESS_SIZE = 512
+COMPRESSIBLE_SUFFIXES = {".js", ".css", ".html", ".json", ".svg", ".txt", ".map"}
+
+
+@dataclass
+class Asset:
+    """Один файл со всеми вариантами кодирования"""
+
+    content: bytes
+    media_type: str
+    digest: str
+    immutable: bool = False
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str | None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def choose_encoding(self, accept_encoding: str) -> str | None:
+        """Лучшее из имеющихся кодирований, которое принимает клиент"""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.encoded and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return None
+
+    @property
+    def cache_control(self) -> str:
+        return IMMUTABLE_CACHE_CONTROL if self.immutable else REVALIDATE_CACHE_CONTROL
+
+
+def _parse_accept_encoding(header: str) -> dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def _make_asset(content: bytes, media_type: str, suffix: str, immutable: bool = False) -> Asset:
+    asset = Asset(
+        content=content,
+        media_type=media_type,
+        digest=hashlib.sha256(content).hexdigest()[:16],
+        immutable=immutable,
+    )
+    if suffix in COMPRESSIBLE_SUFFIXES and len(content) >= MIN_COMPRESS_SIZE:
+        asset.encoded["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+        if brotli is not None:
+            asset.encoded["br"] = brotli.compress(content, quality=11)
+    return asset
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """app.js -> app.<hash>.js"""
+    path = Path(name)
+    return str(path.with_name(f"{path.stem}.{digest[:10]}{path.suffix}").as_posix())
+
+
+class StaticAssets:
+    """
+    Собранная при старте статика.
+
+    Каждый файл из web_static доступен под исходным именем (для уже
+    открытых страниц, кэш с проверкой ETag) и под именем с хэшем
+    (кэш на год). Ссылки /static/<имя> в index.html заменяются на
+    хэшированные, сама страница рендерится один раз.
+    """
+
+    def __init__(self, static_dir: Path, templates_env=None, index_template: str = "index.html"):
+        self.files: dict[str, Asset] = {}
+        self.manifest: dict[str, str] = {}
+        self.index: Asset | None = None
+        self.service_worker: Asset | None = None
+        service_worker_source = None
+
+        static_dir = Path(static_dir)
+        if static_dir.exists():
+            for path in sorted(p for p in static_dir.rglob("*") if p.is_file()):
+                name = path.relative_to(static_dir).as_posix()
+                if name == SERVICE_WORKER_NAME:
+                    service_worker_source = path.read_text(encoding="utf-8")
+                    continue
+                media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                # text/* Starlette дополняет charset сам
+                if media_type in ("application/javascript", "application/json"):
+                    media_type += "; charset=utf-8"
+                content = path.read_bytes()
+                asset = _make_asset(content, media_type, path.suffix.lower())
+                hashed = fingerprinted_name(name, asset.digest)
+                self.files[name] = asset
+                self.files[hashed] = replace(asset, immutable=True)
+                self.manifest[name] = hashed
+
+        if templates_env is not None:
+            html = templates_env.get_template(index_template).render()
+            html = self.rewrite_references(html)
+            self.index = _make_asset(html.encode("utf-8"), "text/html", ".html")
+
+        if service_worker_source is not None:
+            self.service_worker = self._render_service_worker(service_worker_source)
+
+        app_logger.info(
+            f"Статика собрана: {len(self.manifest)} файлов"
+            + ("" if brotli is not None else " (brotli не установлен, только gzip)")
+        )
+
+    def rewrite_references(self, html: str) -> str:
+        """Подставляет хэшированные имена вместо /static/<имя>"""
+        def replace(match: re.Match) -> str:
+            name = match.group(1)
+            return f"/static/{self.manifest.get(name, name)}"
+
+        return re.sub(r"/static/([A-Za-z0-9_./-]+)", replace, html)
+
+    def _render_service_worker(self, source: str) -> Asset:
+        """
+        Подставляет в sw.js список файлов оболочки (главная и статика с хэшами)
+        и версию кэша: новая сборка — новый sw.js, браузер обновит кэш сам.
+        Текст sw.js тоже входит в версию: после изменения стратегий кэш
+        оболочки, заполненный прежним воркером, заменяется целиком.
+        """
+        shell = ["/"] + [f"/static/{hashed}" for hashed in self.manifest.values()]
+        version_source = json.dumps(shell) + (self.index.digest if self.index else "") + source
+        version = hashlib.sha256(version_source.encode("utf-8")).hexdigest()[:12]
+        source = source.replace("__APP_SHELL__", json.dumps(shell)).replace("__CACHE_VERSION__", json.dumps(version))
+        return _make_asset(source.encode("utf-8"), "text/javascript", ".js")
+
+    def get(self, name: str) -> Asset | None:
+        return self.files.get(name)
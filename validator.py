@@ -1,13 +1,88 @@
 """
 Модуль валидации вводимых данных
 """
+import hashlib
+import json
 import re
 from datetime import datetime
 
 
 class DataValidator:
     """Класс для валидации данных"""
-    
+
+    # --- Таблицы правил --------------------------------------------------------
+    # Те же таблицы отдаются браузеру (export_rules), поэтому правила и тексты
+    # ошибок меняются только здесь.
+
+    DATE_FORMATS = ['%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y']
+    CUSTOMER_MIN_LENGTH = 3
+    ADDRESS_FIELD = ('object_full_address', 'Адрес/наименование испытываемого объекта', 5)
+    TEMPERATURE_RULE = ('temperature', 'Температура воздуха', -50, 50)
+    WIND_SPEED_RULE = ('wind_speed', 'Скорость ветра', 0, 100)
+
+    VERTICAL_REQUIRED_FIELDS = [
+        ('height', 'Высота', 0.1, 1000),
+        ('width', 'Ширина', 0.1, 1000),
+        ('steps_count', 'Количество ступеней', 1, 1000),
+        ('mount_points', 'Количество точек крепления', 1, 1000),
+        ('step_distance', 'Расстояние между ступенями', 0.01, 10),
+    ]
+    VERTICAL_OPTIONAL_FIELDS = [
+        ('platform_length', 'Длина площадки', 0.1, 100),
+        ('platform_width', 'Ширина площадки', 0.1, 100),
+        ('fence_height', 'Высота ограждения', 0.1, 10),
+        ('ground_distance', 'Расстояние от земли', 0, 100),
+        ('wall_distance', 'Расстояние от стены', 0, 100),
+    ]
+
+    STAIR_MARCH_FIELDS = [
+        ('march_width', 'Ширина марша', 0.5, 10.0),
+        ('march_length', 'Длина марша', 0.5, 50.0),
+        ('step_width', 'Ширина ступени', 0.15, 1.0),
+        ('step_distance', 'Расстояние между ступенями', 0.15, 0.5),
+        ('steps_count', 'Количество ступеней', 1, 100),
+        ('march_fence_height', 'Высота ограждений марша', 0.5, 2.5),
+    ]
+    STAIR_PLATFORM_FIELDS = [
+        ('platform_length', 'Длина площадки', 0.5, 10.0),
+        ('platform_width', 'Ширина площадки', 0.5, 10.0),
+        ('platform_fence_height', 'Высота ограждений площадки', 0.5, 2.5),
+    ]
+    STAIR_PLATFORM_OPTIONAL_FIELDS = [
+        ('platform_ground_distance', 'Расстояние от площадки до земли', 0, 100),
+    ]
+    STAIR_MOUNT_POINTS_RULE = ('mount_points', 'Количество точек крепления', 1, 1000)
+
+    ROOF_NUMERIC_FIELDS = [
+        ('length', 'Длина участка', 1, 1000),
+        ('height', 'Высота ограждения', 0.6, 3.0),
+        ('mount_points', 'Количество точек крепления', 2, 1000),
+    ]
+    ROOF_PARAPET_RULE = ('parapet_height', 'Высота ограждения от парапета', 0.1, 10.0)
+
+    MESSAGES = {
+        'date_empty': "Дата не может быть пустой",
+        'date_format': "Неверный формат даты. Используйте ДД.ММ.ГГГГ",
+        'customer_empty': "Заказчик не может быть пустым",
+        'customer_short': "Имя заказчика слишком короткое",
+        'text_empty': "{field_name} не может быть пустым",
+        'text_short': "{field_name} слишком короткое",
+        'number_below': "{field_name} не может быть меньше {min_value}",
+        'number_above': "{field_name} не может быть больше {max_value}",
+        'number_invalid': "{field_name} должно быть числом",
+        'protocol_unknown': "Неизвестный тип протокола. Выберите корректное значение.",
+        'ladders_empty': '❌ Ошибка заполнения: Добавьте хотя бы одну лестницу',
+        'ladder_field': '{title} лестницы №{i}',
+        'ladder_missing': '❌ Ошибка заполнения лестницы №{i}: Не заполнены обязательные поля: {fields}',
+        'marches_empty': '❌ Ошибка заполнения: Добавьте хотя бы один марш и площадку',
+        'march_field': '{title} (элемент №{i})',
+        'march_missing': '❌ Ошибка заполнения элемента №{i}: Не заполнены обязательные поля: {fields}',
+        'parapet_below_height': (
+            "Высота ограждения от парапета ({parapet_height} м) не может быть меньше "
+            "высоты ограждения ({height} м)"
+        ),
+    }
+
     @staticmethod
     def validate_date(date_str):
         """
@@ -20,18 +95,17 @@ class DataValidator:
             tuple: (bool, str) - (валидность, сообщение об ошибке)
         """
         if not date_str:
-            return False, "Дата не может быть пустой"
+            return False, DataValidator.MESSAGES['date_empty']
         
         # Проверка формата даты
-        date_formats = ['%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y']
-        for fmt in date_formats:
+        for fmt in DataValidator.DATE_FORMATS:
             try:
                 datetime.strptime(date_str, fmt)
                 return True, ""
             except ValueError:
                 continue
         
-        return False, "Неверный формат даты. Используйте ДД.ММ.ГГГГ"
+        return False, DataValidator.MESSAGES['date_format']
     
     @staticmethod
     def validate_customer(customer):
@@ -45,10 +119,10 @@ class DataValidator:
             tuple: (bool, str)
         """
         if not customer or not customer.strip():
-            return False, "Заказчик не может быть пустым"
+            return False, DataValidator.MESSAGES['customer_empty']
         
-        if len(customer) < 3:
-            return False, "Имя заказчика слишком короткое"
+        if len(customer) < DataValidator.CUSTOMER_MIN_LENGTH:
+            return False, DataValidator.MESSAGES['customer_short']
         
         return True, ""
     
@@ -66,10 +140,10 @@ class DataValidator:
             tuple: (bool, str)
         """
         if not text or not text.strip():
-            return False, f"{field_name} не может быть пустым"
+            return False, DataValidator.MESSAGES['text_empty'].format(field_name=field_name)
         
         if len(text.strip()) < min_length:
-            return False, f"{field_name} слишком короткое"
+            return False, DataValidator.MESSAGES['text_short'].format(field_name=field_name)
         
         return True, ""
     
@@ -91,15 +165,15 @@ class DataValidator:
             num = float(value)
             
             if num < min_value:
-                return False, f"{field_name} не может быть меньше {min_value}"
+                return False, DataValidator.MESSAGES['number_below'].format(field_name=field_name, min_value=min_value)
             
             if max_value is not None and num > max_value:
-                return False, f"{field_name} не может быть больше {max_value}"
+                return False, DataValidator.MESSAGES['number_above'].format(field_name=field_name, max_value=max_value)
             
             return True, ""
             
         except (ValueError, TypeError):
-            return False, f"{field_name} должно быть числом"
+            return False, DataValidator.MESSAGES['number_invalid'].format(field_name=field_name)
     
     @staticmethod
     def validate_table_data(table_data):
@@ -140,11 +214,11 @@ class DataValidator:
         from logger import app_logger
         errors = []
         
-        app_logger.info(f"[VALIDATOR] Начало валидации, тип протокола: {data.get('protocol_type', 'не указан')}")
+        app_logger.debug(f"[VALIDATOR] Начало валидации, тип протокола: {data.get('protocol_type', 'не указан')}")
         
         # Валидация даты
         date_val = data.get('date', '')
-        app_logger.info(f"[VALIDATOR] Проверка даты: '{date_val}'")
+        app_logger.debug(f"[VALIDATOR] Проверка даты: '{date_val}'")
         valid, msg = DataValidator.validate_date(date_val)
         if not valid:
             errors.append(msg)
@@ -152,7 +226,7 @@ class DataValidator:
         
         # Валидация заказчика
         customer_val = data.get('customer', '')
-        app_logger.info(f"[VALIDATOR] Проверка заказчика: '{customer_val}'")
+        app_logger.debug(f"[VALIDATOR] Проверка заказчика: '{customer_val}'")
         valid, msg = DataValidator.validate_customer(customer_val)
         if not valid:
             errors.append(msg)
@@ -160,48 +234,50 @@ class DataValidator:
         
         # Валидация адреса/наименования объекта (объединённое поле)
         address_val = data.get('object_full_address', '')
-        app_logger.info(f"[VALIDATOR] Проверка адреса: длина={len(address_val)}")
+        app_logger.debug(f"[VALIDATOR] Проверка адреса: длина={len(address_val)}")
+        _, address_title, address_min_length = DataValidator.ADDRESS_FIELD
         valid, msg = DataValidator.validate_text_field(
             address_val,
-            'Адрес/наименование испытываемого объекта',
-            min_length=5
+            address_title,
+            min_length=address_min_length
         )
         if not valid:
             errors.append(msg)
             app_logger.warning(f"[VALIDATOR] Ошибка адреса: {msg}")
         
         protocol_type = data.get('protocol_type', 'vertical')
-        app_logger.info(f"[VALIDATOR] Валидация протокола типа: {protocol_type}")
+        app_logger.debug(f"[VALIDATOR] Валидация протокола типа: {protocol_type}")
 
         if protocol_type == 'vertical':
-            app_logger.info(f"[VALIDATOR] Валидация вертикальных лестниц...")
+            app_logger.debug(f"[VALIDATOR] Валидация вертикальных лестниц...")
             protocol_errors = DataValidator._validate_vertical_protocol(data)
             errors.extend(protocol_errors)
-            app_logger.info(f"[VALIDATOR] Ошибок в протоколе: {len(protocol_errors)}")
+            app_logger.debug(f"[VALIDATOR] Ошибок в протоколе: {len(protocol_errors)}")
         elif protocol_type == 'stair':
-            app_logger.info(f"[VALIDATOR] Валидация маршевых лестниц...")
+            app_logger.debug(f"[VALIDATOR] Валидация маршевых лестниц...")
             protocol_errors = DataValidator._validate_stair_protocol(data)
             errors.extend(protocol_errors)
-            app_logger.info(f"[VALIDATOR] Ошибок в протоколе: {len(protocol_errors)}")
+            app_logger.debug(f"[VALIDATOR] Ошибок в протоколе: {len(protocol_errors)}")
         elif protocol_type == 'roof':
-            app_logger.info(f"[VALIDATOR] Валидация ограждений кровли...")
+            app_logger.debug(f"[VALIDATOR] Валидация ограждений кровли...")
             protocol_errors = DataValidator._validate_roof_protocol(data)
             errors.extend(protocol_errors)
-            app_logger.info(f"[VALIDATOR] Ошибок в протоколе: {len(protocol_errors)}")
+            app_logger.debug(f"[VALIDATOR] Ошибок в протоколе: {len(protocol_errors)}")
         else:
-            error_msg = "Неизвестный тип протокола. Выберите корректное значение."
+            error_msg = DataValidator.MESSAGES['protocol_unknown']
             errors.append(error_msg)
             app_logger.error(f"[VALIDATOR] {error_msg}")
         
         # Валидация температуры
         if data.get('temperature'):
             temp_val = data.get('temperature', '')
-            app_logger.info(f"[VALIDATOR] Проверка температуры: '{temp_val}'")
+            app_logger.debug(f"[VALIDATOR] Проверка температуры: '{temp_val}'")
+            _, title, min_val, max_val = DataValidator.TEMPERATURE_RULE
             valid, msg = DataValidator.validate_number(
                 temp_val,
-                'Температура воздуха',
-                min_value=-50,
-                max_value=50
+                title,
+                min_value=min_val,
+                max_value=max_val
             )
             if not valid:
                 errors.append(msg)
@@ -210,19 +286,20 @@ class DataValidator:
         # Валидация скорости ветра
         if data.get('wind_speed'):
             wind_val = data.get('wind_speed', '')
-            app_logger.info(f"[VALIDATOR] Проверка скорости ветра: '{wind_val}'")
+            app_logger.debug(f"[VALIDATOR] Проверка скорости ветра: '{wind_val}'")
+            _, title, min_val, max_val = DataValidator.WIND_SPEED_RULE
             valid, msg = DataValidator.validate_number(
                 wind_val,
-                'Скорость ветра',
-                min_value=0,
-                max_value=100
+                title,
+                min_value=min_val,
+                max_value=max_val
             )
             if not valid:
                 errors.append(msg)
                 app_logger.warning(f"[VALIDATOR] Ошибка скорости ветра: {msg}")
         
         result_valid = len(errors) == 0
-        app_logger.info(f"[VALIDATOR] Итог валидации: valid={result_valid}, ошибок={len(errors)}")
+        app_logger.debug(f"[VALIDATOR] Итог валидации: valid={result_valid}, ошибок={len(errors)}")
         if errors:
             app_logger.warning(f"[VALIDATOR] Список ошибок: {errors}")
         
@@ -232,51 +309,36 @@ class DataValidator:
 
     @staticmethod
     def _validate_vertical_protocol(data):
+        messages = DataValidator.MESSAGES
         errors = []
         ladders = data.get('ladders', [])
         if not ladders or len(ladders) == 0:
-            errors.append('❌ Ошибка заполнения: Добавьте хотя бы одну лестницу')
+            errors.append(messages['ladders_empty'])
             return errors
 
         for i, ladder in enumerate(ladders, 1):
             ladder_errors = []
 
-            required_fields = [
-                ('height', 'Высота', 0.1, 1000),
-                ('width', 'Ширина', 0.1, 1000),
-                ('steps_count', 'Количество ступеней', 1, 1000),
-                ('mount_points', 'Количество точек крепления', 1, 1000),
-                ('step_distance', 'Расстояние между ступенями', 0.01, 10),
-            ]
-
-            for field, title, min_val, max_val in required_fields:
+            for field, title, min_val, max_val in DataValidator.VERTICAL_REQUIRED_FIELDS:
                 value = str(ladder.get(field, '')).strip()
                 if not value:
                     ladder_errors.append(title)
                 else:
                     valid, msg = DataValidator.validate_number(
                         ladder.get(field, ''),
-                        f'{title} лестницы №{i}',
+                        messages['ladder_field'].format(title=title, i=i),
                         min_value=min_val,
                         max_value=max_val
                     )
                     if not valid:
                         errors.append(msg)
 
-            optional_numeric_fields = [
-                ('platform_length', 'Длина площадки', 0.1, 100),
-                ('platform_width', 'Ширина площадки', 0.1, 100),
-                ('fence_height', 'Высота ограждения', 0.1, 10),
-                ('ground_distance', 'Расстояние от земли', 0, 100),
-                ('wall_distance', 'Расстояние от стены', 0, 100),
-            ]
-
-            for field, title, min_val, max_val in optional_numeric_fields:
+            for field, title, min_val, max_val in DataValidator.VERTICAL_OPTIONAL_FIELDS:
                 value = str(ladder.get(field, '')).strip()
                 if value:
                     valid, msg = DataValidator.validate_number(
                         ladder.get(field, ''),
-                        f'{title} лестницы №{i}',
+                        messages['ladder_field'].format(title=title, i=i),
                         min_value=min_val,
                         max_value=max_val
                     )
@@ -285,18 +347,18 @@ class DataValidator:
 
             if ladder_errors:
                 error_fields = ', '.join(ladder_errors)
-                error_msg = f'❌ Ошибка заполнения лестницы №{i}: Не заполнены обязательные поля: {error_fields}'
-                errors.append(error_msg)
+                errors.append(messages['ladder_missing'].format(i=i, fields=error_fields))
 
         return errors
 
     @staticmethod
     def _validate_stair_protocol(data):
+        messages = DataValidator.MESSAGES
         errors = []
         marches = data.get('marches', [])
         
         if not marches or len(marches) == 0:
-            errors.append('❌ Ошибка заполнения: Добавьте хотя бы один марш и площадку')
+            errors.append(messages['marches_empty'])
             return errors
         
         for i, march in enumerate(marches, 1):
@@ -304,64 +366,35 @@ class DataValidator:
             has_march = march.get('has_march', True)
             has_platform = march.get('has_platform', True)
             
-            # Валидация полей марша
+            # Обязательные поля марша и площадки
+            required_fields = []
             if has_march:
-                march_fields = [
-                    ('march_width', 'Ширина марша', 0.5, 10.0),
-                    ('march_length', 'Длина марша', 0.5, 50.0),
-                    ('step_width', 'Ширина ступени', 0.15, 1.0),
-                    ('step_distance', 'Расстояние между ступенями', 0.15, 0.5),
-                    ('steps_count', 'Количество ступеней', 1, 100),
-                    ('march_fence_height', 'Высота ограждений марша', 0.5, 2.5),
-                ]
-                
-                for field, title, min_val, max_val in march_fields:
-                    value = str(march.get(field, '')).strip()
-                    if not value:
-                        march_errors.append(title)
-                    else:
-                        valid, msg = DataValidator.validate_number(
-                            march.get(field, ''),
-                            f'{title} (элемент №{i})',
-                            min_value=min_val,
-                            max_value=max_val
-                        )
-                        if not valid:
-                            errors.append(msg)
-            
-            # Валидация полей площадки
+                required_fields += DataValidator.STAIR_MARCH_FIELDS
             if has_platform:
-                platform_fields = [
-                    ('platform_length', 'Длина площадки', 0.5, 10.0),
-                    ('platform_width', 'Ширина площадки', 0.5, 10.0),
-                    ('platform_fence_height', 'Высота ограждений площадки', 0.5, 2.5),
-                ]
-                
-                for field, title, min_val, max_val in platform_fields:
-                    value = str(march.get(field, '')).strip()
-                    if not value:
-                        march_errors.append(title)
-                    else:
-                        valid, msg = DataValidator.validate_number(
-                            march.get(field, ''),
-                            f'{title} (элемент №{i})',
-                            min_value=min_val,
-                            max_value=max_val
-                        )
-                        if not valid:
-                            errors.append(msg)
+                required_fields += DataValidator.STAIR_PLATFORM_FIELDS
+            
+            for field, title, min_val, max_val in required_fields:
+                value = str(march.get(field, '')).strip()
+                if not value:
+                    march_errors.append(title)
+                else:
+                    valid, msg = DataValidator.validate_number(
+                        march.get(field, ''),
+                        messages['march_field'].format(title=title, i=i),
+                        min_value=min_val,
+                        max_value=max_val
+                    )
+                    if not valid:
+                        errors.append(msg)
             
             # Опциональные поля площадки
             if has_platform:
-                optional_fields = [
-                    ('platform_ground_distance', 'Расстояние от площадки до земли', 0, 100),
-                ]
-                for field, title, min_val, max_val in optional_fields:
+                for field, title, min_val, max_val in DataValidator.STAIR_PLATFORM_OPTIONAL_FIELDS:
                     value = str(march.get(field, '')).strip()
                     if value:  # Проверяем только если заполнено
                         valid, msg = DataValidator.validate_number(
                             march.get(field, ''),
-                            f'{title} (элемент №{i})',
+                            messages['march_field'].format(title=title, i=i),
                             min_value=min_val,
                             max_value=max_val
                         )
@@ -370,19 +403,19 @@ class DataValidator:
             
             if march_errors:
                 error_fields = ', '.join(march_errors)
-                error_msg = f'❌ Ошибка заполнения элемента №{i}: Не заполнены обязательные поля: {error_fields}'
-                errors.append(error_msg)
+                errors.append(messages['march_missing'].format(i=i, fields=error_fields))
 
         # Валидация количества точек крепления (обязательное поле)
-        mount_points = data.get('mount_points', '').strip()
+        field, title, min_val, max_val = DataValidator.STAIR_MOUNT_POINTS_RULE
+        mount_points = data.get(field, '').strip()
         if not mount_points:
-            errors.append('Количество точек крепления не может быть пустым')
+            errors.append(messages['text_empty'].format(field_name=title))
         else:
             valid, msg = DataValidator.validate_number(
                 mount_points,
-                'Количество точек крепления',
-                min_value=1,
-                max_value=1000
+                title,
+                min_value=min_val,
+                max_value=max_val
             )
             if not valid:
                 errors.append(msg)
@@ -393,16 +426,12 @@ class DataValidator:
 
     @staticmethod
     def _validate_roof_protocol(data):
+        messages = DataValidator.MESSAGES
         errors = []
-        numeric_fields = [
-            ('length', 'Длина участка', 1, 1000),
-            ('height', 'Высота ограждения', 0.6, 3.0),
-            ('mount_points', 'Количество точек крепления', 2, 1000),
-        ]
-        for field, title, min_val, max_val in numeric_fields:
+        for field, title, min_val, max_val in DataValidator.ROOF_NUMERIC_FIELDS:
             value = str(data.get(field, '')).strip()
             if not value:
-                errors.append(f"{title} не может быть пустым")
+                errors.append(messages['text_empty'].format(field_name=title))
             else:
                 valid, msg = DataValidator.validate_number(
                     data.get(field, ''),
@@ -414,13 +443,14 @@ class DataValidator:
                     errors.append(msg)
 
         # Валидация высоты от парапета (если заполнена)
-        parapet_height_str = str(data.get('parapet_height', '')).strip()
+        field, title, min_val, max_val = DataValidator.ROOF_PARAPET_RULE
+        parapet_height_str = str(data.get(field, '')).strip()
         if parapet_height_str:
             valid, msg = DataValidator.validate_number(
                 parapet_height_str,
-                'Высота ограждения от парапета',
-                min_value=0.1,
-                max_value=10.0
+                title,
+                min_value=min_val,
+                max_value=max_val
             )
             if not valid:
                 errors.append(msg)
@@ -432,12 +462,86 @@ class DataValidator:
                     if height_str:
                         height = float(height_str.replace(',', '.'))
                         if parapet_height < height:
-                            errors.append(
-                                f"Высота ограждения от парапета ({parapet_height} м) не может быть меньше "
-                                f"высоты ограждения ({height} м)"
-                            )
+                            errors.append(messages['parapet_below_height'].format(
+                                parapet_height=parapet_height,
+                                height=height,
+                            ))
                 except (ValueError, TypeError):
                     pass  # Уже обработано выше
 
         return errors
 
+    # --- Экспорт правил для браузера --------------------------------------------
+
+    @staticmethod
+    def _export_rule(rule):
+        field, title, min_val, max_val = rule
+        # *_label — так, как число выводит Python (10.0, а не 10), чтобы тексты
+        # ошибок в браузере совпадали с серверными
+        return {
+            'field': field,
+            'title': title,
+            'min': min_val,
+            'max': max_val,
+            'min_label': str(min_val),
+            'max_label': str(max_val),
+        }
+
+    @staticmethod
+    def export_rules():
+        """
+        Правила валидации в виде JSON-совместимого словаря для клиентской
+        проверки. Поле version — хэш содержимого: меняется вместе с правилами.
+        """
+        rule = DataValidator._export_rule
+        address_field, address_title, address_min_length = DataValidator.ADDRESS_FIELD
+        rules = {
+            'schema': 1,
+            'messages': dict(DataValidator.MESSAGES),
+            'date_formats': list(DataValidator.DATE_FORMATS),
+            'customer_min_length': DataValidator.CUSTOMER_MIN_LENGTH,
+            'address': {'field': address_field, 'title': address_title, 'min_length': address_min_length},
+            'optional_numbers': [rule(DataValidator.TEMPERATURE_RULE), rule(DataValidator.WIND_SPEED_RULE)],
+            'protocols': {
+                'vertical': {
+                    'items': 'ladders',
+                    'item_field_message': 'ladder_field',
+                    'item_missing_message': 'ladder_missing',
+                    'empty_message': 'ladders_empty',
+                    'groups': [{
+                        'flag': None,
+                        'required': [rule(r) for r in DataValidator.VERTICAL_REQUIRED_FIELDS],
+                        'optional': [rule(r) for r in DataValidator.VERTICAL_OPTIONAL_FIELDS],
+                    }],
+                    'required': [],
+                    'optional': [],
+                },
+                'stair': {
+                    'items': 'marches',
+                    'item_field_message': 'march_field',
+                    'item_missing_message': 'march_missing',
+                    'empty_message': 'marches_empty',
+                    'groups': [
+                        {'flag': 'has_march', 'required': [rule(r) for r in DataValidator.STAIR_MARCH_FIELDS],
+                         'optional': []},
+                        {'flag': 'has_platform', 'required': [rule(r) for r in DataValidator.STAIR_PLATFORM_FIELDS],
+                         'optional': []},
+                        {'flag': 'has_platform', 'required': [],
+                         'optional': [rule(r) for r in DataValidator.STAIR_PLATFORM_OPTIONAL_FIELDS]},
+                    ],
+                    'required': [rule(DataValidator.STAIR_MOUNT_POINTS_RULE)],
+                    'optional': [],
+                },
+                'roof': {
+                    'items': None,
+                    'groups': [],
+                    'required': [rule(r) for r in DataValidator.ROOF_NUMERIC_FIELDS],
+                    'optional': [rule(DataValidator.ROOF_PARAPET_RULE)],
+                    'not_less_than': [{'field': 'parapet_height', 'other': 'height',
+                                       'message': 'parapet_below_height'}],
+                },
+            },
+        }
+        canonical = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+        rules['version'] = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+        return rules
@@ -1,18 +1,30 @@
 """
 Модуль для получения данных о погоде
 """
+import threading
+import time
+
 import requests
 from logger import app_logger
+import metrics
 
 
 class WeatherService:
     """Сервис для получения погодных данных"""
     
-    def __init__(self):
+    def __init__(self, cache_ttl=600):
+        """
+        Args:
+            cache_ttl (int): Время жизни закэшированной погоды в секундах
+        """
         # Координаты Екатеринбурга
         self.city_name = "Екатеринбург"
         self.lat = 56.8389
         self.lon = 60.6057
+        self.cache_ttl = cache_ttl
+        self._cached = None
+        self._cached_at = 0.0
+        self._lock = threading.Lock()
         
     def get_current_weather(self):
         """
@@ -21,6 +33,21 @@ class WeatherService:
         Returns:
             dict: {'temperature': float, 'wind_speed': float} или None при ошибке
         """
+        with self._lock:
+            if self._cached and time.monotonic() - self._cached_at < self.cache_ttl:
+                metrics.record_cache("weather", hit=True)
+                return dict(self._cached)
+        metrics.record_cache("weather", hit=False)
+        
+        result = self._fetch_weather()
+        if result:
+            with self._lock:
+                self._cached = dict(result)
+                self._cached_at = time.monotonic()
+        return result
+    
+    def _fetch_weather(self):
+        """Запрашивает погоду у внешних источников"""
         # Пробуем несколько источников
         
         # Способ 1: wttr.in (без API ключа)
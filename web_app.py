@@ -1,28 +1,181 @@
 """
 Веб-приложение для генерации протоколов
 """
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from urllib.parse import quote
-from fastapi.staticfiles import StaticFiles
 from starlette.templating import Jinja2Templates
 from fastapi.exceptions import RequestValidationError
-from pydantic import BaseModel, Field, ValidationError
-from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager, suppress
+from datetime import date, datetime
+import asyncio
 import os
 import re
+import shutil
+import tempfile
+import time
 import unicodedata
 from pathlib import Path
 
-from document_generator import DocumentGenerator
+from admission import PRIORITIES, PRIORITY_INTERACTIVE, AdmissionController, AdmissionRejected
+from generator_factory import GeneratorFactory
+from report_store import ReportStore, make_render_dir
+from static_assets import StaticAssets
+from report_payload import REPORT_OPENAPI_EXTRA, SAMPLE_REPORTS, ReportData, decode_report, to_generator_input
 from validator import DataValidator
 from logger import app_logger
 from contracts_db import ContractsDatabase
+from contracts_watcher import start_contracts_watcher
 from history_manager import HistoryManager
 from weather_service import WeatherService
 import config
+import metrics
+import request_timing
 
-app = FastAPI(title="Генератор протоколов")
+def warm_up_render():
+    """
+    Пробная генерация каждого типа протокола во временную папку.
+
+    Подгружает python-docx, шаблон документа и стили заранее, чтобы первый
+    настоящий запрос не платил за это. Вызывается в каждом воркере перед
+    приёмом запросов и в мастер-процессе start_web.py перед fork.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for protocol_type, payload in SAMPLE_REPORTS.items():
+            data = to_generator_input(ReportData.model_validate(payload))
+            generator = GeneratorFactory.create(protocol_type, data)
+            generator.validate()
+            generator.generate_doc(tmp_dir)
+
+
+def acquire_refresh_lock():
+    """
+    Неблокирующая межпроцессная блокировка обновления базы договоров.
+
+    При нескольких воркерах папку сканирует только владелец блокировки,
+    остальные перечитывают contracts_db.json после его обновления.
+
+    Returns:
+        file или None: открытый файл блокировки (держать до завершения) или None
+    """
+    handle = open(config.WORK_DIR / "contracts_refresh.lock", "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+# Как часто воркер без блокировки проверяет, не обновил ли базу другой процесс (секунды)
+CONTRACTS_RELOAD_CHECK_INTERVAL = 60
+# То же при включённом наблюдении за папкой: база меняется в течение
+# нескольких секунд после изменения договора, а проверка — один stat
+CONTRACTS_WATCH_RELOAD_CHECK_INTERVAL = 5
+
+
+async def refresh_contracts_periodically(contracts_db: ContractsDatabase, interval: float):
+    """
+    Фоновая задача: пересканирует папку договоров по расписанию.
+
+    Сканирование идёт в отдельном потоке, а база подменяет индекс
+    атомарно, поэтому запросы автозаполнения не ждут пересканирования.
+    Владелец блокировки, кроме того, наблюдает за папкой (ContractsWatcher),
+    так что между пересканированиями новые договоры появляются за секунды.
+    """
+    lock_handle = None
+    watcher = None
+    reload_interval = min(
+        interval,
+        CONTRACTS_WATCH_RELOAD_CHECK_INTERVAL if config.CONTRACTS_WATCH else CONTRACTS_RELOAD_CHECK_INTERVAL,
+    )
+    try:
+        while True:
+            if lock_handle is None:
+                lock_handle = acquire_refresh_lock()
+            try:
+                if lock_handle is not None:
+                    await asyncio.to_thread(contracts_db.refresh_from_directory, config.EXTERNAL_CONTRACTS_DIR)
+                    if watcher is None or not watcher.is_alive():
+                        # Поток наблюдения мог завершиться — запускаем заново
+                        watcher = start_contracts_watcher(contracts_db)
+                else:
+                    await asyncio.to_thread(contracts_db.reload_if_changed)
+            except Exception as e:
+                app_logger.error(f"Ошибка фонового обновления базы договоров: {e}")
+            await asyncio.sleep(interval if lock_handle is not None else reload_interval)
+    finally:
+        if watcher is not None:
+            await asyncio.to_thread(watcher.stop)
+        if lock_handle is not None:
+            lock_handle.close()
+
+
+async def flush_metrics_periodically(interval: float):
+    """Фоновая задача воркера: обновляет снимок его метрик для /metrics других воркеров"""
+    try:
+        while True:
+            await asyncio.to_thread(metrics.write_snapshot)
+            await asyncio.sleep(interval)
+    finally:
+        # Воркер завершается: счётчики остаются в сумме, gauge — нет
+        await asyncio.to_thread(metrics.write_snapshot, alive=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Создание сервисов при запуске и остановка фоновых задач при завершении"""
+    config.ensure_directories()
+    app.state.contracts_db = ContractsDatabase()
+    app.state.history_manager = HistoryManager()
+    app.state.weather_service = WeatherService()
+    app.state.report_store = ReportStore()
+    app.state.static_assets = StaticAssets(static_dir, templates.env)
+    app.state.generate_admission = AdmissionController(
+        "generate",
+        max_concurrency=config.GENERATE_MAX_CONCURRENCY,
+        max_queue=config.GENERATE_MAX_QUEUE,
+        queue_timeout=config.GENERATE_QUEUE_TIMEOUT,
+        reserved_interactive=config.GENERATE_INTERACTIVE_RESERVED,
+        bulk_max_queue=config.GENERATE_BULK_MAX_QUEUE,
+    )
+    app.state.ready = False
+    app.state.warm_up_error = None
+
+    try:
+        warm_up_start = time.perf_counter()
+        await asyncio.to_thread(warm_up_render)
+        app.state.ready = True
+        app_logger.info(f"Прогрев генераторов завершён за {time.perf_counter() - warm_up_start:.2f} с")
+    except Exception as e:
+        app.state.warm_up_error = str(e)
+        app_logger.error(f"Ошибка прогрева генераторов: {e}")
+
+    refresh_task = None
+    if config.CONTRACTS_REFRESH_INTERVAL > 0:
+        refresh_task = asyncio.create_task(
+            refresh_contracts_periodically(app.state.contracts_db, config.CONTRACTS_REFRESH_INTERVAL)
+        )
+    metrics_task = None
+    if metrics.multiprocess_enabled():
+        metrics_task = asyncio.create_task(flush_metrics_periodically(config.METRICS_FLUSH_INTERVAL))
+    try:
+        yield
+    finally:
+        for task in (refresh_task, metrics_task):
+            if task:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
+
+app = FastAPI(title="Генератор протоколов", lifespan=lifespan)
+app.add_middleware(request_timing.ServerTimingMiddleware)
 
 # Глобальный обработчик ошибок
 @app.exception_handler(Exception)
@@ -56,17 +209,8 @@ async def validation_exception_handler(request, exc):
 static_dir = Path(__file__).parent / "web_static"
 templates_dir = Path(__file__).parent / "web_templates"
 
-if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-
 templates = Jinja2Templates(directory=str(templates_dir))
 
-# Инициализация сервисов
-contracts_db = ContractsDatabase()
-history_manager = HistoryManager()
-weather_service = WeatherService()
-
-
 def build_download_headers(filename: str) -> tuple[str, str]:
     """
     Возвращает ASCII-безопасное имя файла и корректный Content-Disposition.
@@ -89,95 +233,110 @@ def build_download_headers(filename: str) -> tuple[str, str]:
 
     return ascii_name, content_disposition
 
-# Модели данных
-class LadderData(BaseModel):
-    number: int
-    name: Optional[str] = ""
-    height: str
-    width: str
-    steps_count: str
-    mount_points: str
-    platform_length: Optional[str] = ""
-    platform_width: Optional[str] = ""
-    fence_height: Optional[str] = ""
-    wall_distance: Optional[str] = ""
-    ground_distance: Optional[str] = ""
-    step_distance: str
-    damage_found: bool = False
-    mount_violation_found: bool = False
-    weld_violation_found: bool = False
-    paint_compliant: bool = True
-
-class MarchData(BaseModel):
-    number: int
-    has_march: bool = True
-    has_platform: bool = True
-    march_width: Optional[str] = ""
-    march_length: Optional[str] = ""
-    step_width: Optional[str] = ""
-    step_distance: Optional[str] = ""
-    steps_count: Optional[str] = ""
-    march_fence_height: Optional[str] = ""
-    platform_length: Optional[str] = ""
-    platform_width: Optional[str] = ""
-    platform_fence_height: Optional[str] = ""
-    platform_ground_distance: Optional[str] = ""
-
-class ReportData(BaseModel):
-    protocol_type: str = "vertical"
-    date: str
-    customer: str
-    object_full_address: str
-    test_time: str = "дневное время"
-    temperature: Optional[str] = ""
-    wind_speed: Optional[str] = ""
-    
-    # Для вертикальных лестниц
-    ladders: List[LadderData] = []
-    ladders_compliance: Dict[str, Any] = {}
-    
-    # Для маршевых лестниц
-    ladder_name: Optional[str] = ""
-    mount_points: Optional[str] = ""
-    marches: List[MarchData] = []
-    
-    # Для ограждений кровли
-    fence_name: Optional[str] = ""
-    length: Optional[str] = ""
-    height: Optional[str] = ""
-    mount_points_roof: Optional[str] = ""
-    mount_pitch: Optional[str] = ""
-    parapet_height: Optional[str] = ""
-    
-    # Визуальный осмотр (для маршевых и ограждений)
-    damage_found: bool = False
-    mount_violation_found: bool = False
-    weld_violation_found: bool = False
-    paint_compliant: bool = True
-    
-    # Соответствие нормам
-    project_compliant: bool = False
-    project_number: Optional[str] = ""
+
+async def report_payload(request: Request) -> dict:
+    """Зависимость: тело запроса → словарь входных данных генератора"""
+    return decode_report(await request.body())
+
+
+def request_priority(request: Request) -> str:
+    """
+    Зависимость: класс приоритета генерации.
+
+    Приоритет, назначенный API-ключу (X-API-Key), важнее заголовка
+    X-Priority; без обоих запрос считается интерактивным.
+    """
+    api_key = request.headers.get("x-api-key")
+    priority = config.API_KEY_PRIORITIES.get(api_key) if api_key else None
+    if priority is None:
+        priority = request.headers.get("x-priority", PRIORITY_INTERACTIVE).strip().lower()
+    if priority not in PRIORITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный приоритет: {priority}. Допустимые значения: {', '.join(PRIORITIES)}",
+        )
+    return priority
+
+
+def _observe_generate_phase(phase: str, seconds: float) -> None:
+    """Учитывает этап генерации в метриках и в заголовке Server-Timing"""
+    metrics.GENERATE_PHASE_LATENCY.labels(phase=phase).observe(seconds)
+    request_timing.add_phase(phase, seconds)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _asset_response(asset, request: Request) -> Response:
+    """Ответ со статикой: выбор gzip/br, ETag и условный GET"""
+    encoding = asset.choose_encoding(request.headers.get("accept-encoding", ""))
+    etag = asset.etag(encoding)
+    headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=asset.encoded[encoding] if encoding else asset.content,
+        headers=headers,
+        media_type=asset.media_type,
+    )
 
 
-@app.get("/", response_class=HTMLResponse)
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
 async def read_root(request: Request):
-    """Главная страница"""
-    try:
-        app_logger.info("Запрос главной страницы")
-        response = templates.TemplateResponse("index.html", {"request": request})
-        app_logger.info("Главная страница успешно отдана")
-        return response
-    except Exception as e:
-        app_logger.error(f"Ошибка при отдаче главной страницы: {e}")
-        import traceback
-        app_logger.error(traceback.format_exc())
-        raise
+    """Главная страница (отрисована при старте, ссылки на статику с хэшем)"""
+    index = request.app.state.static_assets.index
+    if index is None:
+        raise HTTPException(status_code=404, detail="Шаблон главной страницы не найден")
+    return _asset_response(index, request)
+
+
+@app.api_route("/sw.js", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_service_worker(request: Request):
+    """Service worker (офлайн-режим); всегда с проверкой ETag, чтобы обновления доходили сразу"""
+    service_worker = request.app.state.static_assets.service_worker
+    if service_worker is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _asset_response(service_worker, request)
+
+
+@app.api_route("/static/{name:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_static(name: str, request: Request):
+    """Статика из памяти: хэшированные имена кэшируются на год"""
+    asset = request.app.state.static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _asset_response(asset, request)
+
+
+@app.get("/api/ready")
+async def get_ready(request: Request):
+    """Готовность воркера: 200 после успешной пробной генерации, иначе 503"""
+    if getattr(request.app.state, "ready", False):
+        return {"ready": True}
+    return JSONResponse(
+        status_code=503,
+        content={"ready": False, "error": getattr(request.app.state, "warm_up_error", None)},
+    )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Метрики в текстовом формате Prometheus"""
+    content = await asyncio.to_thread(metrics.render_latest)
+    return PlainTextResponse(content, media_type=metrics.CONTENT_TYPE_LATEST)
 
 
 @app.get("/api/customers")
-async def get_customers():
+@metrics.instrument("customers")
+async def get_customers(request: Request):
     """Получение списка заказчиков"""
+    history_manager = request.app.state.history_manager
+    contracts_db = request.app.state.contracts_db
     try:
         # Получаем заказчиков из разных источников
         recent_customers = history_manager.get_recent_customers()
@@ -194,9 +353,11 @@ async def get_customers():
 
 
 @app.get("/api/customer/{customer_name}")
-async def get_customer_contract(customer_name: str):
+@metrics.instrument("customer")
+async def get_customer_contract(customer_name: str, request: Request):
     """Получение договора по заказчику для автозаполнения"""
     try:
+        contracts_db = request.app.state.contracts_db
         contract = contracts_db.get_latest_contract_for_customer(customer_name)
         if contract:
             return {
@@ -204,17 +365,39 @@ async def get_customer_contract(customer_name: str):
                 "object_full_address": contract.get('object_full_address', ''),
                 "file_name": contract.get('file_name', '')
             }
-        return {"found": False, "object_full_address": ""}
+        # Опечатка или название без кавычек — предлагаем похожих заказчиков
+        return {
+            "found": False,
+            "object_full_address": "",
+            "suggestions": contracts_db.find_similar_customer(customer_name, limit=5),
+        }
     except Exception as e:
         app_logger.error(f"Ошибка получения договора: {e}")
         return {"found": False, "object_full_address": ""}
 
 
+@app.get("/api/contracts/search")
+@metrics.instrument("contracts_search")
+async def search_contracts(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Слова для поиска (улица, объект, заказчик)"),
+    limit: int = Query(20, ge=1, le=100, description="Результатов на странице"),
+    offset: int = Query(0, ge=0, description="Сколько результатов пропустить"),
+):
+    """Полнотекстовый поиск договоров, лучшие совпадения первыми"""
+    contracts_db = request.app.state.contracts_db
+    if not contracts_db.search_index.available:
+        raise HTTPException(status_code=503, detail="Полнотекстовый поиск недоступен")
+    total, results = await asyncio.to_thread(contracts_db.search_contracts, q, limit, offset)
+    return {"query": q, "total": total, "limit": limit, "offset": offset, "results": results}
+
+
 @app.get("/api/weather")
-async def get_weather():
+@metrics.instrument("weather")
+async def get_weather(request: Request):
     """Получение текущей погоды"""
     try:
-        weather = weather_service.get_current_weather()
+        weather = request.app.state.weather_service.get_current_weather()
         if weather:
             return {
                 "success": True,
@@ -233,36 +416,28 @@ async def get_weather():
         }
 
 
-@app.post("/api/validate")
-async def validate_data(data: ReportData):
+VALIDATION_RULES = DataValidator.export_rules()
+
+
+@app.get("/api/validation-rules")
+async def get_validation_rules(request: Request):
+    """Правила валидации для проверки формы в браузере (версия — в ETag)"""
+    etag = f'"{VALIDATION_RULES["version"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=VALIDATION_RULES, headers=headers)
+
+
+@app.post("/api/validate", openapi_extra=REPORT_OPENAPI_EXTRA)
+@metrics.instrument("validate")
+async def validate_data(data: dict = Depends(report_payload)):
     """Валидация данных"""
     try:
-        app_logger.info(f"=== ВАЛИДАЦИЯ ДАННЫХ ===")
-        app_logger.info(f"Тип протокола: {data.protocol_type}")
-        
-        # Преобразуем Pydantic модель в dict
-        data_dict = data.model_dump()
-        
-        # Преобразуем ladders и marches в нужный формат
-        if data.protocol_type == "vertical":
-            app_logger.info(f"Валидация вертикальных лестниц: {len(data.ladders)} лестниц")
-            data_dict["ladders"] = [l.model_dump() for l in data.ladders]
-            # Для вертикальных лестниц нужны данные соответствия
-            if not data_dict.get("ladders_compliance"):
-                data_dict["ladders_compliance"] = {}
-        elif data.protocol_type == "stair":
-            app_logger.info(f"Валидация маршевых лестниц: {len(data.marches)} маршей")
-            data_dict["marches"] = [m.model_dump() for m in data.marches]
-            data_dict["mount_points"] = data.mount_points
-        elif data.protocol_type == "roof":
-            app_logger.info(f"Валидация ограждений кровли")
-            data_dict["mount_points"] = data.mount_points_roof
-        
-        # Валидация
-        app_logger.info("Вызов DataValidator.validate_all_data...")
-        is_valid, errors = DataValidator.validate_all_data(data_dict)
+        with request_timing.phase("validate"):
+            is_valid, errors = DataValidator.validate_all_data(data)
         
-        app_logger.info(f"Результат валидации: valid={is_valid}, errors={len(errors)}")
         if errors:
             app_logger.warning(f"Ошибки валидации: {errors}")
         
@@ -277,123 +452,145 @@ async def validate_data(data: ReportData):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/generate")
-async def generate_report(data: ReportData):
-    """Генерация отчёта"""
+def _render_document(data: dict) -> tuple[Path, str]:
+    """
+    Создаёт генератор и документ (выполняется в потоке).
+
+    Документ сохраняется в собственную временную папку генерации
+    (make_render_dir): параллельные запросы по одному объекту не пишут в
+    один файл. Под окончательным именем его регистрирует ReportStore.add,
+    он же удаляет папку.
+
+    Returns:
+        tuple: (путь к файлу во временной папке, имя файла для скачивания)
+    """
+    render_dir = make_render_dir()
+    try:
+        with request_timing.phase("construct"):
+            generator = GeneratorFactory.create(data["protocol_type"], data)
+        # Общую проверку данных уже замерил обработчик; собственная проверка
+        # генератора идет отдельной фазой, чтобы "validate" не учитывался дважды
+        with request_timing.phase("generator_validate"):
+            generator.validate()
+        generate_start = time.perf_counter()
+        rendered = Path(generator.generate_doc(render_dir))
+        generate_duration = time.perf_counter() - generate_start
+        _observe_generate_phase("render", max(generate_duration - generator.save_duration, 0.0))
+        _observe_generate_phase("save", generator.save_duration)
+        return rendered, rendered.name
+    except Exception as gen_error:
+        import traceback
+        app_logger.error(f"ОШИБКА в generate_doc: {str(gen_error)}")
+        app_logger.error(f"Traceback:\n{traceback.format_exc()}")
+        shutil.rmtree(render_dir, ignore_errors=True)
+        raise
+
+
+def _send_report_email(data: dict, file_path_obj: Path) -> None:
+    """Отправляет отчёт на email; ошибки только логируются"""
+    if not config.REPORT_EMAIL_ENABLED:
+        return
     try:
-        app_logger.info(f"=== ЗАПРОС НА ГЕНЕРАЦИЮ ===")
-        app_logger.info(f"Тип протокола: {data.protocol_type}")
-        app_logger.info(f"Дата: {data.date}")
-        app_logger.info(f"Заказчик: {data.customer}")
-        app_logger.info(f"Объект: {data.object_full_address}")
+        from email_sender import send_report_email
         
-        # Преобразуем Pydantic модель в dict
-        data_dict = data.model_dump()
+        # Формируем тему и текст письма
+        email_subject = f"Отчет: {data['customer']} - {data['date']}"
+        email_body = f"""Здравствуйте!
+
+Автоматически сгенерирован новый отчет:
+
+Дата: {data['date']}
+Заказчик: {data['customer']}
+Объект: {data['object_full_address']}
+Тип протокола: {data['protocol_type']}
+
+Файл прикреплен к письму.
+
+С уважением,
+Система генерации отчетов"""
         
-        # Преобразуем ladders и marches в нужный формат
-        if data.protocol_type == "vertical":
-            app_logger.info(f"Обработка вертикальных лестниц...")
-            app_logger.info(f"Получено лестниц: {len(data.ladders)}")
-            data_dict["ladders"] = [l.model_dump() for l in data.ladders]
-            
-            # Логируем данные каждой лестницы
-            for idx, ladder in enumerate(data_dict["ladders"], 1):
-                app_logger.info(f"  Лестница {idx}: name={ladder.get('name')}, height={ladder.get('height')}, width={ladder.get('width')}")
-            
-            # Для вертикальных лестниц нужны данные соответствия
-            if not data_dict.get("ladders_compliance"):
-                data_dict["ladders_compliance"] = {}
-            app_logger.info(f"Вертикальные лестницы обработаны: {len(data_dict['ladders'])} лестниц")
-        elif data.protocol_type == "stair":
-            app_logger.info(f"Обработка маршевых лестниц...")
-            app_logger.info(f"Получено маршей: {len(data.marches)}")
-            data_dict["marches"] = [m.model_dump() for m in data.marches]
-            data_dict["mount_points"] = data.mount_points
-            app_logger.info(f"Маршевые лестницы обработаны: {len(data_dict['marches'])} маршей")
-        elif data.protocol_type == "roof":
-            app_logger.info(f"Обработка ограждений кровли...")
-            data_dict["mount_points"] = data.mount_points_roof
-            app_logger.info(f"Ограждения кровли: длина={data_dict.get('length')}, высота={data_dict.get('height')}")
+        email_success, email_message = send_report_email(
+            str(file_path_obj),
+            subject=email_subject,
+            body=email_body
+        )
+        
+        if email_success:
+            app_logger.info(f"✓ {email_message}")
+        else:
+            app_logger.warning(f"⚠ Не удалось отправить email: {email_message}")
+            # Не прерываем генерацию, если email не отправился
+    except Exception as email_error:
+        app_logger.warning(f"Ошибка при попытке отправки email (игнорируется): {email_error}")
+        # Не прерываем генерацию, если email не отправился
+
+
+@app.post("/api/generate", openapi_extra=REPORT_OPENAPI_EXTRA)
+@metrics.instrument("generate")
+async def generate_report(
+    request: Request,
+    data: dict = Depends(report_payload),
+    priority: str = Depends(request_priority),
+):
+    """Генерация отчёта"""
+    report_status = "error"
+    try:
+        app_logger.debug(
+            f"Запрос на генерацию: тип={data['protocol_type']}, дата={data['date']}, "
+            f"заказчик={data['customer']}, объект={data['object_full_address']}"
+        )
+        
+        if data["protocol_type"] == "vertical":
+            app_logger.debug(f"Получено лестниц: {len(data['ladders'])}")
+        elif data["protocol_type"] == "stair":
+            app_logger.debug(f"Получено маршей: {len(data['marches'])}")
         
         # Валидация перед генерацией
-        app_logger.info("=== НАЧАЛО ВАЛИДАЦИИ ===")
-        is_valid, errors = DataValidator.validate_all_data(data_dict)
+        with request_timing.phase("validate"):
+            is_valid, errors = DataValidator.validate_all_data(data)
         if not is_valid:
             app_logger.error(f"Валидация не пройдена. Ошибки: {errors}")
+            report_status = "invalid"
             raise HTTPException(status_code=400, detail={"errors": errors})
         
-        app_logger.info("Валидация пройдена успешно ✓")
-        
-        # Генерация документа
-        app_logger.info("=== НАЧАЛО ГЕНЕРАЦИИ ДОКУМЕНТА ===")
-        app_logger.info(f"Создание DocumentGenerator...")
-        generator = DocumentGenerator()
-        app_logger.info("Генератор создан, вызов create_document...")
-        app_logger.info(f"Передаваемые данные в create_document: protocol_type={data_dict.get('protocol_type')}")
-        
+        # Генерация документа: в отдельном потоке и не больше
+        # GENERATE_MAX_CONCURRENCY одновременно, остальные ждут в очереди
+        # своего класса приоритета
         try:
-            filepath = generator.create_document(data_dict)
-            app_logger.info(f"✓ create_document вернул путь: {filepath}")
-        except Exception as gen_error:
-            import traceback
-            app_logger.error(f"ОШИБКА в create_document: {str(gen_error)}")
-            app_logger.error(f"Traceback:\n{traceback.format_exc()}")
-            raise
-        
-        
-        app_logger.info(f"Документ успешно создан: {filepath}")
+            async with request.app.state.generate_admission.slot(priority):
+                filepath, filename = await asyncio.to_thread(_render_document, data)
+        except AdmissionRejected as exc:
+            report_status = "rejected"
+            app_logger.warning(f"Генерация отклонена ({priority}): {exc}")
+            raise HTTPException(
+                status_code=429,
+                detail=str(exc),
+                headers={"Retry-After": str(exc.retry_after)},
+            )
         
         # Проверяем существование файла
         file_path_obj = Path(filepath)
         if not file_path_obj.exists():
             app_logger.error(f"Файл не найден после генерации: {filepath}")
+            shutil.rmtree(file_path_obj.parent, ignore_errors=True)
             raise HTTPException(status_code=500, detail="Файл не был создан")
         
-        app_logger.info(f"Размер файла: {file_path_obj.stat().st_size} байт")
-        filename = os.path.basename(filepath)
-        app_logger.info(f"Имя файла для скачивания: {filename}")
+        record, _ = await asyncio.to_thread(request.app.state.report_store.add, file_path_obj, data, filename)
+        # Отчёт перенесён хранилищем под имя с id записи
+        file_path_obj = request.app.state.report_store.resolve_path(record)
+        file_size = record.size
+        metrics.REPORT_SIZE_BYTES.labels(protocol_type=data["protocol_type"]).observe(file_size)
+        app_logger.info(f"Документ создан: {filename} ({file_size} байт)")
         
-        # Отправляем отчет на email в фоне (не блокируем ответ)
-        try:
-            from email_sender import send_report_email
-            app_logger.info("Попытка отправки отчета на email...")
-            
-            # Формируем тему и текст письма
-            email_subject = f"Отчет: {data.customer} - {data.date}"
-            email_body = f"""Здравствуйте!
-
-Автоматически сгенерирован новый отчет:
-
-Дата: {data.date}
-Заказчик: {data.customer}
-Объект: {data.object_full_address}
-Тип протокола: {data.protocol_type}
-
-Файл прикреплен к письму.
-
-С уважением,
-Система генерации отчетов"""
-            
-            email_success, email_message = send_report_email(
-                str(file_path_obj),
-                subject=email_subject,
-                body=email_body
-            )
-            
-            if email_success:
-                app_logger.info(f"✓ {email_message}")
-            else:
-                app_logger.warning(f"⚠ Не удалось отправить email: {email_message}")
-                # Не прерываем генерацию, если email не отправился
-        except Exception as email_error:
-            app_logger.warning(f"Ошибка при попытке отправки email (игнорируется): {email_error}")
-            # Не прерываем генерацию, если email не отправился
+        # Отправка на email идёт в отдельном потоке и не занимает слот генерации
+        email_start = time.perf_counter()
+        await asyncio.to_thread(_send_report_email, data, file_path_obj)
+        _observe_generate_phase("email", time.perf_counter() - email_start)
         
         # Правильное кодирование имени файла для Content-Disposition (RFC 5987)
         # Используем оба формата: старый (для совместимости) и новый (RFC 5987)
         # Для имен с кириллицей используем RFC 5987
         safe_filename, content_disposition = build_download_headers(filename)
-        app_logger.info(f"Content-Disposition: {content_disposition}")
         
         response = FileResponse(
             str(file_path_obj),
@@ -402,12 +599,18 @@ async def generate_report(data: ReportData):
         )
         response.headers["Content-Disposition"] = content_disposition
         response.headers["Content-Type"] = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        # По id отчёт можно скачать повторно без новой генерации
+        response.headers["X-Report-Id"] = record.id
+        response.headers["Content-Location"] = f"/api/reports/{record.id}"
+        response.headers["ETag"] = record.etag
+        report_status = "ok"
         return response
     except HTTPException:
         raise
     except ValueError as e:
         # Ошибки валидации генератора
         app_logger.error(f"Ошибка валидации генератора: {e}")
+        report_status = "invalid"
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
@@ -421,6 +624,135 @@ async def generate_report(data: ReportData):
                 "type": type(e).__name__
             }
         )
+    finally:
+        metrics.REPORTS_TOTAL.labels(protocol_type=data["protocol_type"], status=report_status).inc()
+
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _parse_byte_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+
+    Returns:
+        (start, end) включительно; None — заголовок игнорируется (отдаём файл целиком)
+
+    Raises:
+        ValueError: диапазон не пересекается с файлом (ответ 416)
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N: последние N байт
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end and first and last:
+        return None
+    if start >= size or end < start:
+        raise ValueError("Диапазон вне файла")
+    return start, min(end, size - 1)
+
+
+def _parse_query_date(value: str | None, name: str) -> date | None:
+    """Дата из параметра запроса: ГГГГ-ММ-ДД или ДД.ММ.ГГГГ"""
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail=f"Неверная дата в параметре {name}: {value}")
+
+
+@app.get("/api/reports/archive")
+@metrics.instrument("report_archive")
+async def download_reports_archive(
+    request: Request,
+    ids: str | None = Query(None, description="Id отчётов через запятую"),
+    date_from: str | None = Query(None, alias="from", description="Дата протокола с (ГГГГ-ММ-ДД)"),
+    date_to: str | None = Query(None, alias="to", description="Дата протокола по (ГГГГ-ММ-ДД)"),
+    customer: str | None = Query(None, description="Заказчик (точное совпадение)"),
+):
+    """Zip-архив сохранённых отчётов с manifest.csv, передаётся по мере сборки"""
+    id_list = [item.strip() for item in ids.split(",") if item.strip()] if ids else None
+    start, end = _parse_query_date(date_from, "from"), _parse_query_date(date_to, "to")
+    if id_list is None and start is None and end is None and not customer:
+        raise HTTPException(status_code=400, detail="Укажите ids, from/to или customer")
+
+    store = request.app.state.report_store
+    records = await asyncio.to_thread(store.select, id_list, start, end, customer)
+    if not records:
+        raise HTTPException(status_code=404, detail="Отчёты по заданным условиям не найдены")
+
+    period = "_".join(d.isoformat() for d in (start, end) if d) or date.today().isoformat()
+    app_logger.info(f"Архив отчётов: {len(records)} файлов ({period})")
+    return StreamingResponse(
+        store.iter_archive(records),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="reports_{period}.zip"',
+            "X-Report-Count": str(len(records)),
+        },
+    )
+
+
+@app.get("/api/reports/{report_id}")
+@metrics.instrument("report_download")
+async def download_report(report_id: str, request: Request):
+    """Повторное скачивание созданного отчёта (ETag, условный GET, Range)"""
+    store = request.app.state.report_store
+    record = store.get(report_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Отчёт не найден")
+
+    headers = {
+        "ETag": record.etag,
+        "Accept-Ranges": "bytes",
+        # Содержимое отчёта по id не меняется
+        "Cache-Control": "private, max-age=86400",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, record.etag):
+        return Response(status_code=304, headers=headers)
+
+    content = await asyncio.to_thread(store.read, record)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Файл отчёта больше недоступен")
+
+    _, content_disposition = build_download_headers(record.filename)
+    headers["Content-Disposition"] = content_disposition
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == record.etag):
+        try:
+            byte_range = _parse_byte_range(range_header, len(content))
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{len(content)}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+            return Response(
+                content=content[start:end + 1],
+                status_code=206,
+                headers=headers,
+                media_type=DOCX_MEDIA_TYPE,
+            )
+
+    return Response(content=content, headers=headers, media_type=DOCX_MEDIA_TYPE)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,4 @@
 // Глобальные переменные
-let ladderCount = 0;
-let marchCount = 0;
 let currentProtocolType = 'vertical';
 
 // Инициализация
@@ -80,6 +78,14 @@ document.addEventListener('DOMContentLoaded', function() {
             console.log('✓ Обработчики заказчика привязаны');
         }
         
+        // Проверка полей по мере ввода (правила загружаются с сервера)
+        reportForm.addEventListener('input', scheduleLiveValidation);
+        reportForm.addEventListener('change', scheduleLiveValidation);
+        loadValidationRules();
+        
+        // Офлайн-режим: кэш оболочки и очередь генерации
+        registerServiceWorker();
+        
         // Загрузка списка заказчиков
         loadCustomers();
         
@@ -180,15 +186,19 @@ function onProtocolTypeChange() {
         document.getElementById('verticalSection').style.display = 'block';
         document.getElementById('visualInspectionSection').style.display = 'block';
         document.getElementById('complianceSection').style.display = 'block';
-        if (ladderCount === 0) {
+        if (ladderList.items.length === 0) {
             addLadder();
+        } else {
+            renderItemList(ladderList);
         }
     } else if (currentProtocolType === 'stair') {
         document.getElementById('stairSection').style.display = 'block';
         document.getElementById('visualInspectionSection').style.display = 'block';
         document.getElementById('complianceSection').style.display = 'block';
-        if (marchCount === 0) {
+        if (marchList.items.length === 0) {
             addMarch();
+        } else {
+            renderItemList(marchList);
         }
     } else if (currentProtocolType === 'roof') {
         document.getElementById('roofSection').style.display = 'block';
@@ -197,178 +207,356 @@ function onProtocolTypeChange() {
     }
 }
 
-// Добавление лестницы
-function addLadder() {
-    ladderCount++;
-    const container = document.getElementById('laddersContainer');
-    const ladderDiv = document.createElement('div');
-    ladderDiv.className = 'ladder-item';
-    ladderDiv.id = `ladder-${ladderCount}`;
-    
-    ladderDiv.innerHTML = `
-        <h3>Лестница №${ladderCount}</h3>
-        ${ladderCount > 1 ? `<button type="button" class="delete-btn" onclick="removeLadder(${ladderCount})">✖ Удалить</button>` : ''}
+// --- Списки лестниц и маршей ------------------------------------------------
+// Данные элементов хранятся в модели (list.items), в DOM есть только строки,
+// попадающие в видимую область контейнера (плюс запас сверху и снизу).
+const VIRTUAL_OVERSCAN_PX = 600;
+const VIRTUAL_MAX_HEIGHT_RATIO = 0.75;
+
+const LADDER_FIELDS = ['name', 'height', 'width', 'steps_count', 'mount_points', 'step_distance',
+    'platform_length', 'platform_width', 'fence_height', 'wall_distance', 'ground_distance'];
+const MARCH_FIELDS = ['march_width', 'march_length', 'step_width', 'step_distance', 'steps_count',
+    'march_fence_height', 'platform_length', 'platform_width', 'platform_fence_height',
+    'platform_ground_distance'];
+
+const ladderList = createItemList({
+    containerId: 'laddersContainer',
+    prefix: 'ladder',
+    estimatedHeight: 760,
+    createItem: number => Object.fromEntries([['number', number], ...LADDER_FIELDS.map(f => [f, ''])]),
+    renderItem: ladderItemHtml,
+});
+
+const marchList = createItemList({
+    containerId: 'marchesContainer',
+    prefix: 'march',
+    estimatedHeight: 900,
+    createItem: number => Object.assign(
+        Object.fromEntries([['number', number], ...MARCH_FIELDS.map(f => [f, ''])]),
+        { has_march: true, has_platform: true },
+    ),
+    renderItem: marchItemHtml,
+    onItemChange: (item, field, row) => {
+        if (row && (field === 'has_march' || field === 'has_platform')) {
+            // Поля марша/площадки включаются и выключаются вместе с флажком
+            row.innerHTML = marchItemHtml(item);
+            const checkbox = row.querySelector(`input[name="march-${item.number}-${field}"]`);
+            if (checkbox) checkbox.focus();
+        }
+    },
+});
+
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;',
+    }[ch]));
+}
+
+function createItemList(options) {
+    return {
+        ...options,
+        items: [],
+        byNumber: new Map(),
+        nextNumber: 1,
+        heights: new Map(),
+        rows: new Map(),
+        inner: null,
+        renderScheduled: false,
+        resizeObserver: null,
+    };
+}
+
+// Контейнер списка: обработчики ввода и прокрутки вешаются один раз
+function setupItemList(list) {
+    const container = document.getElementById(list.containerId);
+    if (!container || list.inner) return container;
+    container.classList.add('virtual-list');
+    list.inner = document.createElement('div');
+    list.inner.className = 'virtual-list-inner';
+    container.appendChild(list.inner);
+
+    const onFieldEvent = e => {
+        const match = e.target.name && e.target.name.match(/^[a-z]+-(\d+)-(\w+)$/);
+        if (!match || !e.target.name.startsWith(`${list.prefix}-`)) return;
+        const item = list.byNumber.get(Number(match[1]));
+        if (!item) return;
+        const field = match[2];
+        item[field] = e.target.type === 'checkbox' ? e.target.checked : e.target.value;
+        if (list.onItemChange) list.onItemChange(item, field, e.target.closest('.virtual-row'));
+    };
+    container.addEventListener('input', onFieldEvent);
+    container.addEventListener('change', onFieldEvent);
+    container.addEventListener('scroll', () => scheduleItemListRender(list), { passive: true });
+    window.addEventListener('resize', () => scheduleItemListRender(list));
+
+    if (typeof ResizeObserver !== 'undefined') {
+        // Высота строки меняется (сообщения об ошибках, ширина окна) — пересчитываем раскладку
+        list.resizeObserver = new ResizeObserver(entries => {
+            let changed = false;
+            for (const entry of entries) {
+                const height = entry.target.offsetHeight;
+                const number = Number(entry.target.dataset.number);
+                if (height > 0 && list.heights.get(number) !== height) {
+                    list.heights.set(number, height);
+                    changed = true;
+                }
+            }
+            if (changed) scheduleItemListRender(list);
+        });
+    }
+    return container;
+}
+
+function scheduleItemListRender(list) {
+    if (list.renderScheduled) return;
+    list.renderScheduled = true;
+    requestAnimationFrame(() => {
+        list.renderScheduled = false;
+        renderItemList(list);
+    });
+}
+
+function itemHeight(list, item) {
+    return list.heights.get(item.number) || list.estimatedHeight;
+}
+
+// Отрисовка видимого окна списка
+function renderItemList(list) {
+    const container = setupItemList(list);
+    // Скрытая секция: размеры не измерить, отрисуем при показе
+    if (!container || container.offsetParent === null) return;
+
+    for (let pass = 0; pass < 3; pass++) {
+        const offsets = new Array(list.items.length);
+        let total = 0;
+        list.items.forEach((item, idx) => {
+            offsets[idx] = total;
+            total += itemHeight(list, item);
+        });
+        list.inner.style.height = `${total}px`;
+        const maxHeight = Math.round(window.innerHeight * VIRTUAL_MAX_HEIGHT_RATIO);
+        container.style.height = `${Math.min(total, maxHeight)}px`;
+        container.style.overflowY = total > maxHeight ? 'auto' : 'hidden';
+
+        const top = container.scrollTop - VIRTUAL_OVERSCAN_PX;
+        const bottom = container.scrollTop + container.clientHeight + VIRTUAL_OVERSCAN_PX;
+        const visible = new Set();
+        list.items.forEach((item, idx) => {
+            if (offsets[idx] + itemHeight(list, item) > top && offsets[idx] < bottom) visible.add(item.number);
+        });
+
+        for (const [number, row] of list.rows) {
+            if (!visible.has(number)) {
+                if (list.resizeObserver) list.resizeObserver.unobserve(row);
+                row.remove();
+                list.rows.delete(number);
+            }
+        }
+
+        let remeasured = false;
+        list.items.forEach((item, idx) => {
+            if (!visible.has(item.number)) return;
+            let row = list.rows.get(item.number);
+            if (!row) {
+                row = document.createElement('div');
+                row.className = 'virtual-row';
+                row.dataset.number = item.number;
+                row.innerHTML = list.renderItem(item);
+                list.inner.appendChild(row);
+                list.rows.set(item.number, row);
+                if (list.resizeObserver) list.resizeObserver.observe(row);
+            }
+            row.style.top = `${offsets[idx]}px`;
+            const height = row.offsetHeight;
+            if (height > 0 && list.heights.get(item.number) !== height) {
+                list.heights.set(item.number, height);
+                remeasured = true;
+            }
+        });
+        if (!remeasured) break;
+    }
+
+    // Подсветка ошибок для только что отрисованных полей
+    if (validationRules && touchedFields.size) scheduleLiveValidation();
+}
+
+function addListItem(list) {
+    const item = list.createItem(list.nextNumber++);
+    list.items.push(item);
+    list.byNumber.set(item.number, item);
+    renderItemList(list);
+    const container = document.getElementById(list.containerId);
+    if (container) container.scrollTop = container.scrollHeight;
+    renderItemList(list);
+    return item;
+}
+
+function removeListItem(list, number) {
+    const idx = list.items.findIndex(item => item.number === number);
+    if (idx === -1) return;
+    list.items.splice(idx, 1);
+    list.byNumber.delete(number);
+    list.heights.delete(number);
+    renderItemList(list);
+}
+
+function resetItemList(list) {
+    list.items = [];
+    list.byNumber.clear();
+    list.heights.clear();
+    list.nextNumber = 1;
+    for (const row of list.rows.values()) {
+        if (list.resizeObserver) list.resizeObserver.unobserve(row);
+        row.remove();
+    }
+    list.rows.clear();
+    renderItemList(list);
+}
+
+// Разметка лестницы
+function ladderItemHtml(item) {
+    const n = item.number;
+    const v = field => escapeHtml(item[field]);
+    return `
+    <div class="ladder-item" id="ladder-${n}">
+        <h3>Лестница №${n}</h3>
+        ${n > 1 ? `<button type="button" class="delete-btn" onclick="removeLadder(${n})">✖ Удалить</button>` : ''}
         <div class="form-group">
             <label>Название:</label>
-            <input type="text" name="ladder-${ladderCount}-name" placeholder="Лестница №${ladderCount}">
+            <input type="text" name="ladder-${n}-name" placeholder="Лестница №${n}" value="${v('name')}">
         </div>
         <div class="form-group">
             <label>Высота (м):</label>
-            <input type="number" name="ladder-${ladderCount}-height" step="0.01" min="0.1" required>
+            <input type="number" name="ladder-${n}-height" step="0.01" min="0.1" required value="${v('height')}">
         </div>
         <div class="form-group">
             <label>Ширина (м):</label>
-            <input type="number" name="ladder-${ladderCount}-width" step="0.01" min="0.1" required>
+            <input type="number" name="ladder-${n}-width" step="0.01" min="0.1" required value="${v('width')}">
         </div>
         <div class="form-group">
             <label>Количество ступеней:</label>
-            <input type="number" name="ladder-${ladderCount}-steps_count" min="1" required>
+            <input type="number" name="ladder-${n}-steps_count" min="1" required value="${v('steps_count')}">
         </div>
         <div class="form-group">
             <label>Количество точек крепления:</label>
-            <input type="number" name="ladder-${ladderCount}-mount_points" min="1" required>
+            <input type="number" name="ladder-${n}-mount_points" min="1" required value="${v('mount_points')}">
         </div>
         <div class="form-group">
             <label>Расстояние между ступенями (м):</label>
-            <input type="number" name="ladder-${ladderCount}-step_distance" step="0.01" min="0.01" required>
+            <input type="number" name="ladder-${n}-step_distance" step="0.01" min="0.01" required value="${v('step_distance')}">
         </div>
         <div class="form-group">
             <label>Длина площадки (м):</label>
-            <input type="number" name="ladder-${ladderCount}-platform_length" step="0.01">
+            <input type="number" name="ladder-${n}-platform_length" step="0.01" value="${v('platform_length')}">
         </div>
         <div class="form-group">
             <label>Ширина площадки (м):</label>
-            <input type="number" name="ladder-${ladderCount}-platform_width" step="0.01">
+            <input type="number" name="ladder-${n}-platform_width" step="0.01" value="${v('platform_width')}">
         </div>
         <div class="form-group">
             <label>Высота ограждения площадки (м):</label>
-            <input type="number" name="ladder-${ladderCount}-fence_height" step="0.01">
+            <input type="number" name="ladder-${n}-fence_height" step="0.01" value="${v('fence_height')}">
         </div>
         <div class="form-group">
             <label>Расстояние от стены (м):</label>
-            <input type="number" name="ladder-${ladderCount}-wall_distance" step="0.01">
+            <input type="number" name="ladder-${n}-wall_distance" step="0.01" value="${v('wall_distance')}">
         </div>
         <div class="form-group">
             <label>Расстояние от земли (м):</label>
-            <input type="number" name="ladder-${ladderCount}-ground_distance" step="0.01">
+            <input type="number" name="ladder-${n}-ground_distance" step="0.01" value="${v('ground_distance')}">
         </div>
-    `;
-    
-    container.appendChild(ladderDiv);
-}
-
-// Удаление лестницы
-function removeLadder(num) {
-    const ladderDiv = document.getElementById(`ladder-${num}`);
-    if (ladderDiv) {
-        ladderDiv.remove();
-    }
+    </div>`;
 }
 
-// Добавление марша/площадки
-function addMarch() {
-    marchCount++;
-    const container = document.getElementById('marchesContainer');
-    const marchDiv = document.createElement('div');
-    marchDiv.className = 'march-item';
-    marchDiv.id = `march-${marchCount}`;
-    
-    marchDiv.innerHTML = `
-        <h3>Элемент №${marchCount}</h3>
-        ${marchCount > 1 ? `<button type="button" class="delete-btn" onclick="removeMarch(${marchCount})">✖ Удалить</button>` : ''}
+// Разметка марша/площадки
+function marchItemHtml(item) {
+    const n = item.number;
+    const v = field => escapeHtml(item[field]);
+    const marchState = item.has_march ? 'required' : 'disabled';
+    const platformState = item.has_platform ? 'required' : 'disabled';
+    return `
+    <div class="march-item" id="march-${n}">
+        <h3>Элемент №${n}</h3>
+        ${n > 1 ? `<button type="button" class="delete-btn" onclick="removeMarch(${n})">✖ Удалить</button>` : ''}
         <div class="form-group">
             <label>
-                <input type="checkbox" name="march-${marchCount}-has_march" checked onchange="toggleMarchFields(${marchCount})">
+                <input type="checkbox" name="march-${n}-has_march" ${item.has_march ? 'checked' : ''}>
                 Есть марш
             </label>
         </div>
         <div class="form-group">
             <label>
-                <input type="checkbox" name="march-${marchCount}-has_platform" checked onchange="togglePlatformFields(${marchCount})">
+                <input type="checkbox" name="march-${n}-has_platform" ${item.has_platform ? 'checked' : ''}>
                 Есть площадка
             </label>
         </div>
-        <div id="march-fields-${marchCount}">
+        <div id="march-fields-${n}">
             <h4>Параметры марша</h4>
             <div class="form-group">
                 <label>Ширина марша (м):</label>
-                <input type="number" name="march-${marchCount}-march_width" step="0.01" min="0.5" required>
+                <input type="number" name="march-${n}-march_width" step="0.01" min="0.5" ${marchState} value="${v('march_width')}">
             </div>
             <div class="form-group">
                 <label>Длина марша (м):</label>
-                <input type="number" name="march-${marchCount}-march_length" step="0.01" min="0.5" required>
+                <input type="number" name="march-${n}-march_length" step="0.01" min="0.5" ${marchState} value="${v('march_length')}">
             </div>
             <div class="form-group">
                 <label>Ширина ступени (м):</label>
-                <input type="number" name="march-${marchCount}-step_width" step="0.01" min="0.15" required>
+                <input type="number" name="march-${n}-step_width" step="0.01" min="0.15" ${marchState} value="${v('step_width')}">
             </div>
             <div class="form-group">
                 <label>Расстояние между ступенями (м):</label>
-                <input type="number" name="march-${marchCount}-step_distance" step="0.01" min="0.15" required>
+                <input type="number" name="march-${n}-step_distance" step="0.01" min="0.15" ${marchState} value="${v('step_distance')}">
             </div>
             <div class="form-group">
                 <label>Количество ступеней:</label>
-                <input type="number" name="march-${marchCount}-steps_count" min="1" required>
+                <input type="number" name="march-${n}-steps_count" min="1" ${marchState} value="${v('steps_count')}">
             </div>
             <div class="form-group">
                 <label>Высота ограждений марша (м):</label>
-                <input type="number" name="march-${marchCount}-march_fence_height" step="0.01" min="0.5" required>
+                <input type="number" name="march-${n}-march_fence_height" step="0.01" min="0.5" ${marchState} value="${v('march_fence_height')}">
             </div>
         </div>
-        <div id="platform-fields-${marchCount}">
+        <div id="platform-fields-${n}">
             <h4>Параметры площадки</h4>
             <div class="form-group">
                 <label>Длина площадки (м):</label>
-                <input type="number" name="march-${marchCount}-platform_length" step="0.01" min="0.5" required>
+                <input type="number" name="march-${n}-platform_length" step="0.01" min="0.5" ${platformState} value="${v('platform_length')}">
             </div>
             <div class="form-group">
                 <label>Ширина площадки (м):</label>
-                <input type="number" name="march-${marchCount}-platform_width" step="0.01" min="0.5" required>
+                <input type="number" name="march-${n}-platform_width" step="0.01" min="0.5" ${platformState} value="${v('platform_width')}">
             </div>
             <div class="form-group">
                 <label>Высота ограждений площадки (м):</label>
-                <input type="number" name="march-${marchCount}-platform_fence_height" step="0.01" min="0.5" required>
+                <input type="number" name="march-${n}-platform_fence_height" step="0.01" min="0.5" ${platformState} value="${v('platform_fence_height')}">
             </div>
             <div class="form-group">
                 <label>Расстояние от площадки до земли (м):</label>
-                <input type="number" name="march-${marchCount}-platform_ground_distance" step="0.01" min="0">
+                <input type="number" name="march-${n}-platform_ground_distance" step="0.01" min="0" ${item.has_platform ? '' : 'disabled'} value="${v('platform_ground_distance')}">
             </div>
         </div>
-    `;
-    
-    container.appendChild(marchDiv);
+    </div>`;
 }
 
-// Удаление марша
-function removeMarch(num) {
-    const marchDiv = document.getElementById(`march-${num}`);
-    if (marchDiv) {
-        marchDiv.remove();
-    }
+// Добавление лестницы
+function addLadder() {
+    addListItem(ladderList);
 }
 
-// Переключение полей марша
-function toggleMarchFields(num) {
-    const checkbox = document.querySelector(`input[name="march-${num}-has_march"]`);
-    const fields = document.getElementById(`march-fields-${num}`);
-    const inputs = fields.querySelectorAll('input[type="number"]');
-    
-    inputs.forEach(input => {
-        input.required = checkbox.checked;
-        input.disabled = !checkbox.checked;
-    });
+// Удаление лестницы
+function removeLadder(num) {
+    removeListItem(ladderList, num);
 }
 
-// Переключение полей площадки
-function togglePlatformFields(num) {
-    const checkbox = document.querySelector(`input[name="march-${num}-has_platform"]`);
-    const fields = document.getElementById(`platform-fields-${num}`);
-    const inputs = fields.querySelectorAll('input[type="number"]');
-    
-    inputs.forEach(input => {
-        input.required = checkbox.checked;
-        input.disabled = !checkbox.checked;
-    });
+// Добавление марша/площадки
+function addMarch() {
+    addListItem(marchList);
+}
+
+// Удаление марша
+function removeMarch(num) {
+    removeListItem(marchList, num);
 }
 
 // Преобразование даты из YYYY-MM-DD в DD.MM.YYYY
@@ -386,6 +574,321 @@ function formatDate(dateStr) {
     return dateStr;
 }
 
+// Запрос с повтором, если сервер перегружен (429/503)
+// Ждём столько, сколько просит Retry-After, иначе экспоненциально растущую паузу
+const RETRY_STATUSES = [429, 503];
+const MAX_RETRIES = 5;
+const MAX_RETRY_DELAY_MS = 30000;
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+function getRetryDelayMs(response, attempt) {
+    const retryAfter = parseInt(response.headers.get('Retry-After') || '', 10);
+    const baseDelay = Number.isFinite(retryAfter) && retryAfter > 0
+        ? retryAfter * 1000
+        : 1000 * Math.pow(2, attempt);
+    // Случайная добавка, чтобы клиенты не повторяли запросы одновременно
+    const jitter = Math.random() * 0.3 * baseDelay;
+    return Math.min(baseDelay + jitter, MAX_RETRY_DELAY_MS);
+}
+
+async function fetchWithRetry(url, options, onRetry) {
+    for (let attempt = 0; ; attempt++) {
+        const response = await fetch(url, options);
+        if (!RETRY_STATUSES.includes(response.status) || attempt >= MAX_RETRIES) {
+            return response;
+        }
+        const delayMs = getRetryDelayMs(response, attempt);
+        console.warn(`Сервер занят (${response.status}), повтор через ${Math.round(delayMs / 1000)} с`);
+        if (onRetry) {
+            onRetry(delayMs, attempt + 1);
+        }
+        await sleep(delayMs);
+    }
+}
+
+// --- Клиентская валидация ---------------------------------------------------
+// Правила и тексты ошибок приходят с сервера (/api/validation-rules) и совпадают
+// с DataValidator. Окончательная проверка всё равно выполняется при генерации.
+let validationRules = null;
+const touchedFields = new Set();
+let liveValidationTimer = null;
+
+// Префикс имён полей формы для элементов списков
+const ITEM_INPUT_PREFIX = { ladders: 'ladder', marches: 'march' };
+// Поля, у которых имя в форме отличается от имени в данных
+const INPUT_NAME_ALIASES = { roof: { mount_points: 'mount_points_roof' } };
+
+async function loadValidationRules() {
+    try {
+        const response = await fetch('/api/validation-rules');
+        if (response.ok) {
+            validationRules = await response.json();
+            console.log('✓ Правила валидации загружены, версия', validationRules.version);
+        }
+    } catch (error) {
+        console.warn('Правила валидации недоступны, проверка только на сервере:', error);
+    }
+}
+
+function formatMessage(template, params) {
+    return template.replace(/\{(\w+)\}/g, (match, key) => (key in params ? String(params[key]) : match));
+}
+
+// Значение поля как строка (аналог str() для данных формы)
+function fieldText(value) {
+    return value === undefined || value === null ? '' : String(value);
+}
+
+// Аналог float() в Python: запятая не допускается
+function parseNumber(value) {
+    if (typeof value === 'number') return value;
+    const text = fieldText(value).trim();
+    if (!/^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$/.test(text)) return NaN;
+    return Number(text);
+}
+
+// Число в том виде, как его печатает Python для float (1.0, а не 1)
+function floatLabel(num) {
+    return Number.isInteger(num) ? num.toFixed(1) : String(num);
+}
+
+function isValidDate(text, formats) {
+    return formats.some(fmt => {
+        const order = [];
+        const pattern = fmt.replace(/[.*+?^${}()|[\]\\\/]/g, '\\$&').replace(/%([dmY])/g, (match, token) => {
+            order.push(token);
+            return token === 'Y' ? '(\\d{4})' : '(\\d{1,2})';
+        });
+        const match = new RegExp(`^${pattern}$`).exec(text);
+        if (!match) return false;
+        const parts = {};
+        order.forEach((token, idx) => { parts[token] = Number(match[idx + 1]); });
+        const date = new Date(parts.Y, parts.m - 1, parts.d);
+        return date.getFullYear() === parts.Y && date.getMonth() === parts.m - 1 && date.getDate() === parts.d;
+    });
+}
+
+// Проверка данных формы по правилам сервера.
+// Возвращает { valid, errors, fields }, fields — имя поля формы → текст ошибки
+function validateLocally(data) {
+    const rules = validationRules;
+    const messages = rules.messages;
+    const errors = [];
+    const fields = {};
+    const aliases = INPUT_NAME_ALIASES[data.protocol_type] || {};
+    const inputName = field => aliases[field] || field;
+    // Сервер берёт эти значения из полей формы с другими именами
+    data = { ...data };
+    for (const [field, name] of Object.entries(aliases)) {
+        if (data[field] === undefined) data[field] = data[name];
+    }
+
+    const mark = (name, message) => {
+        if (name && !(name in fields)) fields[name] = message;
+    };
+    const fail = (name, message) => {
+        errors.push(message);
+        mark(name, message);
+    };
+    const checkNumber = (value, fieldName, rule) => {
+        const num = parseNumber(value);
+        if (Number.isNaN(num)) return formatMessage(messages.number_invalid, { field_name: fieldName });
+        if (num < rule.min) return formatMessage(messages.number_below, { field_name: fieldName, min_value: rule.min_label });
+        if (rule.max !== null && num > rule.max) {
+            return formatMessage(messages.number_above, { field_name: fieldName, max_value: rule.max_label });
+        }
+        return '';
+    };
+
+    // Общие поля
+    const dateText = fieldText(data.date);
+    if (!dateText) {
+        fail('date', messages.date_empty);
+    } else if (!isValidDate(dateText, rules.date_formats)) {
+        fail('date', messages.date_format);
+    }
+
+    const customer = fieldText(data.customer);
+    if (!customer.trim()) {
+        fail('customer', messages.customer_empty);
+    } else if (Array.from(customer).length < rules.customer_min_length) {
+        fail('customer', messages.customer_short);
+    }
+
+    const address = fieldText(data[rules.address.field]).trim();
+    if (!address) {
+        fail(rules.address.field, formatMessage(messages.text_empty, { field_name: rules.address.title }));
+    } else if (Array.from(address).length < rules.address.min_length) {
+        fail(rules.address.field, formatMessage(messages.text_short, { field_name: rules.address.title }));
+    }
+
+    const protocolType = data.protocol_type === undefined ? 'vertical' : data.protocol_type;
+    const spec = Object.prototype.hasOwnProperty.call(rules.protocols, protocolType) ? rules.protocols[protocolType] : null;
+    if (!spec) {
+        fail(null, messages.protocol_unknown);
+    } else {
+        validateProtocolLocally(spec, data, { messages, inputName, fail, mark, checkNumber });
+    }
+
+    for (const rule of rules.optional_numbers) {
+        if (data[rule.field]) {
+            const message = checkNumber(data[rule.field], rule.title, rule);
+            if (message) fail(rule.field, message);
+        }
+    }
+
+    return { valid: errors.length === 0, errors, fields };
+}
+
+// Отмечает ошибочные поля, которые пользователь уже трогал
+function renderFieldErrors(fields, showAll) {
+    const form = document.getElementById('reportForm');
+    if (!form) return;
+    for (const input of form.querySelectorAll('input[name], select[name], textarea[name]')) {
+        const message = (showAll || touchedFields.has(input.name)) ? fields[input.name] : undefined;
+        const group = input.closest('.form-group') || input.parentElement;
+        let hint = group ? group.querySelector(`.field-error[data-for="${input.name}"]`) : null;
+        input.classList.toggle('invalid', Boolean(message));
+        input.setAttribute('aria-invalid', message ? 'true' : 'false');
+        if (message) {
+            if (!hint && group) {
+                hint = document.createElement('div');
+                hint.className = 'field-error';
+                hint.dataset.for = input.name;
+                group.appendChild(hint);
+            }
+            if (hint) hint.textContent = message;
+        } else if (hint) {
+            hint.remove();
+        }
+    }
+}
+
+function scheduleLiveValidation(e) {
+    if (e && e.target && e.target.name) {
+        touchedFields.add(e.target.name);
+    }
+    clearTimeout(liveValidationTimer);
+    liveValidationTimer = setTimeout(() => {
+        if (!validationRules) return;
+        renderFieldErrors(validateLocally(collectFormData()).fields, false);
+    }, 150);
+}
+
+function validateProtocolLocally(spec, data, ctx) {
+    const { messages, inputName, fail, mark, checkNumber } = ctx;
+    if (spec.items) {
+        const items = data[spec.items] || [];
+        if (items.length === 0) {
+            fail(null, messages[spec.empty_message]);
+            return;
+        }
+        const prefix = ITEM_INPUT_PREFIX[spec.items];
+        items.forEach((item, index) => {
+            // Номер в тексте ошибки — позиция в списке, как на сервере
+            const i = index + 1;
+            const missing = [];
+            const missingInputs = [];
+            for (const group of spec.groups) {
+                if (group.flag && !(item[group.flag] ?? true)) continue;
+                for (const rule of group.required.concat(group.optional)) {
+                    const name = `${prefix}-${item.number}-${rule.field}`;
+                    if (!fieldText(item[rule.field]).trim()) {
+                        if (group.required.includes(rule)) {
+                            missing.push(rule.title);
+                            missingInputs.push(name);
+                        }
+                        continue;
+                    }
+                    const title = formatMessage(messages[spec.item_field_message], { title: rule.title, i });
+                    const message = checkNumber(item[rule.field], title, rule);
+                    if (message) fail(name, message);
+                }
+            }
+            if (missing.length) {
+                const message = formatMessage(messages[spec.item_missing_message], { i, fields: missing.join(', ') });
+                fail(null, message);
+                missingInputs.forEach(name => mark(name, message));
+            }
+        });
+    }
+
+    const invalid = new Set();
+    for (const rule of spec.required) {
+        const value = fieldText(data[rule.field]).trim();
+        const message = value
+            ? checkNumber(value, rule.title, rule)
+            : formatMessage(messages.text_empty, { field_name: rule.title });
+        if (message) {
+            fail(inputName(rule.field), message);
+            invalid.add(rule.field);
+        }
+    }
+    for (const rule of spec.optional) {
+        const value = fieldText(data[rule.field]).trim();
+        if (!value) continue;
+        const message = checkNumber(value, rule.title, rule);
+        if (message) {
+            fail(inputName(rule.field), message);
+            invalid.add(rule.field);
+        }
+    }
+    for (const check of spec.not_less_than || []) {
+        const value = fieldText(data[check.field]).trim();
+        const other = fieldText(data[check.other]).trim();
+        if (!value || !other || invalid.has(check.field)) continue;
+        const num = parseNumber(value.replace(',', '.'));
+        const otherNum = parseNumber(other.replace(',', '.'));
+        if (Number.isNaN(num) || Number.isNaN(otherNum) || num >= otherNum) continue;
+        fail(inputName(check.field), formatMessage(messages[check.message], {
+            [check.field]: floatLabel(num),
+            [check.other]: floatLabel(otherNum),
+        }));
+    }
+}
+
+// --- Офлайн-режим -------------------------------------------------------------
+function registerServiceWorker() {
+    if (!('serviceWorker' in navigator)) {
+        return;
+    }
+    navigator.serviceWorker.register('/sw.js')
+        .then(() => {
+            console.log('✓ Service worker зарегистрирован');
+            requestQueueReplay();
+        })
+        .catch(error => console.warn('Service worker не зарегистрирован:', error));
+    navigator.serviceWorker.addEventListener('message', onServiceWorkerMessage);
+    window.addEventListener('online', requestQueueReplay);
+}
+
+// Просим service worker отправить накопленные запросы (там, где нет Background Sync)
+function requestQueueReplay() {
+    if (navigator.serviceWorker && navigator.serviceWorker.controller) {
+        navigator.serviceWorker.controller.postMessage({ type: 'replay-queue' });
+    }
+}
+
+function onServiceWorkerMessage(event) {
+    const message = event.data || {};
+    const successDiv = document.getElementById('successMessage');
+    const errorDiv = document.getElementById('errorMessage');
+    if (message.type === 'generate-replayed' && successDiv) {
+        const link = message.reportId
+            ? ` <a href="/api/reports/${encodeURIComponent(message.reportId)}">Скачать</a>`
+            : '';
+        successDiv.innerHTML = `✓ Отчёт из очереди создан.${link}` +
+            (message.remaining ? ` Осталось в очереди: ${message.remaining}` : '');
+        successDiv.style.display = 'block';
+    } else if (message.type === 'generate-failed' && errorDiv) {
+        errorDiv.innerHTML = '<strong>Отчёт из очереди не создан:</strong><br>' + escapeHtml(message.detail);
+        errorDiv.style.display = 'block';
+    }
+}
+
 // Сбор данных формы
 function collectFormData() {
     const formData = new FormData(document.getElementById('reportForm'));
@@ -403,57 +906,36 @@ function collectFormData() {
     };
     
     if (currentProtocolType === 'vertical') {
-        data.ladders = [];
-        for (let i = 1; i <= ladderCount; i++) {
-            const ladderDiv = document.getElementById(`ladder-${i}`);
-            if (ladderDiv) {
-                data.ladders.push({
-                    number: i,
-                    name: formData.get(`ladder-${i}-name`) || '',
-                    height: formData.get(`ladder-${i}-height`) || '',
-                    width: formData.get(`ladder-${i}-width`) || '',
-                    steps_count: formData.get(`ladder-${i}-steps_count`) || '',
-                    mount_points: formData.get(`ladder-${i}-mount_points`) || '',
-                    step_distance: formData.get(`ladder-${i}-step_distance`) || '',
-                    platform_length: formData.get(`ladder-${i}-platform_length`) || '',
-                    platform_width: formData.get(`ladder-${i}-platform_width`) || '',
-                    fence_height: formData.get(`ladder-${i}-fence_height`) || '',
-                    wall_distance: formData.get(`ladder-${i}-wall_distance`) || '',
-                    ground_distance: formData.get(`ladder-${i}-ground_distance`) || '',
-                    damage_found: formData.get('damage_found') === 'on',
-                    mount_violation_found: formData.get('mount_violation_found') === 'on',
-                    weld_violation_found: formData.get('weld_violation_found') === 'on',
-                    paint_compliant: formData.get('paint_compliant') === 'on',
-                });
-            }
-        }
+        // Поля лестниц берём из модели списка, а не из DOM (видимы не все строки)
+        const damageFound = formData.get('damage_found') === 'on';
+        const mountViolationFound = formData.get('mount_violation_found') === 'on';
+        const weldViolationFound = formData.get('weld_violation_found') === 'on';
+        const paintCompliant = formData.get('paint_compliant') === 'on';
+        data.ladders = ladderList.items.map(ladder => {
+            const entry = { number: ladder.number };
+            LADDER_FIELDS.forEach(field => { entry[field] = ladder[field] || ''; });
+            entry.damage_found = damageFound;
+            entry.mount_violation_found = mountViolationFound;
+            entry.weld_violation_found = weldViolationFound;
+            entry.paint_compliant = paintCompliant;
+            return entry;
+        });
         data.ladders_compliance = {};
     } else if (currentProtocolType === 'stair') {
         data.ladder_name = formData.get('ladder_name') || '';
         data.mount_points = formData.get('mount_points') || '';
-        data.marches = [];
-        for (let i = 1; i <= marchCount; i++) {
-            const marchDiv = document.getElementById(`march-${i}`);
-            if (marchDiv) {
-                const hasMarch = formData.get(`march-${i}-has_march`) === 'on';
-                const hasPlatform = formData.get(`march-${i}-has_platform`) === 'on';
-                data.marches.push({
-                    number: i,
-                    has_march: hasMarch,
-                    has_platform: hasPlatform,
-                    march_width: hasMarch ? (formData.get(`march-${i}-march_width`) || '') : '',
-                    march_length: hasMarch ? (formData.get(`march-${i}-march_length`) || '') : '',
-                    step_width: hasMarch ? (formData.get(`march-${i}-step_width`) || '') : '',
-                    step_distance: hasMarch ? (formData.get(`march-${i}-step_distance`) || '') : '',
-                    steps_count: hasMarch ? (formData.get(`march-${i}-steps_count`) || '') : '',
-                    march_fence_height: hasMarch ? (formData.get(`march-${i}-march_fence_height`) || '') : '',
-                    platform_length: hasPlatform ? (formData.get(`march-${i}-platform_length`) || '') : '',
-                    platform_width: hasPlatform ? (formData.get(`march-${i}-platform_width`) || '') : '',
-                    platform_fence_height: hasPlatform ? (formData.get(`march-${i}-platform_fence_height`) || '') : '',
-                    platform_ground_distance: hasPlatform ? (formData.get(`march-${i}-platform_ground_distance`) || '') : '',
-                });
-            }
-        }
+        data.marches = marchList.items.map(march => {
+            const entry = {
+                number: march.number,
+                has_march: march.has_march,
+                has_platform: march.has_platform,
+            };
+            MARCH_FIELDS.forEach(field => {
+                const enabled = field.startsWith('platform_') ? march.has_platform : march.has_march;
+                entry[field] = enabled ? (march[field] || '') : '';
+            });
+            return entry;
+        });
         data.damage_found = formData.get('damage_found') === 'on';
         data.mount_violation_found = formData.get('mount_violation_found') === 'on';
         data.weld_violation_found = formData.get('weld_violation_found') === 'on';
@@ -542,53 +1024,60 @@ async function handleSubmit(e) {
     }
     
     try {
-        // Валидация
-        console.log('=== НАЧАЛО ВАЛИДАЦИИ ===');
-        const validateResponse = await fetch('/api/validate', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(data),
-        });
+        // Валидация: по правилам сервера прямо в браузере, без запроса.
+        // Если правила не загрузились — через /api/validate
+        let validateResult;
+        if (validationRules) {
+            validateResult = validateLocally(data);
+            renderFieldErrors(validateResult.fields, true);
+        } else {
+            console.log('=== НАЧАЛО ВАЛИДАЦИИ ===');
+            const validateResponse = await fetch('/api/validate', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(data),
+            });
         
-        console.log('Статус валидации:', validateResponse.status);
+            console.log('Статус валидации:', validateResponse.status);
         
-        if (!validateResponse.ok) {
-            let errorMessage = '';
-            try {
-                const errorData = await validateResponse.json();
-                console.error('Ошибка валидации (JSON):', errorData);
-                if (errorData.detail) {
-                    if (Array.isArray(errorData.detail)) {
-                        errorMessage = errorData.detail.map(err => {
-                            if (typeof err === 'object' && err.loc && err.msg) {
-                                return `${err.loc.join('.')}: ${err.msg}`;
-                            }
-                            return String(err);
-                        }).join('\n');
-                    } else if (typeof errorData.detail === 'object' && errorData.detail.errors) {
-                        errorMessage = Array.isArray(errorData.detail.errors) 
-                            ? errorData.detail.errors.join('\n')
-                            : String(errorData.detail.errors);
+            if (!validateResponse.ok) {
+                let errorMessage = '';
+                try {
+                    const errorData = await validateResponse.json();
+                    console.error('Ошибка валидации (JSON):', errorData);
+                    if (errorData.detail) {
+                        if (Array.isArray(errorData.detail)) {
+                            errorMessage = errorData.detail.map(err => {
+                                if (typeof err === 'object' && err.loc && err.msg) {
+                                    return `${err.loc.join('.')}: ${err.msg}`;
+                                }
+                                return String(err);
+                            }).join('\n');
+                        } else if (typeof errorData.detail === 'object' && errorData.detail.errors) {
+                            errorMessage = Array.isArray(errorData.detail.errors) 
+                                ? errorData.detail.errors.join('\n')
+                                : String(errorData.detail.errors);
+                        } else {
+                            errorMessage = String(errorData.detail);
+                        }
+                    } else if (errorData.errors) {
+                        errorMessage = Array.isArray(errorData.errors) 
+                            ? errorData.errors.join('\n')
+                            : String(errorData.errors);
                     } else {
-                        errorMessage = String(errorData.detail);
+                        errorMessage = JSON.stringify(errorData);
                     }
-                } else if (errorData.errors) {
-                    errorMessage = Array.isArray(errorData.errors) 
-                        ? errorData.errors.join('\n')
-                        : String(errorData.errors);
-                } else {
-                    errorMessage = JSON.stringify(errorData);
+                } catch (e) {
+                    const errorText = await validateResponse.text();
+                    errorMessage = `Ошибка ${validateResponse.status}: ${errorText.substring(0, 500)}`;
                 }
-            } catch (e) {
-                const errorText = await validateResponse.text();
-                errorMessage = `Ошибка ${validateResponse.status}: ${errorText.substring(0, 500)}`;
+                throw new Error(errorMessage || `Ошибка валидации: ${validateResponse.status}`);
             }
-            throw new Error(errorMessage || `Ошибка валидации: ${validateResponse.status}`);
-        }
         
-        const validateResult = await validateResponse.json();
+            validateResult = await validateResponse.json();
+        }
         console.log('=== РЕЗУЛЬТАТ ВАЛИДАЦИИ ===');
         console.log(JSON.stringify(validateResult, null, 2));
         
@@ -609,18 +1098,31 @@ async function handleSubmit(e) {
         
         // Генерация документа
         console.log('=== НАЧАЛО ГЕНЕРАЦИИ ===');
-        const generateResponse = await fetch('/api/generate', {
+        const generateResponse = await fetchWithRetry('/api/generate', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify(data),
+        }, (delayMs) => {
+            if (submitBtn) {
+                submitBtn.textContent = `⏳ Сервер занят, повтор через ${Math.ceil(delayMs / 1000)} с...`;
+            }
         });
         
         console.log('Статус генерации:', generateResponse.status, generateResponse.statusText);
         
         console.log('Ответ генерации:', generateResponse.status, generateResponse.statusText);
         
+        // Нет связи: service worker сохранил запрос в очередь
+        if (generateResponse.status === 202) {
+            const queued = await generateResponse.json();
+            successDiv.innerHTML = `📥 Нет связи с сервером. Отчёт поставлен в очередь (в очереди: ${queued.queue_length}) ` +
+                'и будет создан автоматически, когда связь восстановится.';
+            successDiv.style.display = 'block';
+            return;
+        }
+        
         if (!generateResponse.ok) {
             let errorMessage = 'Ошибка генерации документа';
             try {
@@ -787,12 +1289,12 @@ async function handleSubmit(e) {
 function clearForm() {
     if (confirm('Очистить все поля?')) {
         document.getElementById('reportForm').reset();
-        document.getElementById('laddersContainer').innerHTML = '';
-        document.getElementById('marchesContainer').innerHTML = '';
-        ladderCount = 0;
-        marchCount = 0;
+        resetItemList(ladderList);
+        resetItemList(marchList);
         const today = new Date().toISOString().split('T')[0];
         document.getElementById('date').value = today;
+        touchedFields.clear();
+        renderFieldErrors({}, false);
         onProtocolTypeChange();
     }
 }
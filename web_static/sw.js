@@ -0,0 +1,223 @@
+// Service worker веб-версии: оболочка приложения из кэша, последний список
+// заказчиков и очередь генерации в IndexedDB, пока нет связи.
+// Список файлов оболочки и версию подставляет сервер при отдаче /sw.js.
+const APP_SHELL = __APP_SHELL__;
+const CACHE_VERSION = __CACHE_VERSION__;
+
+const SHELL_CACHE = `shell-${CACHE_VERSION}`;
+const DATA_CACHE = 'api-data';
+// API, для которых при отсутствии связи отдаём последний полученный ответ
+const CACHED_API = ['/api/customers', '/api/validation-rules'];
+
+const QUEUE_DB = 'wordgen-offline';
+const QUEUE_STORE = 'generate-queue';
+const SYNC_TAG = 'replay-generate';
+// Ответы, после которых запрос остаётся в очереди: сервер занят или
+// временно недоступен
+const RETRY_STATUSES = [429, 502, 503, 504];
+// Сколько раз повторять запрос, на который сервер отвечает ошибкой 500:
+// если данные стабильно роняют генератор, запрос удаляется из очереди
+const MAX_REPLAY_ATTEMPTS = 3;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(APP_SHELL))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('shell-') && key !== SHELL_CACHE).map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+            .then(() => replayQueue())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (request.method === 'POST' && url.pathname === '/api/generate') {
+        event.respondWith(generateOrQueue(request));
+        return;
+    }
+    if (request.method !== 'GET') return;
+
+    // Из кэша отдаётся только оболочка '/': прочие переходы (скачивание
+    // отчёта, /docs, /metrics) идут в сеть и не попадают в кэш под '/'
+    if (url.pathname === '/') {
+        event.respondWith(staleWhileRevalidate(request, '/'));
+    } else if (url.pathname.startsWith('/static/')) {
+        event.respondWith(cacheFirst(request));
+    } else if (CACHED_API.includes(url.pathname)) {
+        event.respondWith(networkFirst(request));
+    }
+});
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(replayQueue());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'replay-queue') {
+        event.waitUntil(replayQueue());
+    }
+});
+
+// --- Стратегии кэширования ----------------------------------------------------
+
+async function staleWhileRevalidate(request, cacheKey) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(cacheKey);
+    const update = fetch(request)
+        .then(response => {
+            if (response.ok) cache.put(cacheKey, response.clone());
+            return response;
+        })
+        .catch(() => null);
+    if (cached) {
+        return cached;
+    }
+    return (await update) || new Response('Нет связи с сервером', { status: 503 });
+}
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(SHELL_CACHE);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function networkFirst(request) {
+    const cache = await caches.open(DATA_CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok) cache.put(request, response.clone());
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+// --- Очередь генерации ----------------------------------------------------------
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(QUEUE_DB, 1);
+        open.onupgradeneeded = () => {
+            open.result.createObjectStore(QUEUE_STORE, { keyPath: 'id', autoIncrement: true });
+        };
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+async function queueOperation(mode, operation) {
+    const db = await openQueue();
+    try {
+        return await new Promise((resolve, reject) => {
+            const tx = db.transaction(QUEUE_STORE, mode);
+            const request = operation(tx.objectStore(QUEUE_STORE));
+            tx.oncomplete = () => resolve(request.result);
+            tx.onerror = () => reject(tx.error);
+        });
+    } finally {
+        db.close();
+    }
+}
+
+const addToQueue = entry => queueOperation('readwrite', store => store.add(entry));
+const readQueue = () => queueOperation('readonly', store => store.getAll());
+const removeFromQueue = id => queueOperation('readwrite', store => store.delete(id));
+const updateInQueue = entry => queueOperation('readwrite', store => store.put(entry));
+
+async function notifyClients(message) {
+    const clients = await self.clients.matchAll({ includeUncontrolled: true, type: 'window' });
+    clients.forEach(client => client.postMessage(message));
+}
+
+async function generateOrQueue(request) {
+    const body = await request.clone().text();
+    try {
+        return await fetch(request);
+    } catch (error) {
+        // Нет связи: сохраняем запрос и отвечаем 202, отчёт создадим позже
+        const id = await addToQueue({ body, queuedAt: new Date().toISOString() });
+        if (self.registration.sync) {
+            self.registration.sync.register(SYNC_TAG).catch(() => {});
+        }
+        const queued = (await readQueue()).length;
+        return new Response(JSON.stringify({ queued: true, id, queue_length: queued }), {
+            status: 202,
+            headers: { 'Content-Type': 'application/json' },
+        });
+    }
+}
+
+let replaying = null;
+
+// Повтор запросов из очереди по одному, с приоритетом bulk: после
+// восстановления связи они не мешают интерактивной генерации
+function replayQueue() {
+    if (!replaying) {
+        replaying = doReplayQueue().finally(() => { replaying = null; });
+    }
+    return replaying;
+}
+
+async function doReplayQueue() {
+    const entries = await readQueue();
+    for (const entry of entries) {
+        let response;
+        try {
+            response = await fetch('/api/generate', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'X-Priority': 'bulk' },
+                body: entry.body,
+            });
+        } catch (error) {
+            return;  // связи всё ещё нет — попробуем при следующем событии
+        }
+        if (RETRY_STATUSES.includes(response.status)) {
+            continue;  // сервер занят или недоступен — оставляем в очереди, пробуем следующие
+        }
+        if (response.status >= 500) {
+            const attempts = (entry.attempts || 0) + 1;
+            if (attempts < MAX_REPLAY_ATTEMPTS) {
+                await updateInQueue({ ...entry, attempts });
+                continue;
+            }
+        }
+        await removeFromQueue(entry.id);
+        if (response.ok) {
+            await notifyClients({
+                type: 'generate-replayed',
+                id: entry.id,
+                reportId: response.headers.get('X-Report-Id'),
+                remaining: (await readQueue()).length,
+            });
+        } else {
+            let detail = `Ошибка ${response.status}`;
+            try {
+                detail = JSON.stringify((await response.json()).detail);
+            } catch (e) {
+                // тело не JSON — оставляем код ответа
+            }
+            await notifyClients({ type: 'generate-failed', id: entry.id, detail });
+        }
+    }
+}